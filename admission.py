@@ -0,0 +1,122 @@
+import asyncio
+import math
+from collections import deque
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import Deque, Dict, Tuple
+
+
+# 예약 창이 열리는 순간 POST /book 이 한꺼번에 몰린다.  여기 있는 것들은 모두
+# 이벤트 루프에서만 호출되므로 락 없이 동작한다.
+
+
+class Overloaded(Exception):
+    """Request shed before it reached storage; answer 429 with ``Retry-After``."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimiter:
+    """Token bucket per key: ``rate`` tokens/second, up to ``burst`` stored.
+
+    ``take(key)`` spends one token and returns 0, or returns the seconds until
+    a token is available.  ``rate <= 0`` disables the limiter.  Full buckets
+    are dropped once more than ``max_keys`` are tracked.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, updated)
+
+    def take(self, key: str) -> float:
+        if self.rate <= 0:
+            return 0.0
+        now = monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1.0:
+            self._buckets[key] = (tokens - 1.0, now)
+            wait = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            wait = (1.0 - tokens) / self.rate
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return wait
+
+    def _prune(self, now: float) -> None:
+        full = [
+            key for key, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * self.rate >= self.burst
+        ]
+        for key in full:
+            del self._buckets[key]
+
+
+class AdmissionGate:
+    """At most ``limit`` requests inside, up to ``max_queue`` waiting in FIFO order.
+
+    A waiter that isn't admitted within ``max_wait`` seconds is shed, as is a
+    request arriving at a full queue; ``Retry-After`` is estimated from the
+    queue length and the recent time spent inside.
+    """
+
+    def __init__(self, limit: int, max_queue: int, max_wait: float):
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service = 0.05  # 안에서 보낸 시간의 EWMA (초)
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def retry_after(self) -> float:
+        return (self.queued + 1) * self._service / self.limit
+
+    @asynccontextmanager
+    async def admit(self):
+        await self._acquire()
+        started = monotonic()
+        try:
+            yield
+        finally:
+            self._service = 0.8 * self._service + 0.2 * (monotonic() - started)
+            self._release()
+
+    async def _acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise Overloaded("queue_full", self.retry_after())
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done():
+                # 시간 초과와 동시에 자리를 넘겨받았다: 다음 대기자에게 돌려준다
+                self._release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(exc, asyncio.TimeoutError):
+                raise Overloaded("queue_timeout", self.retry_after()) from None
+            raise
+
+    def _release(self) -> None:
+        # 자리는 active 를 줄이지 않고 다음 대기자에게 그대로 넘긴다
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
@@ -1,35 +1,65 @@
 import os
-import html
+import asyncio
+import hashlib
+import json
+import logging
 import smtplib
+import threading
+from functools import partial
 from datetime import datetime, timedelta, time
+from time import monotonic
+from email.utils import formatdate, parsedate_to_datetime
 from urllib.parse import quote, quote_plus
 from typing import List, Dict, Any, Tuple, Optional
 from collections import defaultdict
+from contextlib import asynccontextmanager
 
-from email.message import EmailMessage
-
-from fastapi import FastAPI, Request, Form, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import Body, FastAPI, File, Request, Form, HTTPException, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
+import anyio
 from dotenv import load_dotenv
-import MySQLdb
-from MySQLdb import IntegrityError
-from MySQLdb.cursors import DictCursor
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+from admission import AdmissionGate, Overloaded, RateLimiter
+from assets import AssetFiles, AssetManifest
+from availability import AvailabilityIndex, ChangeTracker
+from company_import import ImportRejected, parse_companies, summary_text
+from db import configure_pool
+from events import EventBroadcaster, format_sse
+from idempotency import KEY_HEADER, REPLAYED_HEADER, NotApplied, RequestKeys, request_claim
+from mail_templates import CONFIRMATION_SUBJECT, EmailTemplates
+from metrics import MetricsMiddleware, Registry, TimedStorage
+from occupancy import SharedOccupancy, occupancy_path
+from outbox import OutboxWorker, enqueue, ensure_outbox_schema, idempotency_key, outbox_counts
+from page_cache import RenderedPage, StaticPage, negotiate
+from storage import (
+    BookingRejected, BookingRules, BulkResult, DuplicateCompany, SlotRange, check_booking, open_storage,
+)
+from window_schedule import WindowSchedule, window_timing
+
 load_dotenv()
 
+logger = logging.getLogger("apec_booking")
+
 APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
 APP_PORT = int(os.getenv("APP_PORT", "80"))
-STORAGE = os.getenv("STORAGE", "mysql")
+STORAGE = os.getenv("STORAGE", "mysql").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "/var/lib/apec-booking/bookings.sqlite3")
+XML_PATH = os.getenv("XML_PATH", "/var/lib/apec-booking/bookings.xml")
 
 MYSQL_HOST = os.getenv("MYSQL_HOST", "127.0.0.1")
 MYSQL_PORT = int(os.getenv("MYSQL_PORT", "3306"))
 MYSQL_DB = os.getenv("MYSQL_DB", "apec_booking")
 MYSQL_USER = os.getenv("MYSQL_USER", "apec")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "")
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "10"))
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "10"))
+MYSQL_POOL_RECYCLE = float(os.getenv("MYSQL_POOL_RECYCLE", "3600"))
+# async 라우트가 DB 작업에 쓰는 스레드 수 (기본: 커넥션 풀 크기)
+DB_THREADS = int(os.getenv("DB_THREADS", str(MYSQL_POOL_SIZE)))
 
 SMTP_HOST = os.getenv("SMTP_HOST")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "0")) if os.getenv("SMTP_PORT") else None
@@ -39,6 +69,29 @@ SMTP_FROM = os.getenv("SMTP_FROM")
 
 SERVER_BASE_URL = os.getenv("SERVER_BASE_URL", "http://apecmeetingroom.com")
 EMAIL_DRY_RUN = os.getenv("EMAIL_DRY_RUN", "0") == "1"
+AVAILABILITY_TTL = float(os.getenv("AVAILABILITY_TTL", "30"))
+# worker 들이 공유하는 점유 비트맵 파일 위치 (빈 값이면 공유하지 않음)
+OCCUPANCY_DIR = os.getenv("OCCUPANCY_DIR", "/dev/shm")
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+# SSE 구독자 한 명당 쌓아 두는 이벤트 수 (넘치면 버리고 reset 하나만 보낸다)
+SSE_QUEUE = int(os.getenv("SSE_QUEUE", "256"))
+# POST /book 입장 제어: 동시 처리 수, 대기열 길이/대기 시간, IP/회사별 토큰 버킷
+# (BOOK_CONCURRENCY 를 DB_THREADS 보다 작게 두면 나머지 스레드는 조회 요청 몫)
+BOOK_CONCURRENCY = int(os.getenv("BOOK_CONCURRENCY", str(max(1, DB_THREADS // 2))))
+BOOK_QUEUE = int(os.getenv("BOOK_QUEUE", "100"))
+BOOK_QUEUE_WAIT = float(os.getenv("BOOK_QUEUE_WAIT", "3"))
+BOOK_IP_RATE = float(os.getenv("BOOK_IP_RATE", "5"))
+BOOK_IP_BURST = float(os.getenv("BOOK_IP_BURST", "20"))
+BOOK_COMPANY_RATE = float(os.getenv("BOOK_COMPANY_RATE", "1"))
+BOOK_COMPANY_BURST = float(os.getenv("BOOK_COMPANY_BURST", "5"))
+# Idempotency-Key 결과 보관 시간과, 처리 중인 같은 키를 기다리는 최대 시간 (초)
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "3600"))
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "5"))
+OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "1") == "1"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_RATE = float(os.getenv("OUTBOX_RATE", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_BACKOFF = float(os.getenv("OUTBOX_BACKOFF", "30"))
 
 try:
     LOCAL_TIMEZONE = ZoneInfo(os.getenv("LOCAL_TZ", "Asia/Seoul"))
@@ -321,162 +374,169 @@ ROOMS_BY_TIER: dict[str, list[str]] = {
     "Other": list(OUTDOOR_ROOMS),
 }
 
-app = FastAPI(title="APEC Meeting Rooms Booking")
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# rooms 테이블에 반영된 카탈로그 버전 (app_meta.rooms_catalog_version)
+ROOMS_CATALOG_VERSION = hashlib.sha1(
+    json.dumps(
+        sorted((room["code"], room["name"], room["tier"]) for room in ROOMS_DATA),
+        ensure_ascii=False,
+    ).encode("utf-8")
+).hexdigest()[:16]
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    if STORAGE == "mysql":
+        try:
+            sync_room_catalog()
+        except Exception:
+            logger.exception("Room catalog sync failed at startup; use POST /admin/rooms/resync")
+    # 공유 점유 테이블이 비어 있으면 첫 요청 전에 채워 둔다
+    for date_str in EVENT_DATES:
+        try:
+            await run_db(AVAILABILITY.ensure, date_str)
+        except Exception:
+            logger.exception("Availability warm-up failed for %s", date_str)
+    worker = start_outbox_worker()
+    try:
+        yield
+    finally:
+        if worker is not None:
+            worker.stop()
+
+
+app = FastAPI(title="APEC Meeting Rooms Booking", lifespan=lifespan)
+app.mount("/static", AssetFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
+# build_assets.py 결과(지문 붙은 CSS/로고, 룸 사진 반응형 변형); 없으면 원본 경로
+ASSETS = AssetManifest("static")
+templates.env.globals["asset_url"] = ASSETS.url
+for _room in ROOMS_DATA:
+    _room["photo"] = ASSETS.photo(_room["image"])
+
+# -------------------------- Metrics (/metrics) --------------------------
+METRICS = Registry()
+HTTP_SECONDS = METRICS.histogram(
+    "apec_http_request_duration_seconds", "Request latency by route template.", ("method", "route", "status"),
+)
+DB_SECONDS = METRICS.histogram(
+    "apec_db_call_duration_seconds", "Storage call latency by method (includes connection checkout).", ("call",),
+)
+DB_CHECKOUT_SECONDS = METRICS.histogram(
+    "apec_db_pool_checkout_seconds", "Time to check out a pooled MySQL connection (wait + ping/reconnect).",
+)
+BOOKINGS_TOTAL = METRICS.counter(
+    "apec_bookings_total", "POST /book outcomes; reason is set for rejections.", ("result", "reason"),
+)
+# SSE 스트림은 연결 유지 시간이라 지연 히스토그램에서 뺀다
+app.add_middleware(MetricsMiddleware, histogram=HTTP_SECONDS, skip=("/metrics", "/api/availability/stream"))
+
 # -------------------------- DB helpers --------------------------
+# 모든 helper가 공유하는 커넥션 풀 (conn.close()는 풀로 반환)
+DB_POOL = configure_pool(
+    host=MYSQL_HOST, port=MYSQL_PORT, db=MYSQL_DB,
+    user=MYSQL_USER, password=MYSQL_PASSWORD,
+    max_size=MYSQL_POOL_SIZE, timeout=MYSQL_POOL_TIMEOUT, recycle=MYSQL_POOL_RECYCLE,
+    on_checkout=DB_CHECKOUT_SECONDS.observe,
+)
+
+
+_db_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking storage call from an ``async def`` route.
+
+    At most ``DB_THREADS`` calls run at once; the rest wait as coroutines
+    instead of holding AnyIO threadpool threads (or pool connections), so a
+    burst of requests queues cheaply on the event loop.
+    """
+
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = anyio.CapacityLimiter(DB_THREADS)
+    return await anyio.to_thread.run_sync(partial(func, *args, **kwargs), limiter=_db_limiter)
+
+
+# 예약/비활성 슬롯/예약 창/회사 데이터는 STORAGE 에 따라 고른 백엔드를 거친다
+# (호출마다 DB_SECONDS 에 메서드 이름으로 기록)
+STORE = TimedStorage(
+    open_storage(STORAGE, pool=DB_POOL, sqlite_path=SQLITE_PATH, xml_path=XML_PATH), DB_SECONDS
+)
+BOOKING_RULES = BookingRules(ROOMS_BY_TIER, HOURS, MAX_BLOCKS)
+# POST /book 과 관리자 변경 요청의 재전송은 저장된 결과로 답한다
+REQUEST_KEYS = RequestKeys(STORE, ttl=IDEMPOTENCY_TTL, wait=IDEMPOTENCY_WAIT)
+
+
 def get_db():
+    """Raw MySQL connection for the email outbox and the rooms catalog."""
+
     if STORAGE != "mysql":
-        raise RuntimeError("Only mysql supported")
-    return MySQLdb.connect(
-        host=MYSQL_HOST, port=MYSQL_PORT, user=MYSQL_USER,
-        passwd=MYSQL_PASSWORD, db=MYSQL_DB, charset="utf8mb4"
-    )
+        raise RuntimeError("The email outbox and room catalog need STORAGE=mysql")
+    return DB_POOL.connect()
 
 def fetch_bookings(date_str: str) -> List[Dict[str, Any]]:
-    conn = get_db()
-    try:
-        cur = conn.cursor(DictCursor)
-        cur.execute(
-            """
-            SELECT id, date, room_code, tier, company, email,
-                   start_hour, end_hour, blocks, created_at
-            FROM bookings
-            WHERE date = %s
-            ORDER BY room_code, start_hour
-            """,
-            (date_str,),
-        )
-        return list(cur.fetchall())
-    finally:
-        conn.close()
+    return STORE.bookings_for_date(date_str)
 
 
 def fetch_bookings_for_company(date_str: str, company: str) -> List[Dict[str, Any]]:
-    conn = get_db()
-    try:
-        cur = conn.cursor(DictCursor)
-        cur.execute(
-            """
-            SELECT company, email, tier, room_code, start_hour, end_hour, date
-            FROM bookings
-            WHERE date = %s AND company = %s
-            ORDER BY email, start_hour, room_code
-            """,
-            (date_str, company),
-        )
-        return list(cur.fetchall())
-    finally:
-        conn.close()
+    return STORE.bookings_for_company(date_str, company)
 
 
 def fetch_disabled_slots(date_str: Optional[str] = None, room_code: Optional[str] = None) -> List[Dict[str, Any]]:
-    conn = get_db()
-    try:
-        cur = conn.cursor(DictCursor)
-        query = """
-            SELECT id, date, room_code, start_hour, end_hour, note, created_at
-            FROM disabled_slots
-        """
-        conditions = []
-        params: List[Any] = []
-        if date_str:
-            conditions.append("date=%s")
-            params.append(date_str)
-        if room_code:
-            conditions.append("room_code=%s")
-            params.append(room_code)
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        query += " ORDER BY date, room_code, start_hour"
-        cur.execute(query, params)
-        return list(cur.fetchall())
-    finally:
-        conn.close()
+    return STORE.disabled_slots(date_str, room_code)
 
 
-# -------------------------- Email helpers --------------------------
-def _format_hour_label(hour_value: int) -> str:
-    return f"{int(hour_value):02d}:00"
-
-
-def _build_email_bodies(company_name: str, items: List[Dict[str, Any]]) -> Tuple[str, str]:
-    lines: List[str] = []
-    html_lines: List[str] = []
-
-    lines.append(f"Dear {company_name},")
-    lines.append("")
-    lines.append("Warm greetings from the Secretariat of the APEC CEO Summit Korea 2025.")
-    lines.append("We are pleased to inform you that your meeting room reservation has been successfully received.")
-    lines.append("Please find the details of your booking below for your confirmation.")
-    lines.append("")
-    lines.append("Reservation Details:")
-
-    html_lines.append("<html><body>")
-    html_lines.append(f"<p>Dear {html.escape(company_name)},</p>")
-    html_lines.append("<p>Warm greetings from the Secretariat of the APEC CEO Summit Korea 2025.</p>")
-    html_lines.append(
-        "<p>We are pleased to inform you that your meeting room reservation has been successfully received.<br>"
-        "Please find the details of your booking below for your confirmation.</p>"
-    )
-    html_lines.append("<p><strong>Reservation Details:</strong></p>")
+def _load_availability_day(date_str: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Load one day's bookings and disabled slots in one storage call."""
+
+    return STORE.load_day(date_str)
 
-    for idx, item in enumerate(items):
-        room_code = item["room_code"]
-        date_value = str(item["date"])
-        start_hour = int(item["start_hour"])
-        end_hour = int(item["end_hour"])
-        tier = item["tier"]
-        company_value = item["company"]
-        link = f"{SERVER_BASE_URL}/display?room={room_code}&date={date_value}"
-        room_name = ROOM_LABEL.get(room_code, room_code)
-
-        if idx > 0:
-            lines.append("")
-        lines.append(f"- Company : {company_value}")
-        lines.append(f"- Date : {date_value}")
-        lines.append(f"- Time : {_format_hour_label(start_hour)} - {_format_hour_label(end_hour)}")
-        lines.append(f"- Room : {tier} / {room_name}")
-        lines.append(f"- Check Schedule Link : {link}")
-
-        html_lines.append("<ul>")
-        html_lines.append(f"  <li><strong>Company:</strong> {html.escape(company_value)}</li>")
-        html_lines.append(f"  <li><strong>Date:</strong> {html.escape(date_value)}</li>")
-        html_lines.append(
-            f"  <li><strong>Time:</strong> {_format_hour_label(start_hour)} - {_format_hour_label(end_hour)}</li>"
-        )
-        html_lines.append(
-            f"  <li><strong>Room:</strong> {html.escape(tier)} / {html.escape(room_name)}</li>"
-        )
-        html_lines.append(
-            "  <li><strong>Check Schedule Link:</strong> "
-            f"<a href=\"{html.escape(link)}\">Check Schedule Link</a></li>"
-        )
-        html_lines.append("</ul>")
-
-    lines.append("")
-    lines.append("We kindly ask you to review the above information and ensure that all details are correct.")
-    lines.append("Should you require any assistance or additional arrangements, please do not hesitate to contact us.")
-    lines.append("")
-    lines.append("We look forward to supporting your successful participation at the APEC CEO Summit Korea 2025.")
-    lines.append("")
-    lines.append("Warm regards,")
-    lines.append("APEC CEO Summit Korea 2025 Secretariat")
-
-    html_lines.append(
-        "<p>We kindly ask you to review the above information and ensure that all details are correct.</p>"
-    )
-    html_lines.append(
-        "<p>Should you require any assistance or additional arrangements, please do not hesitate to contact us.</p>"
-    )
-    html_lines.append(
-        "<p>We look forward to supporting your successful participation at the APEC CEO Summit Korea 2025.</p>"
-    )
-    html_lines.append("<p>Warm regards,<br>APEC CEO Summit Korea 2025 Secretariat</p>")
-    html_lines.append("</body></html>")
 
-    return "\n".join(lines), "\n".join(html_lines)
+# 폴링 API의 ETag 버전: "day:<date>", "windows", "companies"
+CHANGES = ChangeTracker()
+
+# /api/availability/stream 구독자에게 보내는 SSE 이벤트
+EVENTS = EventBroadcaster(queue_size=SSE_QUEUE)
+
+
+def _on_availability_change(date_str: str, room_code: Optional[str]) -> None:
+    CHANGES.bump(f"day:{date_str}")
+    if room_code is None:
+        EVENTS.publish("reset", {"date": date_str})
+        return
+    bookings, disabled = AVAILABILITY.room(date_str, room_code)
+    entry = _room_grid_entry(bookings, disabled, AVAILABILITY.masks(date_str, room_code))
+    EVENTS.publish("slots", {"date": date_str, "room": room_code, **entry})
+
+
+def _open_occupancy() -> Optional[SharedOccupancy]:
+    if not OCCUPANCY_DIR:
+        return None
+    if STORAGE == "mysql":
+        namespace = f"mysql:{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}"
+    else:
+        namespace = f"{STORAGE}:{os.path.abspath(SQLITE_PATH if STORAGE == 'sqlite' else XML_PATH)}"
+    try:
+        return SharedOccupancy(occupancy_path(OCCUPANCY_DIR, namespace), EVENT_DATES, ALL_ROOM_CODES, HOURS)
+    except OSError:
+        logger.warning("Shared occupancy table unavailable in %s; each worker keeps its own", OCCUPANCY_DIR, exc_info=True)
+        return None
+
+
+# /api/availability, /display, 충돌 검사는 DB 대신 이 인덱스를 읽는다
+AVAILABILITY = AvailabilityIndex(
+    _load_availability_day,
+    HOURS,
+    ttl=AVAILABILITY_TTL,
+    on_change=_on_availability_change,
+    shared=_open_occupancy(),
+)
+
+
+# -------------------------- Email helpers --------------------------
+# 템플릿은 프로세스당 한 번 컴파일, (room, date) 링크 조각은 메모이즈
+EMAIL_TEMPLATES = EmailTemplates(SERVER_BASE_URL, ROOM_LABEL)
 
 
 def _validate_smtp_settings() -> Dict[str, Any]:
@@ -501,7 +561,79 @@ def _validate_smtp_settings() -> Dict[str, Any]:
     }
 
 
-def send_company_confirmation(date_str: str, company: str, *, dry_run: bool = False) -> Tuple[int, int]:
+def open_smtp_connection(smtp_settings: Dict[str, Any]) -> smtplib.SMTP:
+    """Connect and log in; the caller owns the returned session (``quit()``)."""
+
+    if smtp_settings["port"] == 465:
+        server = smtplib.SMTP_SSL(smtp_settings["host"], smtp_settings["port"], timeout=20)
+    else:
+        server = smtplib.SMTP(smtp_settings["host"], smtp_settings["port"], timeout=20)
+    try:
+        if smtp_settings["port"] != 465:
+            server.ehlo()
+            try:
+                server.starttls()
+                server.ehlo()
+            except smtplib.SMTPException:
+                pass
+        if smtp_settings["user"]:
+            server.login(smtp_settings["user"], smtp_settings["password"])
+    except BaseException:
+        server.close()
+        raise
+    return server
+
+
+
+# 확인 메일 발송 워커 (lifespan에서 시작, 프로세스당 1개)
+OUTBOX_WORKER: Optional[OutboxWorker] = None
+
+
+def start_outbox_worker() -> Optional[OutboxWorker]:
+    global OUTBOX_WORKER
+    if not OUTBOX_ENABLED or EMAIL_DRY_RUN:
+        return None
+    if STORAGE != "mysql":
+        logger.warning("Email outbox worker not started: STORAGE=%s has no email_outbox table", STORAGE)
+        return None
+    try:
+        smtp_settings = _validate_smtp_settings()
+    except RuntimeError as exc:
+        logger.warning("Email outbox worker not started: %s", exc)
+        return None
+    try:
+        conn = get_db()
+        try:
+            ensure_outbox_schema(conn)
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception:
+        logger.exception("Email outbox worker not started")
+        return None
+    OUTBOX_WORKER = OutboxWorker(
+        get_db,
+        lambda: open_smtp_connection(smtp_settings),
+        smtp_settings["from"],
+        batch_size=OUTBOX_BATCH_SIZE,
+        rate=OUTBOX_RATE,
+        max_attempts=OUTBOX_MAX_ATTEMPTS,
+        backoff=OUTBOX_BACKOFF,
+    )
+    OUTBOX_WORKER.start()
+    return OUTBOX_WORKER
+
+
+def send_company_confirmation(date_str: str, company: str, *, dry_run: bool = False) -> Tuple[int, int, int, int]:
+    """Queue confirmation emails for ``company`` on ``date_str``.
+
+    Returns ``(recipients, bookings, queued, requeued)``.  Messages go to the
+    ``email_outbox`` table and are delivered by the background worker; a
+    message whose recipient and bookings are unchanged since the last request
+    shares its idempotency key: it is not queued twice while still pending,
+    and is queued again (``requeued``) once it was sent or failed.
+    """
+
     if date_str not in EVENT_DATES:
         raise ValueError("Invalid date selected")
 
@@ -521,129 +653,118 @@ def send_company_confirmation(date_str: str, company: str, *, dry_run: bool = Fa
     if not grouped:
         raise ValueError(f"No email address on file for {company}.")
 
-    smtp_settings = _validate_smtp_settings()
+    _validate_smtp_settings()
 
     total_bookings = sum(len(items) for items in grouped.values())
     if dry_run:
-        return len(grouped), total_bookings
+        return len(grouped), total_bookings, 0, 0
 
-    messages: List[EmailMessage] = []
+    messages: List[Dict[str, Any]] = []
     for recipient, items in grouped.items():
-        text_body, html_body = _build_email_bodies(company, items)
-        msg = EmailMessage()
-        msg["Subject"] = "[APEC CEO Summit Korea 2025] Meeting Room Reservation Confirmation"
-        msg["From"] = smtp_settings["from"]
-        msg["To"] = recipient
-        msg.set_content(text_body)
-        msg.add_alternative(html_body, subtype="html")
-        messages.append(msg)
-
-    if smtp_settings["port"] == 465:
-        with smtplib.SMTP_SSL(smtp_settings["host"], smtp_settings["port"], timeout=20) as server:
-            server.login(smtp_settings["user"], smtp_settings["password"])
-            for message in messages:
-                server.send_message(message)
-    else:
-        with smtplib.SMTP(smtp_settings["host"], smtp_settings["port"], timeout=20) as server:
-            server.ehlo()
-            try:
-                server.starttls()
-                server.ehlo()
-            except smtplib.SMTPException:
-                pass
-            if smtp_settings["user"]:
-                server.login(smtp_settings["user"], smtp_settings["password"])
-            for message in messages:
-                server.send_message(message)
-
-    return len(grouped), total_bookings
-
+        text_body, html_body = EMAIL_TEMPLATES.confirmation(company, items)
+        key = idempotency_key(
+            "confirmation", date_str, company, recipient.lower(),
+            *(f"{r['id']}:{r['room_code']}:{r['start_hour']}-{r['end_hour']}" for r in items),
+        )
+        messages.append(
+            {"key": key, "recipient": recipient, "subject": CONFIRMATION_SUBJECT, "text": text_body, "html": html_body}
+        )
 
-def fetch_booking_windows_map() -> Dict[str, Dict[str, datetime]]:
     conn = get_db()
     try:
-        cur = conn.cursor(DictCursor)
-        cur.execute(
-            "SELECT date, start_at, end_at FROM booking_windows ORDER BY date"
-        )
-        items: Dict[str, Dict[str, datetime]] = {}
-        for row in cur.fetchall():
-            date_key = row["date"].isoformat()
-            items[date_key] = {
-                "start": ensure_local_timezone(row["start_at"]),
-                "end": ensure_local_timezone(row["end_at"]),
-            }
-        return items
+        queued, requeued = enqueue(conn, messages)
+        conn.commit()
     finally:
         conn.close()
 
+    if OUTBOX_WORKER is not None:
+        OUTBOX_WORKER.wake()
+    return len(grouped), total_bookings, queued, requeued
+
+
+def fetch_booking_windows_map() -> Dict[str, Dict[str, datetime]]:
+    return {
+        date_key: {"start": ensure_local_timezone(row["start"]), "end": ensure_local_timezone(row["end"])}
+        for date_key, row in STORE.booking_windows().items()
+    }
+
+
+# 모든 EVENT_DATES 의 예약 창을 한 번에 읽어 두고, 상태 확인은 시각 비교만 한다
+WINDOWS = WindowSchedule(
+    EVENT_DATES,
+    fetch_booking_windows_map,
+    default_booking_window,
+    ttl=AVAILABILITY_TTL,
+    on_change=lambda: CHANGES.bump("windows"),
+)
+
+
+def cached_booking_windows() -> Dict[str, Dict[str, datetime]]:
+    """Custom windows map from the in-memory schedule (reloaded every ``AVAILABILITY_TTL`` seconds)."""
+
+    return WINDOWS.windows()
 
-def fetch_booking_window(date_str: str) -> Optional[Dict[str, datetime]]:
-    conn = get_db()
-    try:
-        cur = conn.cursor(DictCursor)
-        cur.execute(
-            "SELECT start_at, end_at FROM booking_windows WHERE date=%s",
-            (date_str,),
-        )
-        row = cur.fetchone()
-        if not row:
-            return None
-        return {
-            "start": ensure_local_timezone(row["start_at"]),
-            "end": ensure_local_timezone(row["end_at"]),
-        }
-    finally:
-        conn.close()
+
+def _store_windows(fresh: Dict[str, Dict[str, datetime]]) -> None:
+    WINDOWS.store(fresh)
+
+
+async def booking_windows_async() -> Dict[str, Dict[str, datetime]]:
+    """``cached_booking_windows`` without leaving the event loop while the schedule is fresh."""
+
+    if WINDOWS.is_fresh():
+        return WINDOWS.windows()
+    return await run_db(WINDOWS.windows)
+
+
+def invalidate_booking_windows() -> None:
+    WINDOWS.invalidate()
+    CHANGES.bump("windows")
 
 
 def upsert_booking_window(date_str: str, start_dt: datetime, end_dt: datetime) -> None:
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO booking_windows (date, start_at, end_at)
-            VALUES (%s, %s, %s)
-            ON DUPLICATE KEY UPDATE start_at=VALUES(start_at), end_at=VALUES(end_at)
-            """,
-            (date_str, to_local_naive(start_dt), to_local_naive(end_dt)),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    STORE.set_booking_window(date_str, to_local_naive(start_dt), to_local_naive(end_dt))
+    invalidate_booking_windows()
 
 
 def delete_booking_window(date_str: str) -> None:
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM booking_windows WHERE date=%s", (date_str,))
-        conn.commit()
-    finally:
-        conn.close()
+    STORE.delete_booking_window(date_str)
+    invalidate_booking_windows()
+
 
+def get_effective_booking_window(
+    date_str: str, windows: Optional[Dict[str, Dict[str, datetime]]] = None
+) -> Dict[str, Any]:
+    """Custom window for ``date_str`` or the default.
 
-def get_effective_booking_window(date_str: str) -> Dict[str, Any]:
-    custom = fetch_booking_window(date_str)
+    Without ``windows`` the answer comes from the in-memory schedule.
+    """
+
+    if windows is None:
+        start, end, source = WINDOWS.window(date_str)
+        return {"start": start, "end": end, "source": source}
+    custom = windows.get(date_str)
     if custom:
         return {"start": custom["start"], "end": custom["end"], "source": "custom"}
     start, end = default_booking_window(date_str)
     return {"start": start, "end": end, "source": "default"}
 
 
-def booking_window_status(date_str: str, now: Optional[datetime] = None) -> Dict[str, Any]:
-    window = get_effective_booking_window(date_str)
+def booking_window_status(
+    date_str: str,
+    now: Optional[datetime] = None,
+    windows: Optional[Dict[str, Dict[str, datetime]]] = None,
+) -> Dict[str, Any]:
+    window = get_effective_booking_window(date_str, windows)
     current = ensure_local_timezone(now or datetime.now(LOCAL_TIMEZONE))
-    is_open = window["start"] <= current < window["end"]
     return {
         "date": date_str,
         "start": window["start"],
         "end": window["end"],
         "source": window["source"],
-        "is_open": is_open,
         "now": current,
         "custom": window["source"] == "custom",
+        **window_timing(window["start"], window["end"], current),
     }
 
 
@@ -726,245 +847,339 @@ def ensure_rooms_seeded(conn=None):
             conn.close()
 
 
-def insert_booking(date_str, room_code, tier, company, email, start_hour, blocks):
-    end_hour = start_hour + blocks
+def sync_room_catalog(force: bool = False) -> bool:
+    """Reconcile the ``rooms`` table with ``ROOMS_DATA`` once per catalog version.
+
+    Runs at startup (and from ``/admin/rooms/resync``) so booking writes never
+    probe the schema or re-seed rooms.  Returns ``True`` when rooms were synced.
+    """
+
     conn = get_db()
     try:
-        ensure_rooms_seeded(conn)
         cur = conn.cursor()
         cur.execute(
             """
-            INSERT INTO bookings
-              (date, room_code, tier, company, email, start_hour, end_hour, blocks, created_at)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,NOW())
-            """,
-            (date_str, room_code, tier, company, email, start_hour, end_hour, blocks),
+            CREATE TABLE IF NOT EXISTS app_meta (
+              name VARCHAR(64) PRIMARY KEY,
+              value VARCHAR(255) NOT NULL,
+              updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB
+            """
         )
-        conn.commit()
-        return cur.lastrowid
-    finally:
-        conn.close()
-
+        cur.execute("SELECT value FROM app_meta WHERE name='rooms_catalog_version'")
+        row = cur.fetchone()
+        if row and row[0] == ROOMS_CATALOG_VERSION and not force:
+            return False
 
-def find_disabled_conflicts(date_str, room_code, start_hour, end_hour) -> bool:
-    conn = get_db()
-    try:
-        cur = conn.cursor()
+        ensure_rooms_seeded(conn)
         cur.execute(
             """
-            SELECT 1 FROM disabled_slots
-            WHERE date=%s AND room_code=%s
-              AND NOT (%s <= start_hour OR end_hour <= %s)
-            LIMIT 1
+            INSERT INTO app_meta (name, value) VALUES ('rooms_catalog_version', %s)
+            ON DUPLICATE KEY UPDATE value=VALUES(value)
             """,
-            (date_str, room_code, end_hour, start_hour),
+            (ROOMS_CATALOG_VERSION,),
         )
-        return cur.fetchone() is not None
+        conn.commit()
+        return True
     finally:
         conn.close()
 
 
+def commit_booking(
+    date_str: str,
+    room_code: str,
+    company: str,
+    email: str,
+    start_hour: int,
+    blocks: int,
+    company_other: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Validate and insert a booking atomically in the storage backend.
+
+    Each backend runs the checks and the insert under its write lock (InnoDB
+    locks plus the ``booking_hours`` key, ``BEGIN IMMEDIATE`` or the XML file
+    lock), so a concurrent booking for the same company or room cannot slip
+    in between.  Validation failures raise :class:`BookingRejected`; MySQL
+    lock contention that outlasts its retries raises :class:`Overloaded`.
+    """
+
+    booking = STORE.commit_booking(
+        BOOKING_RULES, date_str, room_code, company, email, start_hour, blocks, company_other
+    )
+    AVAILABILITY.add_booking(dict(booking))
+    return booking
+
+
+async def ensure_day(date_str: str) -> None:
+    """Load ``date_str`` into the availability index off the event loop if it is stale."""
+
+    if not AVAILABILITY.is_fresh(date_str):
+        await run_db(AVAILABILITY.ensure, date_str)
+
+
+def find_disabled_conflicts(date_str, room_code, start_hour, end_hour) -> bool:
+    """True when the index knows of a disabled slot in the range (no DB access)."""
+    return AVAILABILITY.has_disabled_conflict(date_str, room_code, start_hour, end_hour)
+
+
 def insert_disabled_slot(date_str: str, room_code: str, start_hour: int, blocks: int, note: Optional[str] = None) -> int:
     end_hour = start_hour + blocks
     if start_hour not in HOURS or end_hour > HOURS[-1] + 1:
         raise ValueError("Invalid start hour or duration")
 
-    conn = get_db()
-    try:
-        ensure_rooms_seeded(conn)
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT 1 FROM bookings
-            WHERE date=%s AND room_code=%s
-              AND NOT (%s <= start_hour OR end_hour <= %s)
-            LIMIT 1
-            """,
-            (date_str, room_code, end_hour, start_hour),
-        )
-        if cur.fetchone():
-            raise ValueError("A booking already exists in that period")
+    slot = STORE.add_disabled_slot(date_str, room_code, start_hour, end_hour, note or None)
+    AVAILABILITY.add_disabled(slot)
+    return slot["id"]
 
-        cur.execute(
-            """
-            SELECT 1 FROM disabled_slots
-            WHERE date=%s AND room_code=%s
-              AND NOT (%s <= start_hour OR end_hour <= %s)
-            LIMIT 1
-            """,
-            (date_str, room_code, end_hour, start_hour),
-        )
-        if cur.fetchone():
-            raise ValueError("Slot already disabled for that period")
 
-        cur.execute(
-            """
-            INSERT INTO disabled_slots (date, room_code, start_hour, end_hour, note, created_at)
-            VALUES (%s,%s,%s,%s,%s,NOW())
-            """,
-            (date_str, room_code, start_hour, end_hour, note or None),
-        )
-        conn.commit()
-        return cur.lastrowid
-    finally:
-        conn.close()
+def delete_disabled_slot(slot_id: int) -> None:
+    date_str = STORE.delete_disabled_slot(slot_id)
+    AVAILABILITY.remove_disabled(slot_id, date_str)
 
 
-def delete_disabled_slot(slot_id: int) -> None:
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM disabled_slots WHERE id=%s", (slot_id,))
-        if cur.rowcount == 0:
-            raise ValueError("Disabled slot not found")
-        conn.commit()
-    finally:
-        conn.close()
+# 한 번의 일괄 차단/해제 요청이 만들 수 있는 (룸, 날짜, 시간대) 조합 상한
+BULK_MAX_SLOTS = 1000
 
 
-def delete_booking(booking_id: int):
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM bookings WHERE id=%s", (booking_id,))
-        conn.commit()
-    finally:
-        conn.close()
+def slot_ranges(dates: List[str], rooms: List[str], bands: List[Tuple[int, int]]) -> List[SlotRange]:
+    """Expand rooms x dates x hour bands into ``SlotRange`` rows.
 
-def find_conflicts(date_str, room_code, start_hour, end_hour) -> bool:
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT 1 FROM bookings
-            WHERE date=%s AND room_code=%s
-              AND NOT (%s <= start_hour OR end_hour <= %s)
-            LIMIT 1
-            """,
-            (date_str, room_code, end_hour, start_hour),
-        )
-        return cur.fetchone() is not None
-    finally:
-        conn.close()
+    ``rooms`` takes room codes, tier names (every room of that tier) or
+    ``"all"``; ``dates`` takes event dates or ``"all"``.  Overlapping bands
+    are merged.  Raises ``ValueError`` on anything unknown or out of hours.
+    """
 
-def fetch_companies(tier=None):
-    conn = get_db()
-    try:
-        cur = conn.cursor(DictCursor)
-        if tier:
-            cur.execute("SELECT id, name, tier FROM companies WHERE tier=%s ORDER BY name", (tier,))
+    date_set: List[str] = []
+    for value in dates:
+        value = (value or "").strip()
+        picked = EVENT_DATES if value == "all" else [value]
+        for date_str in picked:
+            if date_str not in EVENT_DATES:
+                raise ValueError(f"Invalid date: {date_str}")
+            if date_str not in date_set:
+                date_set.append(date_str)
+
+    room_set: List[str] = []
+    for value in rooms:
+        value = (value or "").strip()
+        if value == "all":
+            picked = ALL_ROOM_CODES
+        elif value in ROOMS_BY_TIER:
+            picked = ROOMS_BY_TIER[value]
         else:
-            cur.execute("SELECT id, name, tier FROM companies ORDER BY name")
-        return list(cur.fetchall())
-    finally:
-        conn.close()
+            picked = [value]
+        for room_code in picked:
+            if room_code not in ROOM_LABEL:
+                raise ValueError(f"Invalid room: {room_code}")
+            if room_code not in room_set:
+                room_set.append(room_code)
+
+    merged: List[Tuple[int, int]] = []
+    for start_hour, end_hour in sorted((int(start), int(end)) for start, end in bands):
+        if start_hour not in HOURS or not start_hour < end_hour <= HOURS[-1] + 1:
+            raise ValueError(f"Invalid hours: {start_hour:02d}:00 – {end_hour:02d}:00")
+        if merged and start_hour < merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end_hour))
+        else:
+            merged.append((start_hour, end_hour))
+
+    if not (date_set and room_set and merged):
+        raise ValueError("Pick at least one date, one room and one time range")
+    if len(date_set) * len(room_set) * len(merged) > BULK_MAX_SLOTS:
+        raise ValueError(f"Too many slots in one request (max {BULK_MAX_SLOTS})")
+    return [
+        SlotRange(date_str, room_code, start_hour, end_hour)
+        for date_str in date_set for room_code in room_set for start_hour, end_hour in merged
+    ]
 
 
-def insert_company(name: str, tier: str) -> None:
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO companies (name, tier) VALUES (%s, %s)",
-            (name, tier),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+def bulk_disabled(action: str, ranges: List[SlotRange], note: Optional[str] = None) -> BulkResult:
+    """Disable or enable every range in one storage transaction and update the index."""
+
+    if action == "disable":
+        result = STORE.disable_slots(ranges, note or None)
+    elif action == "enable":
+        result = STORE.enable_slots(ranges)
+    else:
+        raise ValueError("action must be 'disable' or 'enable'")
+    removed_dates = {
+        slot_id: slot["date"] for slot in result.slots if slot["status"] == "enabled" for slot_id in slot["removed"]
+    }
+    for slot_id in result.removed:
+        AVAILABILITY.remove_disabled(slot_id, removed_dates.get(slot_id))
+    for slot in result.added:
+        AVAILABILITY.add_disabled(slot)
+    return result
+
+
+def bulk_summary(action: str, result: BulkResult, limit: int = 5) -> str:
+    counts: Dict[str, int] = defaultdict(int)
+    for slot in result.slots:
+        counts[slot["status"]] += 1
+
+    def label(slot: Dict[str, Any]) -> str:
+        return f"{slot['room_code']} {slot['date']} {slot['start_hour']:02d}:00–{slot['end_hour']:02d}:00"
+
+    if action == "disable":
+        parts = [f"Disabled {counts['disabled']} slot(s)."]
+        booked = [slot for slot in result.slots if slot["status"] == "booked"]
+        if booked:
+            more = f" (+{len(booked) - limit} more)" if len(booked) > limit else ""
+            parts.append(f"Skipped {len(booked)} with bookings: {', '.join(label(s) for s in booked[:limit])}{more}.")
+        if counts["already_disabled"]:
+            parts.append(f"{counts['already_disabled']} already disabled.")
+    else:
+        parts = [f"Enabled {counts['enabled']} slot(s) ({len(result.removed)} block(s) removed)."]
+        if counts["not_disabled"]:
+            parts.append(f"{counts['not_disabled']} had nothing disabled.")
+    return " ".join(parts)
+
+
+def delete_booking(booking_id: int):
+    date_str = STORE.delete_booking(booking_id)
+    AVAILABILITY.remove_booking(booking_id, date_str)
+
+def find_conflicts(date_str, room_code, start_hour, end_hour) -> bool:
+    """True when the index knows of a booking in the range (no DB access)."""
+    return AVAILABILITY.has_booking_conflict(date_str, room_code, start_hour, end_hour)
+
+_companies_cache: Dict[str, Any] = {"items": None, "loaded_at": 0.0}
+_companies_lock = threading.Lock()
+
+
+def _cached_companies() -> Optional[List[Dict[str, Any]]]:
+    with _companies_lock:
+        items = _companies_cache["items"]
+        if items is not None and monotonic() - _companies_cache["loaded_at"] < AVAILABILITY_TTL:
+            return items
+    return None
+
+
+def _store_companies(items: List[Dict[str, Any]]) -> None:
+    with _companies_lock:
+        if _companies_cache["items"] is not None and _companies_cache["items"] != items:
+            CHANGES.bump("companies")
+        _companies_cache.update(items=items, loaded_at=monotonic())
+
+
+def invalidate_companies() -> None:
+    with _companies_lock:
+        _companies_cache["items"] = None
+    CHANGES.bump("companies")
+
+
+def fetch_companies(tier=None):
+    """Company list (sorted by name), kept in memory for ``AVAILABILITY_TTL`` seconds."""
+
+    items = _cached_companies()
+    if items is None:
+        items = STORE.companies()
+        _store_companies(items)
+    if tier:
+        return [item for item in items if item["tier"] == tier]
+    return list(items)
+
+
+def insert_company(name: str, tier: str) -> None:
+    STORE.add_company(name, tier)
+    invalidate_companies()
 
 
 def remove_company(company_id: int) -> Tuple[bool, str]:
     """Delete a company if it has no bookings. Returns (ok, message)."""
 
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute("SELECT name FROM companies WHERE id=%s", (company_id,))
-        row = cur.fetchone()
-        if not row:
-            return False, "Company not found"
+    ok, message = STORE.remove_company(company_id)
+    if ok:
+        invalidate_companies()
+    return ok, message
 
-        company_name = row[0]
-        cur.execute("SELECT COUNT(*) FROM bookings WHERE company=%s", (company_name,))
-        count = int(cur.fetchone()[0] or 0)
-        if count:
-            conn.rollback()
-            return False, f"Cannot delete '{company_name}': {count} booking(s) exist."
 
-        cur.execute("DELETE FROM companies WHERE id=%s", (company_id,))
-        conn.commit()
-        return True, f"Deleted '{company_name}'"
-    finally:
-        conn.close()
+def import_companies(companies: List[Tuple[str, str]], replace: bool = False, dry_run: bool = False) -> Dict[str, Any]:
+    """Sync the company list in one transaction; see ``Storage.import_companies``."""
 
-def get_company_tier(name):
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute("SELECT tier FROM companies WHERE name=%s", (name.strip(),))
-        row = cur.fetchone()
-        return row[0] if row else None
-    finally:
-        conn.close()
+    summary = STORE.import_companies(companies, replace=replace, dry_run=dry_run)
+    if not dry_run and (summary["added"] or summary["retiered"] or summary["deleted"]):
+        invalidate_companies()
+    return summary
 
-def get_company_daily_total(date_str: str, company_name: str) -> int:
-    """특정 회사의 해당 날짜 총 예약 블록 수 합계 반환"""
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(blocks), 0)
-            FROM bookings
-            WHERE date=%s AND company=%s
-            """,
-            (date_str, company_name),
-        )
-        total = cur.fetchone()[0]
-        return int(total or 0)
-    finally:
-        conn.close()
+
+def load_admin_dashboard(date_str: str, room_code: Optional[str]) -> Dict[str, Any]:
+    """Bookings, disabled slots, windows and companies for ``/admin`` in one storage call.
+
+    The windows map refreshes the shared windows cache; companies are only
+    read when the cache has expired.
+    """
+
+    companies = _cached_companies()
+    data = STORE.admin_dashboard(date_str, room_code, with_companies=companies is None)
+    if companies is None:
+        companies = data["companies"]
+        _store_companies(companies)
+    windows = {
+        date_key: {"start": ensure_local_timezone(row["start"]), "end": ensure_local_timezone(row["end"])}
+        for date_key, row in data["windows"].items()
+    }
+    _store_windows(windows)
+    return {
+        "bookings": data["bookings"],
+        "disabled": data["disabled"],
+        "windows": windows,
+        "companies": list(companies),
+    }
 
 # --------------------------- pages ------------------------------
+# 상수로만 만들어지는 페이지는 한 번 렌더링해 gzip/br 본문과 함께 메모리에 둔다
+BOOKING_PAGE = StaticPage(
+    templates.env,
+    "booking.html",
+    dict(
+        event_dates=EVENT_DATES,
+        all_room_codes=ALL_ROOM_CODES,
+        room_label=ROOM_LABEL,
+        rooms_by_tier=ROOMS_BY_TIER,
+        hours=HOURS,
+        max_blocks=MAX_BLOCKS,
+    ),
+)
+LAUNCHER_PAGE = StaticPage(
+    templates.env,
+    "launcher.html",
+    dict(event_dates=EVENT_DATES, room_label=ROOM_LABEL, all_room_codes=ALL_ROOM_CODES),
+)
+ROOMS_PAGE = StaticPage(templates.env, "rooms.html", dict(rooms=ROOMS_SORTED))
+
+
+def _page_response(request: Request, page: RenderedPage) -> Response:
+    body, encoding, etag = negotiate(page, request.headers.get("accept-encoding", ""))
+    cached = _not_modified(request, etag)
+    if cached is not None:
+        cached.headers["Vary"] = "Accept-Encoding"
+        return cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="text/html; charset=utf-8", headers=headers)
+
+
 @app.get("/booking", response_class=HTMLResponse)
-def booking_page(request: Request):
+async def booking_page(request: Request):
     today = datetime.utcnow().date().isoformat()
     initial_date = get_default_event_date(today)
-    return templates.TemplateResponse(
-        "booking.html",
-        dict(
-            request=request,
-            event_dates=EVENT_DATES,
-            all_room_codes=ALL_ROOM_CODES,
-            room_label=ROOM_LABEL,
-            rooms_by_tier=ROOMS_BY_TIER,
-            hours=HOURS,
-            initial_date=initial_date,
-            max_blocks=MAX_BLOCKS,
-        ),
-    )
+    return _page_response(request, BOOKING_PAGE.render(initial_date=initial_date))
 
 @app.get("/launcher", response_class=HTMLResponse)
-def launcher_page(request: Request):
-    return templates.TemplateResponse(
-        "launcher.html",
-        dict(
-            request=request,
-            event_dates=EVENT_DATES,
-            room_label=ROOM_LABEL,
-            all_room_codes=ALL_ROOM_CODES,
-        ),
-    )
+async def launcher_page(request: Request):
+    return _page_response(request, LAUNCHER_PAGE.render())
 
 @app.get("/display", response_class=HTMLResponse)
-def display_page(request: Request, room: str, date: str):
+async def display_page(request: Request, room: str, date: str):
     if date not in EVENT_DATES:
         raise HTTPException(status_code=400, detail="Invalid date")
     if room not in ROOM_LABEL:
         raise HTTPException(status_code=400, detail="Invalid room")
 
-    raw = [r for r in fetch_bookings(date) if r["room_code"] == room]
+    await ensure_day(date)
+    raw, disabled_raw = AVAILABILITY.room(date, room)
     items = [
         {
             "company": r["company"],
@@ -977,7 +1192,6 @@ def display_page(request: Request, room: str, date: str):
         for r in raw
     ]
 
-    disabled_raw = fetch_disabled_slots(date, room)
     disabled_items = [
         {
             "room_code": r["room_code"],
@@ -1009,12 +1223,9 @@ def redirect_to_booking() -> RedirectResponse:
 
 
 @app.get("/rooms", response_class=HTMLResponse)
-def rooms_overview(request: Request):
+async def rooms_overview(request: Request):
     """Overview of rooms without tier segmentation."""
-    return templates.TemplateResponse(
-        "rooms.html",
-        dict(request=request, rooms=ROOMS_SORTED),
-    )
+    return _page_response(request, ROOMS_PAGE.render())
 @app.get("/admin", response_class=HTMLResponse)
 def admin_page(
     request: Request,
@@ -1028,16 +1239,15 @@ def admin_page(
     disable_error: str | None = None,
     window_msg: str | None = None,
     window_error: str | None = None,
+    rooms_msg: str | None = None,
+    rooms_error: str | None = None,
 ):
     date_val = date or get_default_event_date()
-    all_items = fetch_bookings(date_val)
     room_filter = room or None
-    if room_filter:
-        all_items = [x for x in all_items if x["room_code"] == room_filter]
-
-    disabled_items = fetch_disabled_slots(date_val, room_filter)
-
-    companies = fetch_companies()
+    dashboard = load_admin_dashboard(date_val, room_filter)
+    all_items = dashboard["bookings"]
+    disabled_items = dashboard["disabled"]
+    companies = dashboard["companies"]
     company_groups: Dict[str, List[Dict[str, Any]]] = {tier: [] for tier in COMPANY_MANAGED_TIERS}
     for item in companies:
         tier = item["tier"]
@@ -1059,12 +1269,12 @@ def admin_page(
         for name, values in sorted(email_targets_map.items(), key=lambda item: item[0].lower())
     ]
 
-    custom_windows = fetch_booking_windows_map()
+    custom_windows = dashboard["windows"]
     window_rows = []
     window_presets: Dict[str, Dict[str, Any]] = {}
     for event_date in EVENT_DATES:
         default_start, default_end = default_booking_window(event_date)
-        effective = get_effective_booking_window(event_date)
+        effective = get_effective_booking_window(event_date, custom_windows)
         window_rows.append(
             {
                 "date": event_date,
@@ -1138,6 +1348,9 @@ def admin_page(
             window_rows=window_rows,
             booking_window_presets=window_presets,
             timezone_label=TIMEZONE_LABEL,
+            rooms_msg=rooms_msg,
+            rooms_error=rooms_error,
+            rooms_catalog_version=ROOMS_CATALOG_VERSION,
         ),
     )
 
@@ -1146,10 +1359,18 @@ def admin_page(
 
 @app.post("/admin/send-email")
 def admin_send_email(
+    request: Request,
     date: str = Form(...),
     company: str = Form(...),
     room: str | None = Form(None),
+    idempotency_key: str | None = Form(None),
 ):
+    claim = request_claim("/admin/send-email", request.headers.get(KEY_HEADER) or idempotency_key,
+                          {"date": date, "company": company, "room": room or ""})
+    return REQUEST_KEYS.run(claim, partial(_admin_send_email, date, company, room))
+
+
+def _admin_send_email(date: str, company: str, room: Optional[str]) -> Response:
     redirect_params: List[Tuple[str, str]] = []
     if date:
         redirect_params.append(("date", date))
@@ -1157,15 +1378,21 @@ def admin_send_email(
         redirect_params.append(("room", room))
 
     try:
-        recipients, total = send_company_confirmation(date, company, dry_run=EMAIL_DRY_RUN)
+        recipients, total, queued, requeued = send_company_confirmation(date, company, dry_run=EMAIL_DRY_RUN)
         if EMAIL_DRY_RUN:
             message = (
                 f"[DRY RUN] Prepared email for {company} on {date} "
                 f"({total} booking(s), {recipients} recipient(s))."
             )
+        elif queued < recipients:
+            message = f"Queued {queued + requeued} of {recipients} email(s) for {company} on {date}"
+            if requeued:
+                message += f" ({requeued} previously sent or failed, queued again)"
+            skipped = recipients - queued - requeued
+            message += f"; {skipped} identical email(s) still waiting to be sent." if skipped else "."
         else:
             message = (
-                f"Sent {total} booking(s) to {recipients} recipient(s) "
+                f"Queued {total} booking(s) to {recipients} recipient(s) "
                 f"for {company} on {date}."
             )
         redirect_params.append(("email_msg", message))
@@ -1179,11 +1406,131 @@ def admin_send_email(
 
     qs = "&".join(f"{key}={quote_plus(str(value))}" for key, value in redirect_params if value)
     url = f"/admin?{qs}" if qs else "/admin"
-    return RedirectResponse(url=url, status_code=303)
+    response = RedirectResponse(url=url, status_code=303)
+    if any(key == "email_error" for key, _ in redirect_params):
+        raise NotApplied(response)
+    return response
+
+
+def check_window_open(window_info: Dict[str, Any]) -> None:
+    if not window_info["is_open"]:
+        raise BookingRejected(
+            403,
+            "Booking is closed for this date."
+            f" Allowed time: {format_window_label(window_info['start'])} – {format_window_label(window_info['end'])}.",
+            "window_closed",
+        )
+
+
+def book_if_open(
+    date_str: str,
+    room_code: str,
+    company: str,
+    email: str,
+    start_hour: int,
+    blocks: int,
+    company_other: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Check the booking window and commit; one blocking call for ``/book``."""
+
+    check_window_open(booking_window_status(date_str))
+    return commit_booking(date_str, room_code, company, email, start_hour, blocks, company_other)
+
+
+def precheck_booking(
+    date_str: str,
+    room_code: str,
+    company: str,
+    email: str,
+    start_hour: int,
+    blocks: int,
+    company_other: Optional[str] = None,
+) -> None:
+    """Reject a ``/book`` request for a slot the availability index already shows as taken.
+
+    Only in-memory state is read, so a rush for a taken slot is answered
+    before the admission gate.  The request first goes through
+    ``check_booking`` against the company cache and the index's copy of the
+    day; only a request that passes the company, tier, hour and daily-limit
+    rules there is turned away here, so the status codes are the ones
+    ``commit_booking`` would return.  Whatever the caches can't vouch for
+    goes on to ``commit_booking``, which checks again under its locks.
+    """
+
+    companies = _cached_companies()
+    day = AVAILABILITY.peek_day(date_str)
+    if companies is None or day is None:
+        return
+    tiers = {row["name"]: row["tier"] for row in companies}
+    # DB 의 회사명 비교는 대소문자를 가리지 않는다: 하루 합계를 적게 세지 않도록 맞춘다
+    totals: Dict[str, int] = {}
+    for rows in day[0].values():
+        for row in rows:
+            totals[row["company"].casefold()] = totals.get(row["company"].casefold(), 0) + int(row["blocks"])
+    try:
+        booking = check_booking(
+            BOOKING_RULES, date_str, room_code, company, email, start_hour, blocks, company_other,
+            company_tier=tiers.get,
+            daily_total=lambda name: totals.get(name.casefold(), 0),
+            room_ranges=list,
+            disabled_ranges=list,
+        )
+    except BookingRejected:
+        return  # 검증 오류는 트랜잭션이 같은 순서로 다시 내도록 넘긴다
+    start_hour, end_hour = booking["start_hour"], booking["end_hour"]
+    if find_conflicts(date_str, room_code, start_hour, end_hour):
+        raise BookingRejected(409, "Time slot already taken", "conflict")
+    if find_disabled_conflicts(date_str, room_code, start_hour, end_hour):
+        raise BookingRejected(409, "Time slot blocked by administrator", "disabled")
+
+
+# 창이 열리는 순간의 /book 폭주를 DB 앞에서 줄 세우거나 429 로 돌려보낸다
+BOOK_GATE = AdmissionGate(BOOK_CONCURRENCY, BOOK_QUEUE, BOOK_QUEUE_WAIT)
+BOOK_IP_LIMIT = RateLimiter(BOOK_IP_RATE, BOOK_IP_BURST)
+BOOK_COMPANY_LIMIT = RateLimiter(BOOK_COMPANY_RATE, BOOK_COMPANY_BURST)
+
+
+def _admission_samples():
+    return [({"state": "active"}, BOOK_GATE.active), ({"state": "queued"}, BOOK_GATE.queued)]
+
+
+METRICS.gauges("apec_book_admission", "POST /book requests inside the admission gate and waiting for it.",
+               _admission_samples)
+
+
+def _check_rate(request: Request, company: str, company_other: Optional[str]) -> None:
+    client = request.client.host if request.client else "unknown"
+    wait = BOOK_IP_LIMIT.take(client)
+    if wait:
+        raise Overloaded("rate_ip", wait)
+    name = (company_other if company == "Other" else company) or ""
+    wait = BOOK_COMPANY_LIMIT.take(name.strip().lower())
+    if wait:
+        raise Overloaded("rate_company", wait)
+
+
+def _booking_redirect(booking: Dict[str, Any], date: str, room: str, company: str, email: str) -> RedirectResponse:
+    company_to_save = booking["company"]
+
+    # 리다이렉트(입력 복원)
+    params = {
+        "ok": "1",
+        "date": date,
+        "room": room,
+        "blocks": str(booking["blocks"]),
+        "picked": str(booking["start_hour"]),
+        "company": "Other" if company == "Other" else company_to_save,
+        "email": email,
+    }
+    if company == "Other":
+        params["company_other"] = company_to_save
+    qs = "&".join(f"{k}={quote_plus(v)}" for k, v in params.items())
+    return RedirectResponse(url=f"/booking?{qs}", status_code=303)
 
 
 @app.post("/book")
-def create_booking(
+async def create_booking(
+    request: Request,
     company: str = Form(...),          # select 값 ('Other' 포함)
     email: str = Form(...),
     tier: str = Form(...),             # 클라이언트에서 세팅되지만 서버에서 검증
@@ -1192,115 +1539,387 @@ def create_booking(
     start_hour: int = Form(...),
     blocks: int = Form(...),
     company_other: str | None = Form(None),  # Other일 때 수동 입력
+    idempotency_key: str | None = Form(None),  # booking.html 이 폼마다 만든다 (헤더가 우선)
 ):
     company = (company or "").strip()
     room = (room or "").strip()
     email = (email or "").strip()
 
     if date not in EVENT_DATES:
+        BOOKINGS_TOTAL.inc("rejected", "invalid")
         raise HTTPException(status_code=400, detail="Invalid date")
     if room not in ROOM_LABEL:
+        BOOKINGS_TOTAL.inc("rejected", "invalid")
         raise HTTPException(status_code=400, detail="Invalid room")
 
-    window_info = booking_window_status(date)
-    if not window_info["is_open"]:
-        message = (
-            "Booking is closed for this date."
-            f" Allowed time: {format_window_label(window_info['start'])} – {format_window_label(window_info['end'])}."
-        )
-        raise HTTPException(status_code=403, detail=message)
-
-    # --- 회사/티어 확정 ---
-    if company == "Other":
-        real_company = (company_other or "").strip()
-        if not real_company:
-            raise HTTPException(status_code=400, detail="Company name required for Other")
-        tier = "Other"
-        company_to_save = real_company
-    else:
-        db_tier = get_company_tier(company)
-        if not db_tier:
-            raise HTTPException(status_code=400, detail="Unknown company")
-        tier = db_tier
-        company_to_save = company.strip()
-
-    allowed_rooms = ROOMS_BY_TIER.get(tier, [])
-    if allowed_rooms and room not in allowed_rooms:
-        raise HTTPException(status_code=403, detail="Selected room not available for this tier")
-
-    # --- 시간/블록 검증 ---
-    blocks = max(1, min(MAX_BLOCKS, int(blocks)))
-    start_hour = int(start_hour)
-    end_hour = start_hour + blocks
-    if start_hour not in HOURS or end_hour > HOURS[-1] + 1:
-        raise HTTPException(status_code=400, detail="Invalid start hour")
+    def book() -> Response:
+        booking = book_if_open(date, room, company, email, start_hour, blocks, company_other)
+        return _booking_redirect(booking, date, room, company, email)
 
-    # --- 하루 총 2시간 제한(모든 티어/모든 룸 합산) ---
-    current_total = get_company_daily_total(date, company_to_save)  # 현재까지 합계(블록)
-    if current_total + blocks > MAX_BLOCKS:
+    # --- 예약 창 확인 + 검증 + 저장 (단일 트랜잭션, DB 스레드 한 번) ---
+    # 창이 닫힌 동안의 요청은 스레드/DB 를 거치지 않고 이벤트 루프에서 바로 거절
+    # 인덱스가 이미 찬 것으로 아는 시간대도 여기서 409 (트랜잭션이 어차피 다시 검사)
+    # 열린 뒤에는 토큰 버킷과 입장 대기열을 통과한 요청만 DB 로 보낸다
+    # 같은 idempotency key 의 재전송(더블클릭, 타임아웃 후 재시도)은 저장된 리다이렉트를 돌려준다:
+    # 창 확인/사전 검사에 걸려도 키가 있으면 저장된 결과부터 찾는다 (그 사이 창이 닫혔거나 자리가 찼다)
+    try:
+        claim = request_claim("/book", request.headers.get(KEY_HEADER) or idempotency_key, {
+            "company": company, "email": email, "tier": tier, "date": date, "room": room,
+            "start_hour": start_hour, "blocks": blocks, "company_other": company_other or "",
+        })
+        await booking_windows_async()
+        response = None
+        try:
+            check_window_open(booking_window_status(date))
+            precheck_booking(date, room, company, email, start_hour, blocks, company_other)
+        except BookingRejected:
+            if claim is not None:
+                response = await run_db(REQUEST_KEYS.replay, claim)
+            if response is None:
+                raise
+        if response is None:
+            _check_rate(request, company, company_other)
+            async with BOOK_GATE.admit():
+                response = await run_db(REQUEST_KEYS.run, claim, book)
+    except BookingRejected as exc:
+        BOOKINGS_TOTAL.inc("rejected", exc.reason)
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+    except Overloaded as exc:
+        BOOKINGS_TOTAL.inc("shed", exc.reason)
         raise HTTPException(
-            status_code=409,
-            detail=f"Daily limit exceeded: {company_to_save} already has {current_total}h booked on {date}. Max {MAX_BLOCKS}h/day."
+            status_code=429,
+            detail="Too many booking requests right now; please retry shortly.",
+            headers={"Retry-After": str(exc.retry_after)},
         )
+    except HTTPException:
+        BOOKINGS_TOTAL.inc("rejected", "idempotency")
+        raise
+    except Exception:
+        BOOKINGS_TOTAL.inc("failed", "error")
+        raise
+    BOOKINGS_TOTAL.inc("replayed" if REPLAYED_HEADER in response.headers else "accepted", "")
+    return response
 
-    # --- 룸 시간대 충돌 ---
-    if find_conflicts(date, room, start_hour, end_hour):
-        raise HTTPException(status_code=409, detail="Time slot already taken")
-    if find_disabled_conflicts(date, room, start_hour, end_hour):
-        raise HTTPException(status_code=409, detail="Time slot blocked by administrator")
+# ---------------------- conditional GET (ETag) ----------------------
+def _etag(*parts: Any) -> str:
+    # 회사명/룸 등 사용자 입력이 섞이므로 해시로 헤더에 안전한 값만 남긴다
+    digest = hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:16]
+    return f'W/"{CHANGES.boot}-{digest}"'
 
-    # --- 저장 ---
-    insert_booking(date, room, tier, company_to_save, email, start_hour, blocks)
 
-    # 리다이렉트(입력 복원)
-    params = {
-        "ok": "1",
-        "date": date,
-        "room": room,
-        "blocks": str(blocks),
-        "picked": str(start_hour),
-        "company": "Other" if company == "Other" else company_to_save,
-        "email": email,
-    }
-    if company == "Other":
-        params["company_other"] = company_to_save
-    qs = "&".join(f"{k}={quote_plus(v)}" for k, v in params.items())
-    return RedirectResponse(url=f"/booking?{qs}", status_code=303)
+def _not_modified(request: Request, etag: str, last_modified: Optional[float] = None) -> Optional[Response]:
+    """Return a 304 response when the client's validators still match.
+
+    ``If-None-Match`` wins; ``If-Modified-Since`` is only consulted when the
+    caller passes ``last_modified`` (purely data-versioned responses).
+    """
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        tags = {tag.strip() for tag in inm.split(",")}
+        if "*" in tags or etag in tags or etag[2:] in tags:
+            return Response(status_code=304, headers=headers)
+        return None
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return None
+        if int(last_modified) <= since:
+            headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+            return Response(status_code=304, headers=headers)
+    return None
+
+
+def _conditional_json(payload: Any, etag: str, last_modified: Optional[float] = None) -> JSONResponse:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return JSONResponse(jsonable_encoder(payload), headers=headers)
+
+
+def _companies_etag(tier: Optional[str]) -> str:
+    # 다른 워커의 변경은 버전에 안 잡히므로 TTL 단위 bucket을 섞어 주기적으로 재검증
+    bucket = int(datetime.now().timestamp() // max(AVAILABILITY_TTL, 1))
+    return _etag("companies", tier or "", CHANGES.version("companies"), bucket)
+
 
 @app.get("/api/availability")
-def availability(date: str, room: str):
+async def availability(request: Request, date: str, room: str):
     if date not in EVENT_DATES:
         return JSONResponse({"error": "invalid date"}, status_code=400)
-    rows = fetch_bookings(date)
-    busy = [r for r in rows if r["room_code"] == room]
-    disabled = fetch_disabled_slots(date, room)
+    await ensure_day(date)
+    key = f"day:{date}"
+    etag = _etag(date, room, CHANGES.version(key))
+    last_modified = CHANGES.last_modified(key)
+    cached = _not_modified(request, etag, last_modified)
+    if cached is not None:
+        return cached
+    busy, disabled = AVAILABILITY.room(date, room)
     taken = [(int(r["start_hour"]), int(r["end_hour"])) for r in busy]
     taken.extend((int(r["start_hour"]), int(r["end_hour"])) for r in disabled)
-    return {"room": room, "date": date, "taken": taken, "items": busy, "disabled": disabled}
+    payload = {"room": room, "date": date, "taken": taken, "items": busy, "disabled": disabled}
+    return _conditional_json(payload, etag, last_modified)
+
+SLOT_FREE, SLOT_BOOKED, SLOT_DISABLED = "0", "1", "2"
+
+
+def _room_grid_entry(
+    bookings: List[Dict[str, Any]], disabled: List[Dict[str, Any]], masks: Tuple[int, int]
+) -> Dict[str, Any]:
+    """Compact state of one room/day; also the payload of ``slots`` stream events.
+
+    ``slots`` is one character per entry in ``HOURS``: ``0`` free, ``1`` booked,
+    ``2`` disabled, taken from the ``(booked, disabled)`` hour bitmaps so every
+    worker shows the shared table's state.  ``items`` / ``disabled`` come from
+    this worker's rows.  Only the fields the pages render are included.
+    """
+
+    booked_mask, disabled_mask = masks
+    slots = "".join(
+        SLOT_BOOKED if booked_mask >> i & 1 else SLOT_DISABLED if disabled_mask >> i & 1 else SLOT_FREE
+        for i in range(len(HOURS))
+    )
+    return {
+        "slots": slots,
+        "items": [
+            {
+                "company": r["company"],
+                "tier": r["tier"],
+                "start_hour": int(r["start_hour"]),
+                "end_hour": int(r["end_hour"]),
+            }
+            for r in bookings
+        ],
+        "disabled": [
+            {
+                "start_hour": int(r["start_hour"]),
+                "end_hour": int(r["end_hour"]),
+                "note": r.get("note") or "",
+            }
+            for r in disabled
+        ],
+    }
+
+
+def _availability_grid(
+    date_str: str,
+    company: Optional[str],
+    windows: Dict[str, Dict[str, datetime]],
+    now: datetime,
+) -> Dict[str, Any]:
+    """Per-room occupancy for one day plus window status and daily total."""
+
+    bookings, disabled = AVAILABILITY.day(date_str)
+    rooms = {
+        code: _room_grid_entry(bookings.get(code, []), disabled.get(code, []), AVAILABILITY.masks(date_str, code))
+        for code in ALL_ROOM_CODES
+    }
+
+    status = booking_window_status(date_str, now=now, windows=windows)
+    grid: Dict[str, Any] = {
+        "date": date_str,
+        "rooms": rooms,
+        "window": {
+            "is_open": status["is_open"],
+            "start": status["start"].isoformat(),
+            "end": status["end"].isoformat(),
+            "start_display": format_window_label(status["start"]),
+            "end_display": format_window_label(status["end"]),
+            "source": status["source"],
+            "seconds_until_open": round(status["seconds_until_open"], 1),
+            "seconds_until_close": round(status["seconds_until_close"], 1),
+        },
+    }
+    if company:
+        total = sum(
+            int(r["blocks"])
+            for rows in bookings.values()
+            for r in rows
+            if r["company"] == company
+        )
+        grid["daily"] = {"total": total, "limit": MAX_BLOCKS}
+    return grid
+
+
+def _grid_etag(dates: List[str], company: Optional[str], windows, now: datetime) -> str:
+    parts: List[Any] = [company or "", CHANGES.version("windows")]
+    for date_str in dates:
+        AVAILABILITY.ensure(date_str)
+        status = booking_window_status(date_str, now=now, windows=windows)
+        parts.extend((date_str, CHANGES.version(f"day:{date_str}"), int(status["is_open"])))
+    return _etag("grid", *parts)
+
+
+@app.get("/api/availability/grid")
+def availability_grid(request: Request, date: str, company: str | None = None):
+    """Every room's occupancy for ``date`` in one response (booking page refresh)."""
+    if date not in EVENT_DATES:
+        return JSONResponse({"error": "invalid date"}, status_code=400)
+    now = datetime.now(LOCAL_TIMEZONE)
+    windows = cached_booking_windows()
+    company_val = (company or "").strip() or None
+    etag = _grid_etag([date], company_val, windows, now)
+    cached = _not_modified(request, etag)
+    if cached is not None:
+        return cached
+    grid = _availability_grid(date, company_val, windows, now)
+    grid["hours"] = HOURS
+    grid["now"] = now.isoformat()
+    return _conditional_json(grid, etag)
+
+
+@app.get("/api/availability/grid/all")
+def availability_grid_all(request: Request, company: str | None = None):
+    """``/api/availability/grid`` for every entry in ``EVENT_DATES``."""
+    now = datetime.now(LOCAL_TIMEZONE)
+    windows = cached_booking_windows()
+    company_val = (company or "").strip() or None
+    etag = _grid_etag(EVENT_DATES, company_val, windows, now)
+    cached = _not_modified(request, etag)
+    if cached is not None:
+        return cached
+    payload = {
+        "hours": HOURS,
+        "now": now.isoformat(),
+        "dates": {d: _availability_grid(d, company_val, windows, now) for d in EVENT_DATES},
+    }
+    return _conditional_json(payload, etag)
+
+
+@app.get("/api/availability/stream")
+async def availability_stream(request: Request, date: str, room: str | None = None):
+    """Server-Sent Events for one date (optionally one room).
+
+    ``slots`` carries the full new state of a changed room, ``reset`` asks the
+    client to reload the day (history gap or change made by another worker).
+    Reconnecting clients resume from ``Last-Event-ID``; comment lines keep
+    idle connections alive every ``SSE_HEARTBEAT`` seconds.
+    """
+    if date not in EVENT_DATES:
+        return JSONResponse({"error": "invalid date"}, status_code=400)
+    if room and room not in ROOM_LABEL:
+        return JSONResponse({"error": "invalid room"}, status_code=400)
+
+    def match(data: Dict[str, Any]) -> bool:
+        return data.get("date") == date and (not room or data.get("room") in (None, room))
+
+    last_id = EVENTS.parse_id(
+        request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    )
+    sub, backlog, current_id = EVENTS.subscribe(match, last_id)
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            sent = last_id or 0
+            if backlog is None:
+                yield format_sse("reset", {"date": date}, EVENTS.wire_id(current_id))
+                sent = current_id
+            else:
+                for seq, event, data in backlog:
+                    yield format_sse(event, data, EVENTS.wire_id(seq))
+                    sent = seq
+                if last_id is None:
+                    yield format_sse("hello", {"date": date, "room": room}, EVENTS.wire_id(current_id))
+                    sent = current_id
+            while True:
+                try:
+                    seq, event, data = await asyncio.wait_for(sub.queue.get(), timeout=SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # TTL 만료 시 재적재 → 다른 워커의 변경이 reset 이벤트로 전달됨
+                    # (run_db 의 DB_THREADS 한도 안에서, 신선하면 스레드도 안 쓴다)
+                    await ensure_day(date)
+                    yield ": ping\n\n"
+                    continue
+                if seq <= sent:
+                    continue
+                sent = seq
+                yield format_sse(event, data, EVENTS.wire_id(seq))
+        finally:
+            EVENTS.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @app.get("/api/companies")
-def api_companies(tier: str | None = None):
+def api_companies(request: Request, tier: str | None = None):
     if tier and tier not in ROOMS_BY_TIER:
         return JSONResponse({"error": "invalid tier"}, status_code=400)
-    return {"items": fetch_companies(tier)}
+    etag = _companies_etag(tier)
+    cached = _not_modified(request, etag)
+    if cached is not None:
+        return cached
+    return _conditional_json({"items": fetch_companies(tier)}, etag)
 
 # 프런트 사전 안내용: 하루 총합 사용시간
 @app.get("/api/daily_check")
-def api_daily_check(date: str, company: str):
+async def api_daily_check(date: str, company: str):
     if date not in EVENT_DATES:
         return {"ok": False, "reason": "invalid date"}
-    total = get_company_daily_total(date, company)
+    # 안내용이므로 인덱스 기준; 실제 한도는 commit_booking 트랜잭션이 검사
+    await ensure_day(date)
+    bookings, _ = AVAILABILITY.day(date)
+    total = sum(int(r["blocks"]) for rows in bookings.values() for r in rows if r["company"] == company)
     return {"ok": True, "total": total, "limit": MAX_BLOCKS}
 
 
+@app.get("/api/db_pool")
+def api_db_pool():
+    """Connection pool counters: size, idle/in-use, checkouts and wait time."""
+    return DB_POOL.stats()
+
+
+def _pool_samples():
+    if STORAGE != "mysql":
+        return []
+    stats = DB_POOL.stats()
+    return [({"stat": key}, value) for key, value in stats.items()]
+
+
+METRICS.gauges("apec_db_pool", "Connection pool counters and current size (see /api/db_pool).", _pool_samples)
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition for this worker process."""
+    return Response(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/email_outbox")
+def api_email_outbox():
+    """Outbox rows per status plus this process's worker counters."""
+    conn = get_db()
+    try:
+        counts = outbox_counts(conn)
+    finally:
+        conn.close()
+    worker = OUTBOX_WORKER
+    return {
+        "counts": counts,
+        "worker": dict(worker.stats, alive=worker.is_alive()) if worker is not None else None,
+    }
+
+
 @app.get("/api/booking_window")
-def api_booking_window(date: str):
+async def api_booking_window(request: Request, date: str):
     if date not in EVENT_DATES:
         return JSONResponse({"error": "invalid date"}, status_code=400)
 
+    await booking_windows_async()
     status = booking_window_status(date)
+    etag = _etag("window", date, CHANGES.version("windows"), int(status["is_open"]))
+    cached = _not_modified(request, etag)
+    if cached is not None:
+        return cached
     default_start, default_end = default_booking_window(date)
-    return {
+    payload = {
         "date": date,
         "start": status["start"].isoformat(),
         "end": status["end"].isoformat(),
@@ -1308,6 +1927,10 @@ def api_booking_window(date: str):
         "end_display": format_window_label(status["end"]),
         "is_open": status["is_open"],
         "now": status["now"].isoformat(),
+        # 304 로 재사용될 수 있으므로 클라이언트는 "받은 시각 + 초" 로 환산해 한 번만 새로고침 예약
+        "seconds_until_open": round(status["seconds_until_open"], 1),
+        "seconds_until_close": round(status["seconds_until_close"], 1),
+        "next_change": status["next_change"].isoformat() if status["next_change"] else None,
         "source": status["source"],
         "custom": status["custom"],
         "timezone": TIMEZONE_LABEL,
@@ -1316,6 +1939,7 @@ def api_booking_window(date: str):
         "default_start_display": format_window_label(default_start),
         "default_end_display": format_window_label(default_end),
     }
+    return _conditional_json(payload, etag)
 
 
 # ----------------- Admin: Booking window settings -----------------
@@ -1391,12 +2015,21 @@ def admin_booking_window_reset(
 # -------------------- Admin: Disabled slots --------------------
 @app.post("/admin/disabled/add")
 def admin_disabled_add(
+    request: Request,
     date: str = Form(...),
     room: str = Form(...),
     start_hour: int = Form(...),
     blocks: int = Form(...),
     note: str | None = Form(None),
+    idempotency_key: str | None = Form(None),
 ):
+    claim = request_claim("/admin/disabled/add", request.headers.get(KEY_HEADER) or idempotency_key, {
+        "date": date, "room": room, "start_hour": start_hour, "blocks": blocks, "note": note or "",
+    })
+    return REQUEST_KEYS.run(claim, partial(_admin_disabled_add, date, room, start_hour, blocks, note))
+
+
+def _admin_disabled_add(date: str, room: str, start_hour: int, blocks: int, note: Optional[str]) -> Response:
     redirect_params: List[Tuple[str, str]] = []
     if date:
         redirect_params.append(("date", date))
@@ -1428,7 +2061,10 @@ def admin_disabled_add(
     qs = ""
     if redirect_params:
         qs = "?" + "&".join(f"{key}={quote_plus(value)}" for key, value in redirect_params)
-    return RedirectResponse(url=f"/admin{qs}", status_code=303)
+    response = RedirectResponse(url=f"/admin{qs}", status_code=303)
+    if message[0] == "disable_error":
+        raise NotApplied(response)
+    return response
 
 
 @app.post("/admin/disabled/delete")
@@ -1456,9 +2092,108 @@ def admin_disabled_delete(
     return RedirectResponse(url=f"/admin{qs}", status_code=303)
 
 
+@app.post("/admin/disabled/bulk")
+def admin_disabled_bulk(
+    request: Request,
+    dates: List[str] = Form(...),
+    rooms: List[str] = Form(...),
+    start_hour: int = Form(...),
+    end_hour: int = Form(...),
+    action: str = Form("disable"),
+    note: str | None = Form(None),
+    idempotency_key: str | None = Form(None),
+):
+    claim = request_claim("/admin/disabled/bulk", request.headers.get(KEY_HEADER) or idempotency_key, {
+        "dates": ",".join(dates), "rooms": ",".join(rooms), "start_hour": start_hour, "end_hour": end_hour,
+        "action": action, "note": note or "",
+    })
+    return REQUEST_KEYS.run(
+        claim, partial(_admin_disabled_bulk, dates, rooms, start_hour, end_hour, action, (note or "").strip())
+    )
+
+
+def _admin_disabled_bulk(dates: List[str], rooms: List[str], start_hour: int, end_hour: int,
+                         action: str, note: str) -> Response:
+    redirect_params: List[Tuple[str, str]] = []
+    if len(dates) == 1 and dates[0] in EVENT_DATES:
+        redirect_params.append(("date", dates[0]))
+    if len(rooms) == 1 and rooms[0] in ROOM_LABEL:
+        redirect_params.append(("room", rooms[0]))
+    try:
+        result = bulk_disabled(action, slot_ranges(dates, rooms, [(start_hour, end_hour)]), note)
+    except ValueError as exc:
+        redirect_params.append(("disable_error", str(exc)))
+    except Exception:
+        logger.exception("Bulk %s of disabled slots failed", action)
+        redirect_params.append(("disable_error", f"Failed to {action} time slots"))
+    else:
+        redirect_params.append(("disable_msg", bulk_summary(action, result)))
+
+    qs = "?" + "&".join(f"{key}={quote_plus(value)}" for key, value in redirect_params)
+    response = RedirectResponse(url=f"/admin{qs}", status_code=303)
+    if redirect_params[-1][0] == "disable_error":
+        raise NotApplied(response)
+    return response
+
+
+@app.post("/api/admin/disabled/bulk")
+async def api_admin_disabled_bulk(payload: Dict[str, Any] = Body(...)):
+    """Bulk disable/enable as JSON, with one outcome per room x date x band.
+
+    Body: ``{"action": "disable"|"enable", "dates": [...], "rooms": [...],
+    "ranges": [[start_hour, end_hour], ...], "note": "..."}``; rooms may be
+    codes, tier names or ``"all"``, dates may be ``"all"``.
+    """
+
+    action = payload.get("action", "disable")
+    try:
+        ranges = slot_ranges(
+            list(payload.get("dates") or []), list(payload.get("rooms") or []),
+            [tuple(band) for band in payload.get("ranges") or []],
+        )
+        result = await run_db(bulk_disabled, action, ranges, (payload.get("note") or "").strip())
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"action": action, "summary": bulk_summary(action, result), "slots": jsonable_encoder(result.slots)}
+
+
+# -------------------- Admin: Room catalog ----------------------
+@app.post("/admin/rooms/resync")
+def admin_rooms_resync(date: str | None = Form(None), room: str | None = Form(None)):
+    redirect_params: List[Tuple[str, str]] = []
+    if date:
+        redirect_params.append(("date", date))
+    if room:
+        redirect_params.append(("room", room))
+
+    try:
+        sync_room_catalog(force=True)
+    except Exception as exc:
+        redirect_params.append(("rooms_error", f"Failed to sync room catalog: {exc}"))
+    else:
+        redirect_params.append(
+            ("rooms_msg", f"Synced {len(ROOMS_DATA)} room(s) (catalog {ROOMS_CATALOG_VERSION})")
+        )
+
+    qs = "?" + "&".join(f"{key}={quote_plus(value)}" for key, value in redirect_params)
+    return RedirectResponse(url=f"/admin{qs}", status_code=303)
+
+
 # ------------------------ Admin: Delete -------------------------
 @app.post("/admin/delete")
-def admin_delete(booking_id: int = Form(...), date: str | None = Form(None), room: str | None = Form(None)):
+def admin_delete(
+    request: Request,
+    booking_id: int = Form(...),
+    date: str | None = Form(None),
+    room: str | None = Form(None),
+    idempotency_key: str | None = Form(None),
+):
+    claim = request_claim("/admin/delete", request.headers.get(KEY_HEADER) or idempotency_key,
+                          {"booking_id": booking_id, "date": date or "", "room": room or ""})
+    return REQUEST_KEYS.run(claim, partial(_admin_delete, booking_id, date, room))
+
+
+def _admin_delete(booking_id: int, date: Optional[str], room: Optional[str]) -> Response:
     """
     예약 삭제 후 /admin 으로 리다이렉트. (필터가 유지되도록 date/room 전달 지원)
     """
@@ -1489,8 +2224,8 @@ def admin_company_add(tier: str = Form(...), name: str = Form(...)):
     else:
         try:
             insert_company(name, tier)
-        except IntegrityError:
-            params.append(("company_error", f"'{name}' already exists"))
+        except DuplicateCompany as exc:
+            params.append(("company_error", str(exc)))
         else:
             params.append(("company_msg", f"Added '{name}' to {tier}"))
 
@@ -1508,6 +2243,59 @@ def admin_company_delete(company_id: int = Form(...)):
     return RedirectResponse(url=f"/admin{qs}", status_code=303)
 
 
+@app.post("/admin/companies/import")
+def admin_company_import(
+    request: Request,
+    file: UploadFile | None = File(None),
+    data: str | None = Form(None),
+    replace: bool = Form(False),
+    dry_run: bool = Form(False),
+    idempotency_key: str | None = Form(None),
+):
+    text = data or ""
+    if file is not None and file.filename:
+        text = file.file.read().decode("utf-8-sig", errors="replace")
+    claim = request_claim("/admin/companies/import", request.headers.get(KEY_HEADER) or idempotency_key, {
+        "data": hashlib.sha256(text.encode("utf-8")).hexdigest(), "replace": replace, "dry_run": dry_run,
+    })
+    return REQUEST_KEYS.run(claim, partial(_admin_company_import, text, replace, dry_run))
+
+
+def _admin_company_import(text: str, replace: bool, dry_run: bool) -> Response:
+    try:
+        summary = import_companies(parse_companies(text, COMPANY_MANAGED_TIERS), replace, dry_run)
+    except ImportRejected as exc:
+        key, message = "company_error", str(exc)
+    except Exception:
+        logger.exception("Company import failed")
+        key, message = "company_error", "Company import failed"
+    else:
+        key, message = "company_msg", summary_text(summary)
+    response = RedirectResponse(url=f"/admin?{key}={quote_plus(message)}", status_code=303)
+    if key == "company_error":
+        raise NotApplied(response)
+    return response
+
+
+@app.post("/api/admin/companies/import")
+async def api_admin_company_import(request: Request, replace: bool = False, dry_run: bool = False):
+    """Sync companies from a CSV (``text/csv``) or JSON body; returns the diff that was applied.
+
+    ``?replace=true`` also deletes companies missing from the body, except
+    those with bookings (listed under ``kept``); ``?dry_run=true`` only
+    reports the diff.
+    """
+
+    body = (await request.body()).decode("utf-8-sig", errors="replace")
+    fmt = "csv" if "csv" in request.headers.get("content-type", "") else None
+    try:
+        companies = parse_companies(body, COMPANY_MANAGED_TIERS, fmt)
+    except ImportRejected as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    summary = await run_db(import_companies, companies, replace, dry_run)
+    return dict(summary, summary=summary_text(summary))
+
+
 if __name__ == "__main__":
     import uvicorn
 
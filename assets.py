@@ -0,0 +1,92 @@
+import json
+import mimetypes
+import os
+from typing import Any, Dict, Set
+from urllib.parse import quote, unquote
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+from page_cache import accepts_encoding
+
+
+# build_assets.py 가 만든 static/build/manifest.json 을 읽는다.  빌드가 없으면
+# 원본 파일 URL 을 그대로 돌려주므로 개발 환경에서도 템플릿이 깨지지 않는다.
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=300"
+
+
+class AssetManifest:
+    def __init__(self, static_dir: str, url_prefix: str = "/static"):
+        self.url_prefix = url_prefix
+        self.files: Dict[str, str] = {}
+        self.photos: Dict[str, Dict[str, Any]] = {}
+        path = os.path.join(static_dir, "build", "manifest.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            self.files = data.get("files", {})
+            self.photos = data.get("photos", {})
+
+    def url(self, name: str) -> str:
+        """Fingerprinted URL of ``static/<name>``, or the original when not built."""
+
+        return self.files.get(name) or f"{self.url_prefix}/{quote(name)}"
+
+    def photo(self, url: str) -> Dict[str, Any]:
+        """Responsive variants for a ``/static/...`` photo URL.
+
+        ``srcset`` maps ``avif`` / ``webp`` / ``jpg`` to ``srcset`` strings;
+        it is empty (and ``src`` is the original) when the photo wasn't built.
+        """
+
+        name = unquote(url[len(self.url_prefix) + 1:]) if url.startswith(self.url_prefix + "/") else url
+        entry = self.photos.get(name)
+        if entry is None:
+            return {"src": url, "srcset": {}, "width": None, "height": None}
+        return entry
+
+
+class AssetFiles(StaticFiles):
+    """``StaticFiles`` with cache headers and precompressed ``.br`` / ``.gz`` siblings.
+
+    Fingerprinted files under ``build/`` are immutable for a year; everything
+    else is revalidated after five minutes.  When ``<file>.br`` or
+    ``<file>.gz`` exists and the client accepts that encoding, the sibling is
+    sent with ``Content-Encoding`` and the original's content type.
+    """
+
+    def __init__(self, *, directory: str, **kwargs: Any):
+        super().__init__(directory=directory, **kwargs)
+        self.precompressed: Set[str] = set()
+        for root, _dirs, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith((".br", ".gz")):
+                    self.precompressed.add(os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, "/"))
+
+    async def get_response(self, path: str, scope):
+        encoding = None
+        served = path
+        if path + ".br" in self.precompressed or path + ".gz" in self.precompressed:
+            accept = Headers(scope=scope).get("accept-encoding", "")
+            for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+                if path + suffix in self.precompressed and accepts_encoding(accept, candidate):
+                    encoding, served = candidate, path + suffix
+                    break
+
+        response = await super().get_response(served, scope)
+        if response.status_code in (200, 304):
+            immutable = path.startswith("build/") and path != "build/manifest.json"
+            response.headers["cache-control"] = IMMUTABLE if immutable else REVALIDATE
+        if served != path:
+            response.headers["vary"] = "Accept-Encoding"
+            if response.status_code == 200:
+                response.headers["content-encoding"] = encoding
+                media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                if media_type.startswith("text/"):
+                    media_type += "; charset=utf-8"
+                response.headers["content-type"] = media_type
+        elif path + ".br" in self.precompressed or path + ".gz" in self.precompressed:
+            response.headers["vary"] = "Accept-Encoding"
+        return response
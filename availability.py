@@ -0,0 +1,355 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from occupancy import SharedOccupancy
+
+
+Row = Dict[str, Any]
+DayLoader = Callable[[str], Tuple[Iterable[Row], Iterable[Row]]]
+
+
+class ChangeTracker:
+    """Per-key change versions used to build ETags / Last-Modified headers.
+
+    Versions only mean something inside one process, so every tag also carries
+    a random boot token; a restarted or different worker never produces a
+    false 304.
+    """
+
+    def __init__(self):
+        self.boot = os.urandom(4).hex()
+        self._versions: Dict[str, int] = {}
+        self._modified: Dict[str, float] = {}
+        self._started = time.time()
+        self._lock = threading.Lock()
+
+    def bump(self, key: str) -> int:
+        with self._lock:
+            version = self._versions.get(key, 0) + 1
+            self._versions[key] = version
+            self._modified[key] = time.time()
+            return version
+
+    def version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def last_modified(self, key: str) -> float:
+        return self._modified.get(key, self._started)
+
+
+# rows_attr -> SharedOccupancy.apply 인자
+_SHARED_SET = {"bookings": "set_booked", "disabled": "set_disabled"}
+_SHARED_CLEAR = {"bookings": "clear_booked", "disabled": "clear_disabled"}
+
+
+def _sort_key(row: Row):
+    return (int(row["start_hour"]), int(row["end_hour"]))
+
+
+class _Day:
+    """Bookings and disabled slots of one event date, bucketed by room."""
+
+    def __init__(self, generation: int):
+        self.bookings: Dict[str, List[Row]] = {}
+        self.disabled: Dict[str, List[Row]] = {}
+        self.booked_mask: Dict[str, int] = {}
+        self.disabled_mask: Dict[str, int] = {}
+        self.loaded_at = time.monotonic()
+        self.generation = generation
+        self.fingerprint: frozenset = frozenset()
+        # SharedOccupancy 의 날짜 generation (이 값과 다르면 다른 worker 가 썼다)
+        self.shared_generation: Optional[int] = None
+
+
+class AvailabilityIndex:
+    """In-process per-(date, room) occupancy index.
+
+    Each room/date keeps an hour bitmap (bit ``h - first_hour``) for bookings
+    and for disabled slots, so overlap checks are a single AND.  Writers update
+    the index right after their DB commit; a day is reloaded from the database
+    through ``loader`` when it is missing or older than ``ttl`` seconds, which
+    also picks up writes made by other processes.  ``on_change(date, room)`` is
+    called after every local write, and with ``room=None`` whenever a reload
+    finds different data or a day is dropped.
+
+    With ``shared`` (a :class:`occupancy.SharedOccupancy`) every worker also
+    publishes its masks and writes to one cross-process table.  A loaded day
+    is then stale as soon as the table's generation for it moves, not only
+    after ``ttl``, and conflict checks read the shared masks directly.
+    """
+
+    def __init__(
+        self,
+        loader: DayLoader,
+        hours: List[int],
+        ttl: float = 30.0,
+        on_change: Optional[Callable[[str, Optional[str]], Any]] = None,
+        shared: Optional[SharedOccupancy] = None,
+    ):
+        self._loader = loader
+        self._shared = shared
+        self._on_change = on_change
+        self._first_hour = hours[0]
+        self.ttl = ttl
+        self._days: Dict[str, _Day] = {}
+        self._generations: Dict[str, int] = {}
+        self._booking_loc: Dict[int, Tuple[str, str]] = {}
+        self._disabled_loc: Dict[int, Tuple[str, str]] = {}
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------ bitmaps
+    def span_mask(self, start_hour: int, end_hour: int) -> int:
+        start = max(int(start_hour) - self._first_hour, 0)
+        end = max(int(end_hour) - self._first_hour, 0)
+        if end <= start:
+            return 0
+        return ((1 << (end - start)) - 1) << start
+
+    # ------------------------------------------------------------ loading
+    def _fresh(self, date_str: str, day: Optional[_Day]) -> bool:
+        if day is None or (time.monotonic() - day.loaded_at) >= self.ttl:
+            return False
+        if self._shared is not None:
+            shared_generation = self._shared.generation(date_str)
+            return shared_generation is None or shared_generation == day.shared_generation
+        return True
+
+    def _day(self, date_str: str) -> _Day:
+        with self._lock:
+            day = self._days.get(date_str)
+            if self._fresh(date_str, day):
+                return day
+            generation = self._generations.get(date_str, 0)
+
+        expected = self._shared.generation(date_str) if self._shared is not None else None
+        bookings, disabled = self._loader(date_str)
+        day = _Day(generation)
+        for row in bookings:
+            self._place(day, "bookings", "booked_mask", row)
+        for row in disabled:
+            self._place(day, "disabled", "disabled_mask", row)
+        self._refingerprint(day)
+        if self._shared is not None:
+            rooms = set(day.booked_mask) | set(day.disabled_mask)
+            day.shared_generation = self._shared.publish(
+                date_str,
+                {room: (day.booked_mask.get(room, 0), day.disabled_mask.get(room, 0)) for room in rooms},
+                expected,
+            )
+            if day.shared_generation is None and expected is not None:
+                # 읽는 사이 다른 worker 가 썼다: 이 스냅샷은 다음 읽기에서 다시 로드
+                day.loaded_at = 0.0
+
+        changed = False
+        with self._lock:
+            previous = self._days.get(date_str)
+            if self._generations.get(date_str, 0) != generation:
+                # A write landed while we were reading; our snapshot may miss it.
+                day.loaded_at = 0.0
+            self._forget_locations(date_str)
+            self._days[date_str] = day
+            for room, rows in day.bookings.items():
+                for row in rows:
+                    self._booking_loc[int(row["id"])] = (date_str, room)
+            for room, rows in day.disabled.items():
+                for row in rows:
+                    self._disabled_loc[int(row["id"])] = (date_str, room)
+            changed = previous is not None and previous.fingerprint != day.fingerprint
+        if changed:
+            self._notify(date_str, None)
+        return day
+
+    def is_fresh(self, date_str: str) -> bool:
+        """True when ``date_str`` is loaded and within its TTL (reads won't hit the loader)."""
+
+        with self._lock:
+            return self._fresh(date_str, self._days.get(date_str))
+
+    def ensure(self, date_str: str) -> None:
+        """Load or refresh ``date_str`` if its TTL expired (no-op when fresh)."""
+
+        self._day(date_str)
+
+    def _forget_locations(self, date_str: str) -> None:
+        for table in (self._booking_loc, self._disabled_loc):
+            stale = [key for key, (d, _) in table.items() if d == date_str]
+            for key in stale:
+                del table[key]
+
+    def _place(self, day: _Day, rows_attr: str, mask_attr: str, row: Row) -> None:
+        room = row["room_code"]
+        rows = getattr(day, rows_attr).setdefault(room, [])
+        rows.append(row)
+        rows.sort(key=_sort_key)
+        masks = getattr(day, mask_attr)
+        masks[room] = masks.get(room, 0) | self.span_mask(row["start_hour"], row["end_hour"])
+
+    @staticmethod
+    def _refingerprint(day: _Day) -> None:
+        day.fingerprint = frozenset(
+            (kind, int(row["id"]), int(row["start_hour"]), int(row["end_hour"]))
+            for kind, rooms in (("b", day.bookings), ("d", day.disabled))
+            for rows in rooms.values()
+            for row in rows
+        )
+
+    def _rebuild_mask(self, day: _Day, rows_attr: str, mask_attr: str, room: str) -> None:
+        mask = 0
+        for row in getattr(day, rows_attr).get(room, []):
+            mask |= self.span_mask(row["start_hour"], row["end_hour"])
+        getattr(day, mask_attr)[room] = mask
+
+    def invalidate(self, date_str: Optional[str] = None) -> None:
+        with self._lock:
+            if date_str is None:
+                dropped = list(self._days)
+                for loaded in dropped:
+                    self._bump(loaded)
+                self._days.clear()
+                self._booking_loc.clear()
+                self._disabled_loc.clear()
+            else:
+                dropped = [date_str]
+                self._bump(date_str)
+                self._days.pop(date_str, None)
+                self._forget_locations(date_str)
+        if self._shared is not None:
+            self._shared.invalidate(date_str)
+        for dropped_date in dropped:
+            self._notify(dropped_date, None)
+
+    # -------------------------------------------------------------- reads
+    def room(self, date_str: str, room_code: str) -> Tuple[List[Row], List[Row]]:
+        """Return ``(bookings, disabled)`` for one room, ordered by start hour."""
+
+        day = self._day(date_str)
+        with self._lock:
+            return list(day.bookings.get(room_code, [])), list(day.disabled.get(room_code, []))
+
+    def day(self, date_str: str) -> Tuple[Dict[str, List[Row]], Dict[str, List[Row]]]:
+        day = self._day(date_str)
+        with self._lock:
+            return (
+                {room: list(rows) for room, rows in day.bookings.items()},
+                {room: list(rows) for room, rows in day.disabled.items()},
+            )
+
+    def _loaded_day(self, date_str: str) -> Optional[_Day]:
+        with self._lock:
+            day = self._days.get(date_str)
+            return day if self._fresh(date_str, day) else None
+
+    def peek_day(self, date_str: str) -> Optional[Tuple[Dict[str, List[Row]], Dict[str, List[Row]]]]:
+        """Like :meth:`day`, but ``None`` instead of loading when the day isn't fresh."""
+
+        day = self._loaded_day(date_str)
+        if day is None:
+            return None
+        with self._lock:
+            return (
+                {room: list(rows) for room, rows in day.bookings.items()},
+                {room: list(rows) for room, rows in day.disabled.items()},
+            )
+
+    def masks(self, date_str: str, room_code: str, *, load: bool = True) -> Optional[Tuple[int, int]]:
+        """``(booked, disabled)`` hour bitmaps; from the shared table when it has the date.
+
+        Otherwise from this worker's copy of the day, loaded first; with
+        ``load=False`` the database is never touched and ``None`` means the
+        copy isn't fresh.
+        """
+
+        if self._shared is not None:
+            shared = self._shared.masks(date_str, room_code)
+            if shared is not None:
+                return shared
+        day = self._day(date_str) if load else self._loaded_day(date_str)
+        if day is None:
+            return None
+        return day.booked_mask.get(room_code, 0), day.disabled_mask.get(room_code, 0)
+
+    # 아래 둘은 DB 없이 답한다: 모르면 False (저장소 트랜잭션이 어차피 다시 검사)
+    def has_booking_conflict(self, date_str: str, room_code: str, start_hour: int, end_hour: int) -> bool:
+        masks = self.masks(date_str, room_code, load=False)
+        return masks is not None and bool(masks[0] & self.span_mask(start_hour, end_hour))
+
+    def has_disabled_conflict(self, date_str: str, room_code: str, start_hour: int, end_hour: int) -> bool:
+        masks = self.masks(date_str, room_code, load=False)
+        return masks is not None and bool(masks[1] & self.span_mask(start_hour, end_hour))
+
+    # ------------------------------------------------------------- writes
+    def _notify(self, date_str: str, room_code: Optional[str]) -> None:
+        if self._on_change:
+            self._on_change(date_str, room_code)
+
+    def _bump(self, date_str: str) -> Optional[_Day]:
+        self._generations[date_str] = self._generations.get(date_str, 0) + 1
+        return self._days.get(date_str)
+
+    def _share(self, date_str: str, room: str, day: Optional[_Day], **change: int) -> None:
+        """Mirror a local write into the shared table; call with ``self._lock`` held."""
+
+        if self._shared is None:
+            return
+        moved = self._shared.apply(date_str, room, **change)
+        if day is None or moved is None:
+            return
+        before, after = moved
+        if day.shared_generation == before:
+            day.shared_generation = after
+        else:
+            # 다른 worker 의 쓰기를 아직 못 봤다: 다음 읽기에서 다시 로드
+            day.loaded_at = 0.0
+
+    def _add(self, rows_attr: str, mask_attr: str, locations: Dict[int, Tuple[str, str]], row: Row) -> None:
+        date_str = str(row["date"])
+        with self._lock:
+            day = self._bump(date_str)
+            if day is not None:
+                self._place(day, rows_attr, mask_attr, row)
+                self._refingerprint(day)
+                locations[int(row["id"])] = (date_str, row["room_code"])
+            span = self.span_mask(row["start_hour"], row["end_hour"])
+            self._share(date_str, row["room_code"], day, **{_SHARED_SET[rows_attr]: span})
+        self._notify(date_str, row["room_code"])
+
+    def _remove(self, rows_attr: str, mask_attr: str, locations: Dict[int, Tuple[str, str]], row_id: int,
+                date_str: Optional[str]) -> None:
+        with self._lock:
+            loc = locations.pop(int(row_id), None)
+            if loc is not None:
+                date_str, room = loc
+                day = self._bump(date_str)
+                if day is not None:
+                    rows = getattr(day, rows_attr).get(room, [])
+                    span = 0
+                    for r in rows:
+                        if int(r["id"]) == int(row_id):
+                            span |= self.span_mask(r["start_hour"], r["end_hour"])
+                    getattr(day, rows_attr)[room] = [r for r in rows if int(r["id"]) != int(row_id)]
+                    self._rebuild_mask(day, rows_attr, mask_attr, room)
+                    self._refingerprint(day)
+                    self._share(date_str, room, day, **{_SHARED_CLEAR[rows_attr]: span})
+                elif self._shared is not None:
+                    self._shared.invalidate(date_str)
+        if loc is not None:
+            self._notify(*loc)
+        elif date_str is not None:
+            # 이 worker 가 모르는 행(다른 worker 가 넣었다): 그 날짜만 다시 읽게 한다
+            self.invalidate(date_str)
+
+    def add_booking(self, row: Row) -> None:
+        self._add("bookings", "booked_mask", self._booking_loc, row)
+
+    def remove_booking(self, booking_id: int, date_str: Optional[str] = None) -> None:
+        """Forget a deleted booking; ``date_str`` (its date) is flushed if the id isn't loaded here."""
+
+        self._remove("bookings", "booked_mask", self._booking_loc, booking_id, date_str)
+
+    def add_disabled(self, row: Row) -> None:
+        self._add("disabled", "disabled_mask", self._disabled_loc, row)
+
+    def remove_disabled(self, slot_id: int, date_str: Optional[str] = None) -> None:
+        self._remove("disabled", "disabled_mask", self._disabled_loc, slot_id, date_str)
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""Replay the booking-window opening rush against the app and report latency.
+
+Every company from ``models.sql`` (plus ``--extra-companies`` synthetic Gold
+sponsors) waits on one start signal and then hits ``POST /book`` for the same
+popular rooms and morning hours, retrying the next hour on a conflict like a
+person would.  Meanwhile ``--tablets`` display clients poll
+``/api/availability`` with their ETag.  Afterwards the bookings are read back
+from storage and checked for double bookings, daily-limit overruns and
+bookings on disabled slots.
+
+By default the app runs in-process (``httpx.ASGITransport``) on a throw-away
+SQLite file::
+
+    python bench_rush.py --extra-companies 300 --tablets 40
+
+``--storage mysql`` uses the MySQL settings from ``.env`` (use a scratch
+database: ``--clear`` deletes the bench date's bookings first).  ``--url``
+drives an already running server instead; the invariant check then opens
+the same storage from the environment.  Results go to ``--out`` as JSON;
+``--compare`` prints the change against an earlier result file.
+
+Needs ``httpx`` (``pip install httpx``), which the app itself does not.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    sys.exit("bench_rush.py needs httpx: pip install httpx")
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--storage", choices=["sqlite", "xml", "mysql"], default="sqlite")
+    parser.add_argument("--url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--date", help="event date to book (default: first EVENT_DATES entry)")
+    parser.add_argument("--extra-companies", type=int, default=200, help="synthetic Gold sponsors added to models.sql")
+    parser.add_argument("--retries", type=int, default=3, help="next-hour retries per company after a conflict")
+    parser.add_argument("--jitter", type=float, default=0.25, help="spread of the rush start, seconds")
+    parser.add_argument("--tablets", type=int, default=20, help="display tablets polling /api/availability")
+    parser.add_argument("--poll", type=float, default=1.0, help="tablet poll interval, seconds")
+    parser.add_argument("--duration", type=float, default=10.0, help="how long tablets keep polling, seconds")
+    parser.add_argument("--clear", action="store_true", help="delete the bench date's bookings before the run")
+    parser.add_argument("--shed-retries", type=int, default=5, help="retries per company after a 429 (honours Retry-After)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (room/hour choices, jitter)")
+    parser.add_argument("--out", help="result file (default: bench-results/<time>-<storage>.json)")
+    parser.add_argument("--compare", help="earlier result file to diff against")
+    return parser.parse_args(argv)
+
+
+# ---------------------------------------------------------------- setup
+def seed_companies_from_models(path: str = os.path.join(HERE, "models.sql")) -> List[Tuple[str, str]]:
+    """``(name, tier)`` pairs from the ``INSERT ... INTO companies`` seed in models.sql."""
+
+    with open(path, encoding="utf-8") as fh:
+        sql = fh.read()
+    match = re.search(r"INSERT\s+IGNORE\s+INTO\s+companies\s*\(name,\s*tier\)\s*VALUES(.*?);", sql, re.S | re.I)
+    if not match:
+        raise RuntimeError("companies seed not found in models.sql")
+    return [
+        (name.replace("''", "'"), tier)
+        for name, tier in re.findall(r"\('((?:[^']|'')*)',\s*'((?:[^']|'')*)'\)", match.group(1))
+    ]
+
+
+def load_app(args):
+    """Import app.py configured for the chosen storage (in-process mode and invariant check)."""
+
+    os.environ["STORAGE"] = args.storage
+    os.environ.setdefault("OUTBOX_ENABLED", "0")
+    if not args.url:
+        # 모든 가상 회사가 같은 주소에서 오므로 IP 토큰 버킷은 끈다
+        os.environ.setdefault("BOOK_IP_RATE", "0")
+    if args.storage in ("sqlite", "xml") and not args.url:
+        scratch = tempfile.mkdtemp(prefix="apec-bench-")
+        os.environ["SQLITE_PATH"] = os.path.join(scratch, "bench.sqlite3")
+        os.environ["XML_PATH"] = os.path.join(scratch, "bench.xml")
+    sys.path.insert(0, HERE)
+    os.chdir(HERE)
+    import app  # noqa: E402  (설정 환경변수를 먼저 잡아야 한다)
+
+    return app
+
+
+def _rush_window(app) -> Tuple[datetime, datetime]:
+    # 지금 시각을 포함하는 창으로 열어 두고, 실제 "오픈 순간"은 start 신호로 맞춘다
+    now = app.to_local_naive(datetime.now(app.LOCAL_TIMEZONE)).replace(minute=0, second=0, microsecond=0)
+    return now, now + timedelta(hours=3)
+
+
+def prepare(app, args, companies: List[Tuple[str, str]], date_str: str) -> None:
+    """In-process setup straight through the app helpers."""
+
+    from storage import DuplicateCompany
+
+    for name, tier in companies:
+        try:
+            app.insert_company(name, tier)
+        except DuplicateCompany:
+            pass
+    if args.clear:
+        for row in app.fetch_bookings(date_str):
+            app.delete_booking(row["id"])
+    app.upsert_booking_window(date_str, *_rush_window(app))
+
+
+async def prepare_remote(client, app, args, companies: List[Tuple[str, str]], date_str: str) -> None:
+    """``--url`` setup through the admin endpoints, so the server drops its own caches.
+
+    ``Other``-tier seeds can't be added from /admin; on MySQL models.sql already has them.
+    """
+
+    for name, tier in companies:
+        if tier in app.COMPANY_MANAGED_TIERS:
+            await client.post("/admin/companies/add", data={"tier": tier, "name": name})
+    if args.clear:
+        for row in app.fetch_bookings(date_str):
+            await client.post("/admin/delete", data={"booking_id": str(row["id"])})
+    start, end = _rush_window(app)
+    response = await client.post("/admin/booking-window", data={
+        "target_date": date_str,
+        "start_date": start.date().isoformat(), "start_hour": str(start.hour),
+        "end_date": end.date().isoformat(), "end_hour": str(end.hour),
+    })
+    if "window_error" in response.headers.get("location", ""):
+        raise RuntimeError(f"could not open the booking window: {response.headers['location']}")
+
+
+# ------------------------------------------------------------ recording
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+        self.started = 0.0
+        self.finished = 0.0
+
+    def record(self, endpoint: str, seconds: float, outcome: str) -> None:
+        self.latencies[endpoint].append(seconds)
+        self.outcomes[endpoint][outcome] += 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    rank = max(0, min(len(sorted_values), math.ceil(pct / 100.0 * len(sorted_values))) - 1)
+    return sorted_values[rank]
+
+
+def _book_outcome(response: "httpx.Response") -> str:
+    if response.status_code == 303:
+        return "accepted"
+    try:
+        detail = response.json().get("detail", "")
+    except ValueError:
+        detail = response.text[:60]
+    # 회사명/날짜가 섞인 메시지는 앞부분만 남겨 묶는다
+    return f"{response.status_code} {str(detail).split(':')[0]}"
+
+
+# ------------------------------------------------------------- clients
+async def company_client(client, rec: Recorder, start: asyncio.Event, rng: random.Random, args, app,
+                         name: str, tier: str, date_str: str) -> None:
+    rooms = app.ROOMS_BY_TIER.get(tier) or app.ALL_ROOM_CODES
+    # 인기 룸/오전 시간에 몰리도록 앞쪽에 가중치
+    room = rooms[min(int(rng.expovariate(1.0)), len(rooms) - 1)]
+    hour = app.HOURS[min(int(rng.expovariate(0.7)), len(app.HOURS) - 1)]
+    blocks = rng.choice((1, 2, 2))
+    delay = rng.uniform(0, args.jitter)
+    await start.wait()
+    await asyncio.sleep(delay)
+    attempt = shed = 0
+    while attempt <= args.retries:
+        started = time.perf_counter()
+        try:
+            response = await client.post("/book", data={
+                "company": name, "email": "bench@example.com", "tier": tier, "date": date_str,
+                "room": room, "start_hour": str(hour), "blocks": str(blocks),
+            })
+            outcome = _book_outcome(response)
+        except httpx.HTTPError as exc:
+            outcome = f"error {type(exc).__name__}"
+        rec.record("POST /book", time.perf_counter() - started, outcome)
+        if outcome.startswith("429") and shed < args.shed_retries:
+            shed += 1
+            await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+            continue
+        if not outcome.startswith("409 Time slot"):
+            return
+        attempt += 1
+        hour = app.HOURS[(app.HOURS.index(hour) + 1) % len(app.HOURS)]
+
+
+async def tablet_client(client, rec: Recorder, start: asyncio.Event, rng: random.Random, args,
+                        room: str, date_str: str) -> None:
+    await start.wait()
+    await asyncio.sleep(rng.uniform(0, args.poll))
+    etag: Optional[str] = None
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        headers = {"If-None-Match": etag} if etag else {}
+        started = time.perf_counter()
+        try:
+            response = await client.get("/api/availability", params={"date": date_str, "room": room}, headers=headers)
+            outcome = str(response.status_code)
+            etag = response.headers.get("etag", etag)
+        except httpx.HTTPError as exc:
+            outcome = f"error {type(exc).__name__}"
+        rec.record("GET /api/availability", time.perf_counter() - started, outcome)
+        await asyncio.sleep(args.poll)
+
+
+async def run_rush(app, args, companies: List[Tuple[str, str]], date_str: str) -> Recorder:
+    rng = random.Random(args.seed)
+    rec = Recorder()
+    start = asyncio.Event()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60.0)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app.app), base_url="http://bench", timeout=60.0)
+    async with client:
+        if args.url:
+            await prepare_remote(client, app, args, companies, date_str)
+        tasks = [
+            asyncio.create_task(company_client(
+                client, rec, start, random.Random(rng.random()), args, app, name, tier, date_str,
+            ))
+            for name, tier in companies
+        ]
+        tasks += [
+            asyncio.create_task(tablet_client(
+                client, rec, start, random.Random(rng.random()), args,
+                app.ALL_ROOM_CODES[i % len(app.ALL_ROOM_CODES)], date_str,
+            ))
+            for i in range(args.tablets)
+        ]
+        await asyncio.sleep(0.1)
+        rec.started = time.perf_counter()
+        start.set()
+        await asyncio.gather(*tasks)
+        rec.finished = time.perf_counter()
+    return rec
+
+
+# ----------------------------------------------------------- invariants
+def check_invariants(app, date_str: str) -> List[str]:
+    """Double bookings, daily-limit overruns and bookings on disabled slots for ``date_str``."""
+
+    bookings = app.fetch_bookings(date_str)
+    disabled = app.fetch_disabled_slots(date_str)
+    problems: List[str] = []
+    by_room: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    per_company: Counter = Counter()
+    for row in bookings:
+        by_room[row["room_code"]].append(row)
+        per_company[row["company"]] += int(row["blocks"])
+    for room, rows in by_room.items():
+        rows.sort(key=lambda r: r["start_hour"])
+        for prev, cur in zip(rows, rows[1:]):
+            if cur["start_hour"] < prev["end_hour"]:
+                problems.append(
+                    f"double booking {room} {prev['start_hour']}-{prev['end_hour']} ({prev['company']}) "
+                    f"vs {cur['start_hour']}-{cur['end_hour']} ({cur['company']})"
+                )
+        for slot in disabled:
+            if slot["room_code"] != room:
+                continue
+            for row in rows:
+                if row["start_hour"] < slot["end_hour"] and slot["start_hour"] < row["end_hour"]:
+                    problems.append(f"booking on disabled slot {room} {row['start_hour']}-{row['end_hour']}")
+    for company, total in per_company.items():
+        if total > app.MAX_BLOCKS:
+            problems.append(f"daily limit exceeded: {company} has {total}h")
+    return problems
+
+
+# -------------------------------------------------------------- report
+def summarize(rec: Recorder, problems: List[str], args, date_str: str, bookings_stored: int) -> Dict[str, Any]:
+    elapsed = max(rec.finished - rec.started, 1e-9)
+    endpoints = {}
+    for endpoint, values in sorted(rec.latencies.items()):
+        ordered = sorted(values)
+        endpoints[endpoint] = {
+            "requests": len(ordered),
+            "throughput_rps": round(len(ordered) / elapsed, 1),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+            "outcomes": dict(rec.outcomes[endpoint].most_common()),
+        }
+    return {
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "target": args.url or f"in-process ({args.storage})",
+        "storage": args.storage,
+        "date": date_str,
+        "settings": {
+            key: getattr(args, key)
+            for key in ("extra_companies", "retries", "jitter", "tablets", "poll", "duration", "seed")
+        },
+        "elapsed_s": round(elapsed, 3),
+        "total_rps": round(sum(len(v) for v in rec.latencies.values()) / elapsed, 1),
+        "endpoints": endpoints,
+        "bookings_stored": bookings_stored,
+        "invariant_violations": problems,
+    }
+
+
+def print_report(result: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> None:
+    print(f"{result['target']}  date={result['date']}  elapsed={result['elapsed_s']}s  total={result['total_rps']} req/s")
+    for endpoint, stats in result["endpoints"].items():
+        line = (
+            f"  {endpoint:<24} n={stats['requests']:<6} {stats['throughput_rps']:>8} req/s  "
+            f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms max={stats['max_ms']}ms"
+        )
+        before = (previous or {}).get("endpoints", {}).get(endpoint)
+        if before:
+            line += "  (p95 {:+.2f}ms, p99 {:+.2f}ms vs previous)".format(
+                stats["p95_ms"] - before["p95_ms"], stats["p99_ms"] - before["p99_ms"]
+            )
+        print(line)
+        for outcome, count in stats["outcomes"].items():
+            print(f"      {count:>6}  {outcome}")
+    print(f"  bookings stored: {result['bookings_stored']}")
+    if result["invariant_violations"]:
+        print(f"  INVARIANT VIOLATIONS ({len(result['invariant_violations'])}):")
+        for problem in result["invariant_violations"][:20]:
+            print(f"    {problem}")
+    else:
+        print("  invariants: ok (no double bookings, limits and disabled slots respected)")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    app = load_app(args)
+    date_str = args.date or app.EVENT_DATES[0]
+    if date_str not in app.EVENT_DATES:
+        sys.exit(f"--date must be one of {app.EVENT_DATES}")
+
+    companies = seed_companies_from_models()
+    companies += [(f"Bench Co {i:03d}", "Gold") for i in range(args.extra_companies)]
+    if not args.url:
+        prepare(app, args, companies, date_str)
+
+    rec = asyncio.run(run_rush(app, args, companies, date_str))
+    problems = check_invariants(app, date_str)
+    result = summarize(rec, problems, args, date_str, len(app.fetch_bookings(date_str)))
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            previous = json.load(fh)
+    print_report(result, previous)
+
+    out = args.out or os.path.join(
+        HERE, "bench-results", f"{datetime.now():%Y%m%d-%H%M%S}-{args.storage}.json"
+    )
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump(result, fh, ensure_ascii=False, indent=2)
+    print(f"  result written to {out}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Build fingerprinted, compressed static assets into ``static/build/``.
+
+* Room photos (``static/rooms/*``) → responsive widths as AVIF, WebP and a
+  JPEG fallback, named ``<slug>-<width>.<hash>.<ext>``.
+* ``style.css`` and the logo → ``<name>.<hash>.<ext>``; text files also get
+  ``.gz`` / ``.br`` siblings for the static handler to serve as-is.
+* ``static/build/manifest.json`` maps the source names to the built URLs;
+  ``assets.AssetManifest`` reads it at startup.  Without a build the app
+  falls back to the original files.
+
+Run on deploy (needs Pillow; ``brotli`` optional)::
+
+    python build_assets.py
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+from typing import Any, Dict, List
+
+try:
+    from PIL import Image, features
+except ImportError:  # pragma: no cover
+    sys.exit("build_assets.py needs Pillow: pip install Pillow")
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(HERE, "static")
+BUILD_DIR = os.path.join(STATIC_DIR, "build")
+URL_PREFIX = "/static/build"
+
+PHOTO_WIDTHS = (480, 960, 1600)
+PHOTO_DIRS = ("rooms",)
+FINGERPRINTED = ("style.css", "logo-apec.png")
+PRECOMPRESS_EXTS = (".css", ".js", ".svg", ".html")
+COMPRESS_MIN_BYTES = 512
+
+# 포맷별 인코더 설정 (AVIF 는 Pillow 빌드에 따라 없을 수 있다)
+PHOTO_FORMATS = [
+    ("avif", "AVIF", {"quality": 55}),
+    ("webp", "WEBP", {"quality": 78, "method": 6}),
+    ("jpg", "JPEG", {"quality": 80, "optimize": True, "progressive": True}),
+]
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()[:10]
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def _write(rel_path: str, data: bytes) -> str:
+    path = os.path.join(BUILD_DIR, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(data)
+    return f"{URL_PREFIX}/{rel_path}"
+
+
+def _precompress(rel_path: str, data: bytes) -> None:
+    if len(data) < COMPRESS_MIN_BYTES:
+        return
+    _write(rel_path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(rel_path + ".br", brotli.compress(data, quality=11))
+
+
+def build_photo(source_dir: str, filename: str) -> Dict[str, Any]:
+    with Image.open(os.path.join(STATIC_DIR, source_dir, filename)) as original:
+        original.load()
+        image = original.convert("RGB")
+    widths = sorted({w for w in PHOTO_WIDTHS if w < image.width} | {min(image.width, PHOTO_WIDTHS[-1])})
+    stem = _slug(os.path.splitext(filename)[0])
+    srcsets: Dict[str, List[str]] = {}
+    largest: Dict[str, str] = {}
+    for width in widths:
+        height = round(image.height * width / image.width)
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for ext, fmt, options in PHOTO_FORMATS:
+            if fmt == "AVIF" and not features.check("avif"):
+                continue
+            buf = io.BytesIO()
+            resized.save(buf, fmt, **options)
+            data = buf.getvalue()
+            url = _write(f"{source_dir}/{stem}-{width}.{_digest(data)}.{ext}", data)
+            srcsets.setdefault(ext, []).append(f"{url} {width}w")
+            largest[ext] = url
+    return {
+        "width": widths[-1],
+        "height": round(image.height * widths[-1] / image.width),
+        "src": largest["jpg"],
+        "srcset": {ext: ", ".join(items) for ext, items in srcsets.items()},
+    }
+
+
+def build_file(filename: str) -> str:
+    with open(os.path.join(STATIC_DIR, filename), "rb") as fh:
+        data = fh.read()
+    stem, ext = os.path.splitext(filename)
+    rel_path = f"{stem}.{_digest(data)}{ext}"
+    url = _write(rel_path, data)
+    if ext in PRECOMPRESS_EXTS:
+        _precompress(rel_path, data)
+    return url
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build fingerprinted static assets into static/build/")
+    parser.add_argument("--keep", action="store_true", help="don't wipe static/build/ first")
+    args = parser.parse_args(argv)
+
+    if not args.keep and os.path.isdir(BUILD_DIR):
+        shutil.rmtree(BUILD_DIR)
+    manifest: Dict[str, Any] = {"files": {}, "photos": {}}
+    for filename in FINGERPRINTED:
+        manifest["files"][filename] = build_file(filename)
+        print(f"  {filename} -> {manifest['files'][filename]}")
+    for source_dir in PHOTO_DIRS:
+        directory = os.path.join(STATIC_DIR, source_dir)
+        for filename in sorted(os.listdir(directory)):
+            if not filename.lower().endswith((".jpg", ".jpeg", ".png")):
+                continue
+            photo = build_photo(source_dir, filename)
+            manifest["photos"][f"{source_dir}/{filename}"] = photo
+            print(f"  {source_dir}/{filename} -> {len(photo['srcset'])} formats, {photo['width']}px max")
+    with open(os.path.join(BUILD_DIR, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f"  manifest: {os.path.relpath(os.path.join(BUILD_DIR, 'manifest.json'), HERE)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# /admin/companies/import 와 import_companies.py 가 같이 쓰는 입력 해석.  실제 반영은
+# Storage.import_companies 가 한 트랜잭션으로 한다.
+
+MAX_NAME_LENGTH = 200  # companies.name VARCHAR(200)
+MAX_ERRORS = 10
+
+
+class ImportRejected(ValueError):
+    """The import file is malformed; nothing was applied."""
+
+
+def _csv_rows(text: str) -> Iterable[Tuple[int, List[str]]]:
+    reader = csv.reader(io.StringIO(text))
+    columns = (0, 1)
+    first = True
+    for row in reader:
+        cells = [cell.strip() for cell in row]
+        if not any(cells) or cells[0].startswith("#"):
+            continue
+        if first:
+            first = False
+            header = [cell.casefold() for cell in cells]
+            if "name" in header and "tier" in header:
+                columns = (header.index("name"), header.index("tier"))
+                continue
+        yield reader.line_num, [cells[i] if i < len(cells) else "" for i in columns]
+
+
+def _json_rows(text: str) -> Iterable[Tuple[int, List[str]]]:
+    try:
+        data = json.loads(text)
+    except ValueError as exc:
+        raise ImportRejected(f"Invalid JSON: {exc}") from None
+    if isinstance(data, dict):
+        data = data.get("companies")
+    if not isinstance(data, list):
+        raise ImportRejected('JSON must be a list of {"name", "tier"} objects (or {"companies": [...]})')
+    for index, item in enumerate(data, start=1):
+        if isinstance(item, dict):
+            yield index, [str(item.get("name") or ""), str(item.get("tier") or "")]
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            yield index, [str(item[0] or ""), str(item[1] or "")]
+        else:
+            yield index, ["", ""]
+
+
+def parse_companies(text: str, tiers: List[str], fmt: Optional[str] = None) -> List[Tuple[str, str]]:
+    """``(name, tier)`` pairs from CSV (``name,tier``, header optional) or JSON.
+
+    ``fmt`` is ``csv`` or ``json``; by default JSON is assumed when the text
+    starts with ``[`` or ``{``.  Tiers match ``tiers`` case-insensitively and
+    come back in their canonical spelling.  Any bad row, or the same name
+    twice, rejects the whole file (``ImportRejected``, up to ``MAX_ERRORS``
+    problems listed).
+    """
+
+    text = text.lstrip("\ufeff")
+    if fmt is None:
+        fmt = "json" if text.lstrip()[:1] in ("[", "{") else "csv"
+    rows = _json_rows(text) if fmt == "json" else _csv_rows(text)
+    label = "item" if fmt == "json" else "line"
+
+    canonical = {tier.casefold(): tier for tier in tiers}
+    companies: List[Tuple[str, str]] = []
+    seen: Dict[str, int] = {}
+    errors: List[str] = []
+    for number, (name, tier) in rows:
+        name = " ".join(name.split())
+        if not name:
+            errors.append(f"{label} {number}: company name is required")
+        elif len(name) > MAX_NAME_LENGTH:
+            errors.append(f"{label} {number}: name longer than {MAX_NAME_LENGTH} characters")
+        elif tier.strip().casefold() not in canonical:
+            errors.append(f"{label} {number}: unknown tier {tier!r} for {name!r}")
+        elif name.casefold() in seen:
+            errors.append(f"{label} {number}: {name!r} already listed on {label} {seen[name.casefold()]}")
+        else:
+            seen[name.casefold()] = number
+            companies.append((name, canonical[tier.strip().casefold()]))
+    if errors:
+        more = f" (+{len(errors) - MAX_ERRORS} more)" if len(errors) > MAX_ERRORS else ""
+        raise ImportRejected("; ".join(errors[:MAX_ERRORS]) + more)
+    if not companies:
+        raise ImportRejected("No companies found in the import")
+    return companies
+
+
+def summary_text(summary: Dict[str, Any]) -> str:
+    """One line for the admin page / CLI output."""
+
+    parts = [
+        f"{len(summary['added'])} added",
+        f"{len(summary['retiered'])} tier changes",
+        f"{len(summary['deleted'])} deleted",
+        f"{summary['unchanged']} unchanged",
+    ]
+    text = ", ".join(parts)
+    if summary["kept"]:
+        kept = ", ".join(f"{row['name']} ({row['bookings']})" for row in summary["kept"])
+        text += f"; kept with bookings: {kept}"
+    if summary["dry_run"]:
+        text = "Dry run: " + text
+    return text
@@ -1,6 +1,10 @@
 import os
-import MySQLdb
+import threading
+import time
 from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import MySQLdb
 
 
 MYSQL_HOST=os.getenv('MYSQL_HOST','127.0.0.1')
@@ -9,19 +13,227 @@ MYSQL_DB=os.getenv('MYSQL_DB','apec_booking')
 MYSQL_USER=os.getenv('MYSQL_USER','apec')
 MYSQL_PASSWORD=os.getenv('MYSQL_PASSWORD','strong-password')
 
+MYSQL_POOL_SIZE=int(os.getenv('MYSQL_POOL_SIZE','10'))
+MYSQL_POOL_TIMEOUT=float(os.getenv('MYSQL_POOL_TIMEOUT','10'))
+MYSQL_POOL_RECYCLE=float(os.getenv('MYSQL_POOL_RECYCLE','3600'))
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class PooledConnection:
+    """Proxy around a raw MySQLdb connection that returns to its pool on ``close``.
+
+    Everything except ``close`` is forwarded to the underlying connection so the
+    existing ``conn.cursor()`` / ``conn.commit()`` call sites keep working.
+    After ``close`` the raw connection may already be lent to another thread,
+    so any further use raises ``MySQLdb.InterfaceError``.
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._closed = False
+
+    def __getattr__(self, name):
+        if self._closed:
+            raise MySQLdb.InterfaceError(f"Pooled connection used after close ({name})")
+        return getattr(self._raw, name)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        raw, self._raw = self._raw, None
+        self._pool._release(raw, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of MySQLdb connections.
+
+    Connections are pinged on checkout, replaced when older than ``recycle``
+    seconds and reopened when the ping fails.  Any transaction left open by a
+    caller is rolled back on release so the next borrower starts clean.
+    """
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int,
+        db: str,
+        user: str,
+        password: str,
+        max_size: int = MYSQL_POOL_SIZE,
+        timeout: float = MYSQL_POOL_TIMEOUT,
+        recycle: float = MYSQL_POOL_RECYCLE,
+        on_checkout: Optional[Callable[[float], None]] = None,
+        **connect_kwargs: Any,
+    ):
+        self._connect_args = dict(
+            host=host, port=port, db=db, user=user, passwd=password,
+            charset='utf8mb4', **connect_kwargs,
+        )
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.recycle = recycle
+        # 체크아웃(대기 + ping/재연결 포함)에 걸린 초를 받는 콜백, /metrics 용
+        self.on_checkout = on_checkout
+        self._idle: list[tuple[Any, float]] = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'timeouts': 0,
+            'connects': 0,
+            'reconnects': 0,
+            'recycled': 0,
+        }
+
+    def _open(self):
+        raw = MySQLdb.connect(**self._connect_args)
+        with self._cond:
+            self._stats['connects'] += 1
+        return raw, time.monotonic()
+
+    @staticmethod
+    def _discard(raw) -> None:
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def connect(self) -> PooledConnection:
+        """Check out a live connection, waiting up to ``timeout`` seconds."""
+
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"No MySQL connection available within {self.timeout:.1f}s "
+                        f"(pool size {self.max_size})"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+            if self._idle:
+                raw, created_at = self._idle.pop()
+            else:
+                raw, created_at = None, 0.0
+                self._size += 1
+            wait_seconds = time.monotonic() - started
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_seconds_total'] += wait_seconds
+                self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], wait_seconds)
+
+        try:
+            if raw is not None and self.recycle and time.monotonic() - created_at > self.recycle:
+                self._discard(raw)
+                raw = None
+                with self._cond:
+                    self._stats['recycled'] += 1
+            if raw is not None:
+                try:
+                    raw.ping()
+                except MySQLdb.Error:
+                    self._discard(raw)
+                    raw = None
+                    with self._cond:
+                        self._stats['reconnects'] += 1
+            if raw is None:
+                raw, created_at = self._open()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        if self.on_checkout is not None:
+            self.on_checkout(time.monotonic() - started)
+        return PooledConnection(self, raw, created_at)
+
+    def _release(self, raw, created_at: float) -> None:
+        try:
+            raw.rollback()
+        except MySQLdb.Error:
+            self._discard(raw)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((raw, created_at))
+            self._cond.notify()
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for raw, _ in idle:
+            self._discard(raw)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            data = dict(self._stats)
+            data.update(
+                max_size=self.max_size,
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+            )
+        return data
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(**kwargs) -> ConnectionPool:
+    """Install the process-wide pool. ``app.py`` calls this with its own settings."""
+
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = ConnectionPool(**kwargs)
+        return _pool
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                host=MYSQL_HOST, port=MYSQL_PORT, db=MYSQL_DB,
+                user=MYSQL_USER, password=MYSQL_PASSWORD,
+            )
+        return _pool
+
 
 @contextmanager
 def get_conn():
-conn = MySQLdb.connect(
-host=MYSQL_HOST, port=MYSQL_PORT, db=MYSQL_DB,
-user=MYSQL_USER, passwd=MYSQL_PASSWORD,
-charset='utf8mb4', autocommit=False
-)
-try:
-yield conn
-conn.commit()
-except:
-conn.rollback()
-raise
-finally:
-conn.close()
+    conn = get_pool().connect()
+    try:
+        yield conn
+        conn.commit()
+    except:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
@@ -0,0 +1,288 @@
+import hashlib
+import queue
+import smtplib
+import sys
+import threading
+import time
+from email.message import EmailMessage
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Shared by send_digest.py and send_email.sh: rows for one date are streamed
+# (ORDER BY email), grouped per recipient, rendered once and handed to a few
+# SMTP sender threads.  Successful recipients are checkpointed in digest_log so
+# a rerun for the same job/date skips them.
+
+DIGEST_LOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS digest_log (
+  job VARCHAR(64) NOT NULL,
+  target_date DATE NOT NULL,
+  recipient VARCHAR(190) NOT NULL,
+  content_hash CHAR(40) NOT NULL,
+  sent_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (job, target_date, recipient)
+) ENGINE=InnoDB
+"""
+
+Row = Dict[str, Any]
+# render(recipient, items) -> (subject, text_body, html_body or None)
+Renderer = Callable[[str, List[Row]], Tuple[str, str, Optional[str]]]
+
+_DONE = object()
+
+
+def group_by_recipient(rows: Iterable[Row], key: str = "email") -> Iterator[Tuple[str, List[Row]]]:
+    """Yield ``(email, rows)`` from rows already ordered by ``key``; blank emails are skipped."""
+
+    for email, items in groupby(rows, key=lambda row: (row.get(key) or "").strip()):
+        if email:
+            yield email, list(items)
+
+
+def content_hash(items: List[Row]) -> str:
+    parts = sorted(
+        f"{row.get('company')}|{row.get('tier')}|{row.get('room_code')}|{row.get('start_hour')}-{row.get('end_hour')}"
+        for row in items
+    )
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def smtp_opener(host: str, port: int, user: Optional[str], password: Optional[str], *, starttls: bool = True,
+                starttls_optional: bool = False, timeout: float = 20):
+    """Return a callable that opens one logged-in SMTP session (465 = implicit TLS).
+
+    With ``starttls`` a failed STARTTLS raises before ``login`` so credentials
+    never go out in plaintext; ``starttls_optional`` goes on without TLS instead.
+    """
+
+    def _open():
+        if port == 465:
+            server = smtplib.SMTP_SSL(host, port, timeout=timeout)
+        else:
+            server = smtplib.SMTP(host, port, timeout=timeout)
+        try:
+            if port != 465:
+                server.ehlo()
+                if starttls:
+                    try:
+                        server.starttls()
+                        server.ehlo()
+                    except smtplib.SMTPException:
+                        if not starttls_optional:
+                            raise
+            if user and password:
+                server.login(user, password)
+        except BaseException:
+            server.close()
+            raise
+        return server
+
+    return _open
+
+
+class DigestReport:
+    def __init__(self, job: str, target_date: str, dry_run: bool):
+        self.job = job
+        self.target_date = target_date
+        self.dry_run = dry_run
+        self.recipients = 0
+        self.bookings = 0
+        self.sent = 0
+        self.skipped = 0
+        self.failures: List[Tuple[str, str]] = []
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        mode = "previewed" if self.dry_run else "sent"
+        return (
+            f"{self.job} {self.target_date}: {mode} {self.sent}/{self.recipients} recipient(s), "
+            f"{self.bookings} booking(s), skipped {self.skipped} already sent, "
+            f"failed {len(self.failures)} in {self.elapsed:.1f}s ({self.rate:.1f} msg/s)"
+        )
+
+
+class _Sender(threading.Thread):
+    def __init__(self, engine: "DigestRun", index: int):
+        super().__init__(name=f"digest-smtp-{index}", daemon=True)
+        self.engine = engine
+        self.smtp = None
+        self.checkpoint_conn = None
+
+    def _close(self) -> None:
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.smtp = None
+
+    def _deliver(self, msg: EmailMessage) -> None:
+        for attempt in (1, 2):
+            if self.smtp is None:
+                self.smtp = self.engine.open_smtp()
+            try:
+                self.smtp.send_message(msg)
+                return
+            except smtplib.SMTPServerDisconnected:
+                # 세션이 서버 쪽에서 끊긴 경우 한 번만 재접속
+                self.smtp = None
+                if attempt == 2:
+                    raise
+
+    def run(self) -> None:
+        engine = self.engine
+        try:
+            while True:
+                job = engine.queue.get()
+                if job is _DONE:
+                    return
+                recipient, msg, digest = job
+                try:
+                    if engine.dry_run:
+                        engine.preview(recipient, msg)
+                    else:
+                        self._deliver(msg)
+                        self.checkpoint_conn = engine.checkpoint(self.checkpoint_conn, recipient, digest)
+                except Exception as exc:
+                    if not isinstance(exc, smtplib.SMTPRecipientsRefused):
+                        self._close()
+                    engine.fail(recipient, f"{type(exc).__name__}: {exc}")
+                else:
+                    with engine.report._lock:
+                        engine.report.sent += 1
+        finally:
+            self._close()
+            if self.checkpoint_conn is not None:
+                try:
+                    self.checkpoint_conn.close()
+                except Exception:
+                    pass
+
+
+class DigestRun:
+    """One digest job for one date.
+
+    ``connect`` returns a DB-API connection (used for the checkpoint table),
+    ``open_smtp`` a logged-in SMTP session; each of the ``concurrency`` sender
+    threads keeps its own session for the whole run.  With ``dry_run`` the
+    messages are printed instead of sent and nothing is checkpointed.
+    """
+
+    def __init__(
+        self,
+        job: str,
+        target_date: str,
+        *,
+        connect: Callable[[], Any],
+        open_smtp: Callable[[], Any],
+        mail_from: str,
+        render: Renderer,
+        concurrency: int = 4,
+        dry_run: bool = False,
+        out=sys.stdout,
+    ):
+        self.job = job
+        self.target_date = target_date
+        self.connect = connect
+        self.open_smtp = open_smtp
+        self.mail_from = mail_from
+        self.render = render
+        self.concurrency = max(1, int(concurrency))
+        self.dry_run = dry_run
+        self.out = out
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.concurrency * 4)
+        self.report = DigestReport(job, target_date, dry_run)
+        self._print_lock = threading.Lock()
+
+    # ------------------------------------------------------- checkpoints
+    def _sent_before(self) -> Dict[str, str]:
+        conn = self.connect()
+        try:
+            cur = conn.cursor()
+            cur.execute(DIGEST_LOG_SCHEMA)
+            cur.execute(
+                "SELECT recipient, content_hash FROM digest_log WHERE job=%s AND target_date=%s",
+                (self.job, self.target_date),
+            )
+            done = {recipient.lower(): digest for recipient, digest in cur.fetchall()}
+            conn.commit()
+            return done
+        finally:
+            conn.close()
+
+    def checkpoint(self, conn, recipient: str, digest: str):
+        if conn is None:
+            conn = self.connect()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO digest_log (job, target_date, recipient, content_hash)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE content_hash=VALUES(content_hash), sent_at=CURRENT_TIMESTAMP
+            """,
+            (self.job, self.target_date, recipient.lower(), digest),
+        )
+        conn.commit()
+        return conn
+
+    # ----------------------------------------------------------- helpers
+    def fail(self, recipient: str, error: str) -> None:
+        with self.report._lock:
+            self.report.failures.append((recipient, error))
+        with self._print_lock:
+            print(f"[WARN] send failed to {recipient}: {error}", file=sys.stderr)
+
+    def preview(self, recipient: str, msg: EmailMessage) -> None:
+        with self._print_lock:
+            print("----- DRY RUN -----", file=self.out)
+            print("TO:", recipient, file=self.out)
+            print(msg.as_string(), file=self.out)
+            print("-------------------", file=self.out)
+
+    def _message(self, recipient: str, items: List[Row]) -> EmailMessage:
+        subject, text_body, html_body = self.render(recipient, items)
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = self.mail_from
+        msg["To"] = recipient
+        msg.set_content(text_body)
+        if html_body:
+            msg.add_alternative(html_body, subtype="html")
+        return msg
+
+    # --------------------------------------------------------------- run
+    def run(self, rows: Iterable[Row]) -> DigestReport:
+        """Send to every recipient in ``rows`` (must be ordered by email)."""
+
+        started = time.monotonic()
+        done = {} if self.dry_run else self._sent_before()
+        senders = [_Sender(self, i) for i in range(self.concurrency)]
+        for sender in senders:
+            sender.start()
+        try:
+            for recipient, items in group_by_recipient(rows):
+                self.report.recipients += 1
+                self.report.bookings += len(items)
+                digest = content_hash(items)
+                if done.get(recipient.lower()) == digest:
+                    self.report.skipped += 1
+                    continue
+                try:
+                    msg = self._message(recipient, items)
+                except Exception as exc:
+                    self.fail(recipient, f"render: {exc}")
+                    continue
+                self.queue.put((recipient, msg, digest))
+        finally:
+            for _ in senders:
+                self.queue.put(_DONE)
+            for sender in senders:
+                sender.join()
+            self.report.elapsed = time.monotonic() - started
+        return self.report
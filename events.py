@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+
+Event = Tuple[int, str, Dict[str, Any]]
+
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, match: Callable[[Dict[str, Any]], bool], maxsize: int):
+        self.loop = loop
+        self.match = match
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize)
+
+    def deliver(self, item: Event) -> None:
+        """Queue ``item``; on overflow replace the backlog with one ``reset`` (runs on ``loop``)."""
+
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # 읽지 못하는(멈춘/느린) 클라이언트: 밀린 이벤트를 버리고 다시 읽어 오라고만 알린다
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((item[0], "reset", {"date": item[2].get("date")}))
+
+
+class EventBroadcaster:
+    """Fan-out of availability events to Server-Sent Events subscribers.
+
+    ``publish`` is thread-safe so the sync route handlers (AnyIO threadpool)
+    can call it directly.  The last ``history`` events are kept so a client
+    reconnecting with ``Last-Event-ID`` can resume; if its id has already
+    fallen out of the buffer, or was issued by another process, it is told to
+    reload instead.  Ids on the wire are ``<boot>.<seq>``.
+
+    Each subscriber queues at most ``queue_size`` events; a client that falls
+    that far behind loses its backlog and gets a single ``reset`` instead.
+    """
+
+    def __init__(self, history: int = 512, queue_size: int = 256):
+        self.boot = os.urandom(3).hex()
+        self._seq = 0
+        self._history: Deque[Event] = deque(maxlen=history)
+        self._queue_size = queue_size
+        self._subscribers: Set[_Subscriber] = set()
+        self._lock = threading.Lock()
+
+    def wire_id(self, seq: int) -> str:
+        return f"{self.boot}.{seq}"
+
+    def parse_id(self, raw: Optional[str]) -> Optional[int]:
+        """``None`` for no id; ``-1`` for an id this process can't resume from."""
+
+        if not raw:
+            return None
+        boot, _, seq = raw.partition(".")
+        if boot != self.boot or not seq.isdigit():
+            return -1
+        return int(seq)
+
+    def publish(self, event: str, data: Dict[str, Any]) -> int:
+        with self._lock:
+            self._seq += 1
+            item = (self._seq, event, data)
+            self._history.append(item)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            if not sub.match(data):
+                continue
+            try:
+                sub.loop.call_soon_threadsafe(sub.deliver, item)
+            except RuntimeError:
+                # Event loop already closed (server shutting down).
+                pass
+        return item[0]
+
+    def subscribe(
+        self, match: Callable[[Dict[str, Any]], bool], last_event_id: Optional[int] = None
+    ) -> Tuple[_Subscriber, Optional[List[Event]], int]:
+        """Register a subscriber on the running loop.
+
+        Returns the subscriber, the events to replay after ``last_event_id``
+        (``None`` when the gap can no longer be filled from history) and the
+        id of the newest event at subscription time.
+        """
+
+        sub = _Subscriber(asyncio.get_running_loop(), match, self._queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+            backlog: Optional[List[Event]] = []
+            if last_event_id is not None and not 0 <= last_event_id <= self._seq:
+                backlog = None
+            elif last_event_id is not None and last_event_id < self._seq:
+                oldest = self._history[0][0] if self._history else self._seq + 1
+                if last_event_id + 1 < oldest:
+                    backlog = None
+                else:
+                    backlog = [item for item in self._history if item[0] > last_event_id and match(item[2])]
+            current = self._seq
+        return sub, backlog, current
+
+    def unsubscribe(self, sub: _Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_sse(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    payload = json.dumps(data, ensure_ascii=False, default=str, separators=(",", ":"))
+    lines.append(f"data: {payload}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import time
+from typing import Any, Callable, Mapping, NamedTuple, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+
+KEY_HEADER = "Idempotency-Key"
+KEY_FIELD = "idempotency_key"  # 헤더를 못 붙이는 HTML 폼용 hidden 필드
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 200
+
+
+class NotApplied(Exception):
+    """Raised by ``work`` with the response to send when the mutation didn't happen.
+
+    The admin forms answer failures with a 303 back to ``/admin`` too; raising
+    this releases the key instead of storing that redirect, so a resubmit
+    with the same key runs again.
+    """
+
+    def __init__(self, response: Response):
+        super().__init__(response.status_code)
+        self.response = response
+
+
+class RequestClaim(NamedTuple):
+    key: str          # sha256(route, client key): 라우트가 다르면 같은 키도 별개
+    fingerprint: str  # 폼 값의 해시: 같은 키로 다른 요청을 보내면 422
+
+
+def request_claim(route: str, raw_key: Optional[str], fields: Mapping[str, Any]) -> Optional[RequestClaim]:
+    """Claim for ``raw_key`` (header or form field), or ``None`` when the client sent none."""
+
+    raw_key = (raw_key or "").strip()
+    if not raw_key:
+        return None
+    if len(raw_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{KEY_HEADER} is too long (max {MAX_KEY_LENGTH})")
+    key = hashlib.sha256(f"{route}\x1f{raw_key}".encode("utf-8")).hexdigest()
+    values = json.dumps(sorted((name, str(value)) for name, value in fields.items()), ensure_ascii=False)
+    return RequestClaim(key, hashlib.sha256(values.encode("utf-8")).hexdigest())
+
+
+class RequestKeys:
+    """Run a mutation at most once per idempotency key and replay its outcome.
+
+    The first request with a key claims it in storage (``claim_request``),
+    does the work and stores the response status and ``Location`` for ``ttl``
+    seconds; repeats get that redirect back without re-running anything.
+    Error responses, exceptions and ``NotApplied`` release the key so a retry
+    runs again.
+    A repeat that arrives while the first is still running waits up to
+    ``wait`` seconds for it; a claim left behind by a crashed worker expires
+    after ``hold`` seconds.
+
+    ``replay`` only reads: a route that turns requests away before ``run``
+    uses it so a repeat of a finished request still gets its stored outcome.
+
+    The claim, the work and the finish run inside one ``store.session()``,
+    so on MySQL a keyed request checks out a single pooled connection.
+
+    Blocking: call ``run`` from a storage thread (``run_db`` or a sync route).
+    """
+
+    def __init__(self, store: Any, ttl: float = 3600.0, hold: float = 60.0, wait: float = 5.0, poll: float = 0.1):
+        self.store = store
+        self.ttl = ttl
+        self.hold = hold
+        self.wait = wait
+        self.poll = poll
+
+    def run(self, claim: Optional[RequestClaim], work: Callable[[], Response]) -> Response:
+        if claim is None:
+            try:
+                return work()
+            except NotApplied as exc:
+                return exc.response
+        with self.store.session():
+            replay = self._claim(claim)
+            if replay is not None:
+                return replay
+            try:
+                response = work()
+            except NotApplied as exc:
+                self.store.release_request(claim.key)
+                return exc.response
+            except BaseException:
+                self.store.release_request(claim.key)
+                raise
+            if 200 <= response.status_code < 400:
+                self.store.finish_request(claim.key, response.status_code, response.headers.get("location"), self.ttl)
+            else:
+                self.store.release_request(claim.key)
+            return response
+
+    def replay(self, claim: RequestClaim) -> Optional[Response]:
+        """The stored response for ``claim`` (waiting while it is in flight), or ``None``; claims nothing."""
+
+        return self._await(claim, lambda: self.store.stored_request(claim.key))
+
+    def _claim(self, claim: RequestClaim) -> Optional[Response]:
+        return self._await(claim, lambda: self.store.claim_request(claim.key, claim.fingerprint, self.hold))
+
+    def _await(self, claim: RequestClaim, fetch: Callable[[], Optional[Mapping[str, Any]]]) -> Optional[Response]:
+        deadline = time.monotonic() + self.wait
+        while True:
+            row = fetch()
+            if row is None:
+                return None
+            if row["fingerprint"] != claim.fingerprint:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"{KEY_HEADER} was already used for a request with different parameters",
+                )
+            if row["status"] is not None:
+                headers = {REPLAYED_HEADER: "true"}
+                if row["location"]:
+                    headers["Location"] = row["location"]
+                return Response(status_code=int(row["status"]), headers=headers)
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this idempotency key is still being processed",
+                    headers={"Retry-After": "1"},
+                )
+            time.sleep(self.poll)
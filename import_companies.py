@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Sync the ``companies`` table with a CSV or JSON file.
+
+The file is diffed against the current table and the inserts, tier changes
+and (with ``--replace``) deletions are applied in one transaction.
+Companies that still have bookings are never deleted; they are listed as
+kept.  Uses the storage configured in ``.env`` (``STORAGE``, ``MYSQL_*`` ...)::
+
+    python import_companies.py companies.csv --dry-run
+    python import_companies.py companies.csv --replace
+    python import_companies.py companies.json --env-file /opt/apec-booking/.env
+
+CSV rows are ``name,tier`` (header optional); JSON is a list of
+``{"name": ..., "tier": ...}``.  A running server picks the changes up when
+its company cache expires (``AVAILABILITY_TTL``).
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from company_import import ImportRejected, parse_companies, summary_text
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import companies from CSV/JSON (diff against the database)")
+    parser.add_argument("path", help="CSV or JSON file, '-' for stdin")
+    parser.add_argument("--format", choices=("csv", "json"), help="default: guessed from the content")
+    parser.add_argument("--replace", action="store_true", help="delete companies missing from the file")
+    parser.add_argument("--dry-run", action="store_true", help="print the diff without applying it")
+    parser.add_argument("--env-file", default=os.getenv("ENV_FILE"), help="dotenv file (default: ENV_FILE or ./.env)")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    args = parser.parse_args(argv)
+
+    if args.env_file:
+        if not os.path.exists(args.env_file):
+            parser.error(f".env not found at: {args.env_file}")
+        load_dotenv(args.env_file)
+    os.environ.setdefault("OUTBOX_ENABLED", "0")
+
+    if args.path == "-":
+        text = sys.stdin.read()
+    else:
+        with open(args.path, encoding="utf-8-sig") as fh:
+            text = fh.read()
+
+    import app  # noqa: E402  (.env 를 먼저 읽어야 같은 저장소 설정을 쓴다)
+
+    try:
+        companies = parse_companies(text, app.COMPANY_MANAGED_TIERS, args.format)
+    except ImportRejected as exc:
+        print(f"[-] {exc}", file=sys.stderr)
+        return 2
+
+    summary = app.import_companies(companies, replace=args.replace, dry_run=args.dry_run)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+
+    for row in summary["added"]:
+        print(f"  + {row['name']} ({row['tier']})")
+    for row in summary["retiered"]:
+        print(f"  ~ {row['name']}: {row['from']} -> {row['to']}")
+    for name in summary["deleted"]:
+        print(f"  - {name}")
+    for row in summary["kept"]:
+        print(f"  ! {row['name']}: {row['bookings']} booking(s), not deleted")
+    print(f"[✓] {summary_text(summary)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
+from markupsafe import Markup, escape
+
+
+# Email bodies shared by app.py (confirmation outbox), send_email.sh and
+# send_digest.py.  Templates under templates/email are compiled once per
+# process; the static intro/outro paragraphs are rendered once per renderer and
+# the room label + schedule link for a (room, date) pair is built once per run.
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "email")
+
+CONFIRMATION_SUBJECT = "[APEC CEO Summit Korea 2025] Meeting Room Reservation Confirmation"
+
+Row = Dict[str, Any]
+
+
+class RoomLink(NamedTuple):
+    name: str
+    link: str
+    name_html: Markup
+    link_html: Markup
+
+
+@lru_cache(maxsize=None)
+def _environment(directory: str = TEMPLATE_DIR) -> Environment:
+    return Environment(
+        loader=FileSystemLoader(directory),
+        autoescape=lambda name: bool(name) and name.endswith(".html"),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        undefined=StrictUndefined,
+        auto_reload=False,
+    )
+
+
+def format_hour(hour_value: Any) -> str:
+    return f"{int(hour_value):02d}:00"
+
+
+class EmailTemplates:
+    """Render confirmation and digest emails for one process or one run.
+
+    ``room_labels`` maps room codes to display names (unknown codes fall back
+    to the code itself) and ``base_url`` prefixes the schedule links.
+    """
+
+    def __init__(self, base_url: str, room_labels: Mapping[str, str], *, directory: str = TEMPLATE_DIR):
+        env = _environment(directory)
+        self.base_url = base_url.rstrip("/")
+        self.room_labels = dict(room_labels)
+        self._confirmation_text = env.get_template("confirmation.txt")
+        self._confirmation_html = env.get_template("confirmation.html")
+        self._digest_text = env.get_template("digest.txt")
+        self._intro_text = env.get_template("confirmation_intro.txt").render().rstrip("\n")
+        self._outro_text = env.get_template("confirmation_outro.txt").render().rstrip("\n")
+        self._intro_html = Markup(env.get_template("confirmation_intro.html").render().rstrip("\n"))
+        self._outro_html = Markup(env.get_template("confirmation_outro.html").render().rstrip("\n"))
+        self.room_link = lru_cache(maxsize=4096)(self._room_link)
+
+    def _room_link(self, room_code: str, date_value: str) -> RoomLink:
+        name = self.room_labels.get(room_code, room_code)
+        link = f"{self.base_url}/display?room={room_code}&date={date_value}"
+        return RoomLink(name, link, escape(name), escape(link))
+
+    def _items(self, items: List[Row]) -> List[Dict[str, Any]]:
+        rendered = []
+        for item in items:
+            date_value = str(item["date"])
+            rendered.append(
+                {
+                    "company": item["company"],
+                    "date": date_value,
+                    "start": format_hour(item["start_hour"]),
+                    "end": format_hour(item["end_hour"]),
+                    "tier": item["tier"],
+                    "room_code": item["room_code"],
+                    "room": self.room_link(item["room_code"], date_value),
+                }
+            )
+        return rendered
+
+    def confirmation(self, company_name: str, items: List[Row]) -> Tuple[str, str]:
+        """Return ``(text_body, html_body)`` for one recipient's bookings."""
+
+        rows = self._items(items)
+        text_body = self._confirmation_text.render(
+            company=company_name, items=rows, intro=self._intro_text, outro=self._outro_text
+        )
+        html_body = self._confirmation_html.render(
+            company=company_name, items=rows, intro=self._intro_html, outro=self._outro_html
+        )
+        return text_body.rstrip("\n"), html_body.rstrip("\n")
+
+    def render_confirmation(self, recipient: str, items: List[Row]) -> Tuple[str, str, Optional[str]]:
+        """``digest.Renderer`` for the confirmation job (company taken from the first row)."""
+
+        company_name = items[0]["company"] if items else ""
+        text_body, html_body = self.confirmation(company_name, items)
+        return CONFIRMATION_SUBJECT, text_body, html_body
+
+    def digest(self, items: List[Row]) -> str:
+        """Plain-text daily booking summary."""
+
+        return self._digest_text.render(items=self._items(items)).rstrip("\n")
@@ -35,6 +35,27 @@ CREATE TABLE IF NOT EXISTS bookings (
   INDEX idx_email_date (email, date)
 ) ENGINE=InnoDB;
 
+-- 예약이 차지한 시간 (한 시간에 한 행).  기본키가 룸 시간대 겹침을 막는다 (storage_mysql.commit_booking)
+CREATE TABLE IF NOT EXISTS booking_hours (
+  date DATE NOT NULL,
+  room_code VARCHAR(64) NOT NULL,
+  hour TINYINT NOT NULL,
+  booking_id BIGINT NOT NULL,
+  PRIMARY KEY (date, room_code, hour),
+  INDEX idx_booking_hours_booking (booking_id),
+  CONSTRAINT fk_booking_hours_booking FOREIGN KEY (booking_id) REFERENCES bookings(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- 이 테이블보다 먼저 들어간 예약 채우기 (다시 실행해도 안전)
+INSERT IGNORE INTO booking_hours (date, room_code, hour, booking_id)
+SELECT b.date, b.room_code, b.start_hour + n.n, b.id
+FROM bookings b
+JOIN (SELECT 0 AS n UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4 UNION ALL SELECT 5
+      UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9 UNION ALL SELECT 10 UNION ALL SELECT 11
+      UNION ALL SELECT 12 UNION ALL SELECT 13 UNION ALL SELECT 14 UNION ALL SELECT 15 UNION ALL SELECT 16
+      UNION ALL SELECT 17 UNION ALL SELECT 18 UNION ALL SELECT 19 UNION ALL SELECT 20 UNION ALL SELECT 21
+      UNION ALL SELECT 22 UNION ALL SELECT 23) n ON n.n < b.end_hour - b.start_hour;
+
 -- Admin disabled slots
 CREATE TABLE IF NOT EXISTS disabled_slots (
   id BIGINT PRIMARY KEY AUTO_INCREMENT,
@@ -59,6 +80,51 @@ CREATE TABLE IF NOT EXISTS booking_windows (
   updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 ) ENGINE=InnoDB;
 
+-- App metadata (rooms_catalog_version 등, app.py 시작 시 기록)
+CREATE TABLE IF NOT EXISTS app_meta (
+  name VARCHAR(64) PRIMARY KEY,
+  value VARCHAR(255) NOT NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- 확인 메일 발송 큐 (outbox.py 워커가 배치로 발송)
+CREATE TABLE IF NOT EXISTS email_outbox (
+  id BIGINT PRIMARY KEY AUTO_INCREMENT,
+  idempotency_key CHAR(64) NOT NULL UNIQUE,
+  recipient VARCHAR(190) NOT NULL,
+  subject VARCHAR(255) NOT NULL,
+  body_text MEDIUMTEXT NOT NULL,
+  body_html MEDIUMTEXT DEFAULT NULL,
+  status ENUM('pending','sending','sent','failed') NOT NULL DEFAULT 'pending',
+  attempts INT NOT NULL DEFAULT 0,
+  last_error VARCHAR(500) DEFAULT NULL,
+  next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  locked_at DATETIME DEFAULT NULL,
+  sent_at DATETIME DEFAULT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_outbox_due (status, next_attempt_at)
+) ENGINE=InnoDB;
+
+-- 일일 다이제스트/확인 메일 발송 체크포인트 (digest.py, 재실행 시 이미 보낸 수신자 건너뜀)
+CREATE TABLE IF NOT EXISTS digest_log (
+  job VARCHAR(64) NOT NULL,
+  target_date DATE NOT NULL,
+  recipient VARCHAR(190) NOT NULL,
+  content_hash CHAR(40) NOT NULL,
+  sent_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (job, target_date, recipient)
+) ENGINE=InnoDB;
+
+-- POST /book, 관리자 변경 요청의 Idempotency-Key 결과 (storage_*.claim_request, TTL 지나면 삭제)
+CREATE TABLE IF NOT EXISTS request_keys (
+  request_key CHAR(64) PRIMARY KEY,
+  fingerprint CHAR(64) NOT NULL,
+  status SMALLINT DEFAULT NULL,
+  location TEXT DEFAULT NULL,
+  expires_at DOUBLE NOT NULL,
+  INDEX idx_request_keys_expiry (expires_at)
+) ENGINE=InnoDB;
+
 -- Companies (신규)
 CREATE TABLE IF NOT EXISTS companies (
   id INT PRIMARY KEY AUTO_INCREMENT,
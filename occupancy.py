@@ -0,0 +1,204 @@
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# 모든 uvicorn/gunicorn worker 가 같은 파일(/dev/shm)을 mmap 해서 보는 점유 비트맵.
+#
+#   header : magic(8) layout(u64) seq(u64)
+#   date i : generation(u64) loaded(u64) + room j: booked(u32) disabled(u32)
+#
+# 쓰기는 threading.Lock + flock 아래에서 seq 를 홀수로 올린 뒤 값을 바꾸고 다시 짝수로
+# 만든다(seqlock).  읽기는 락 없이 mmap 메모리만 읽고, seq 가 바뀌었으면 다시 읽는다.
+
+_MAGIC = b"APECOCC1"
+_HEADER = struct.Struct("<8sQQ")
+_DATE = struct.Struct("<QQ")
+_ROOM = struct.Struct("<II")
+_U64 = struct.Struct("<Q")
+_SEQ_OFFSET = 16
+_READ_ATTEMPTS = 10000
+
+Masks = Tuple[int, int]
+
+
+def occupancy_path(directory: str, namespace: str) -> str:
+    """File name for one storage backend, so different databases never share a table."""
+
+    digest = hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(directory, f"apec-occupancy-{digest}")
+
+
+class SharedOccupancy:
+    """Cross-process ``(date, room) -> (booked, disabled)`` hour bitmaps with per-date generations.
+
+    A date is ``loaded`` once some worker has published its masks from the
+    database.  Every write bumps that date's generation, so a worker whose
+    local rows were loaded at another generation knows to reload them.  Files
+    written for a different date/room/hour layout are reset on open.
+    """
+
+    def __init__(self, path: str, dates: Iterable[str], rooms: Iterable[str], hours: List[int]):
+        self.path = path
+        self._dates = {date_str: i for i, date_str in enumerate(dates)}
+        self._rooms = {room: j for j, room in enumerate(rooms)}
+        self._date_size = _DATE.size + _ROOM.size * len(self._rooms)
+        self.size = _HEADER.size + self._date_size * len(self._dates)
+        layout_key = json.dumps([list(self._dates), list(self._rooms), list(hours)]).encode("utf-8")
+        self._layout = int.from_bytes(hashlib.sha1(layout_key).digest()[:8], "little")
+        self._thread_lock = threading.Lock()
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o660)
+        with self._flock():
+            header = os.pread(self._fd, _HEADER.size, 0)
+            if (
+                os.fstat(self._fd).st_size != self.size
+                or len(header) != _HEADER.size
+                or _HEADER.unpack(header)[:2] != (_MAGIC, self._layout)
+            ):
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self.size)
+                os.pwrite(self._fd, _HEADER.pack(_MAGIC, self._layout, 0), 0)
+        self._map = mmap.mmap(self._fd, self.size)
+
+    # ------------------------------------------------------------ locking
+    @contextmanager
+    def _flock(self):
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _write(self):
+        with self._flock():
+            seq = _U64.unpack_from(self._map, _SEQ_OFFSET)[0]
+            # 이전 writer 가 쓰는 도중 죽어 홀수로 남았어도 다시 홀수 -> 짝수로 진행
+            odd = seq + 1 if seq % 2 == 0 else seq + 2
+            _U64.pack_into(self._map, _SEQ_OFFSET, odd)
+            try:
+                yield
+            finally:
+                _U64.pack_into(self._map, _SEQ_OFFSET, odd + 1)
+
+    # ------------------------------------------------------------ layout
+    def _date_offset(self, date_str: str) -> Optional[int]:
+        index = self._dates.get(date_str)
+        return None if index is None else _HEADER.size + index * self._date_size
+
+    def _room_offset(self, date_offset: int, room: str) -> Optional[int]:
+        index = self._rooms.get(room)
+        return None if index is None else date_offset + _DATE.size + index * _ROOM.size
+
+    def _bump(self, offset: int, loaded: Optional[bool] = None) -> int:
+        generation, was_loaded = _DATE.unpack_from(self._map, offset)
+        generation += 1
+        _DATE.pack_into(self._map, offset, generation, int(was_loaded if loaded is None else loaded))
+        return generation
+
+    # -------------------------------------------------------------- reads
+    def generation(self, date_str: str) -> Optional[int]:
+        """Current generation, or ``None`` for a date outside the table."""
+
+        offset = self._date_offset(date_str)
+        if offset is None:
+            return None
+        return _U64.unpack_from(self._map, offset)[0]
+
+    def masks(self, date_str: str, room: str) -> Optional[Masks]:
+        """``(booked, disabled)`` for one room, or ``None`` until the date has been published."""
+
+        offset = self._date_offset(date_str)
+        room_offset = None if offset is None else self._room_offset(offset, room)
+        if room_offset is None:
+            return None
+        for _ in range(_READ_ATTEMPTS):
+            seq = _U64.unpack_from(self._map, _SEQ_OFFSET)[0]
+            if seq & 1:
+                continue
+            loaded = _DATE.unpack_from(self._map, offset)[1]
+            booked, disabled = _ROOM.unpack_from(self._map, room_offset)
+            if _U64.unpack_from(self._map, _SEQ_OFFSET)[0] == seq:
+                return (booked, disabled) if loaded else None
+        # writer 가 오래 잡고 있으면(또는 쓰다 죽었으면) 호출자가 로컬/DB 로 대신 확인
+        return None
+
+    # ------------------------------------------------------------- writes
+    def publish(self, date_str: str, masks: Dict[str, Masks], expected: Optional[int]) -> Optional[int]:
+        """Store masks freshly read from the database for ``date_str``.
+
+        ``expected`` is the generation seen before the read; if a write landed
+        since, the read may be stale and nothing is stored (returns ``None``).
+        Otherwise returns the generation the masks are valid for.
+        """
+
+        offset = self._date_offset(date_str)
+        if offset is None:
+            return None
+        with self._write():
+            generation, loaded = _DATE.unpack_from(self._map, offset)
+            if generation != expected:
+                return None
+            changed = not loaded
+            for room in self._rooms:
+                room_offset = self._room_offset(offset, room)
+                value = masks.get(room, (0, 0))
+                if _ROOM.unpack_from(self._map, room_offset) != value:
+                    _ROOM.pack_into(self._map, room_offset, *value)
+                    changed = True
+            if changed:
+                generation = self._bump(offset, loaded=True)
+            return generation
+
+    def apply(
+        self,
+        date_str: str,
+        room: str,
+        *,
+        set_booked: int = 0,
+        clear_booked: int = 0,
+        set_disabled: int = 0,
+        clear_disabled: int = 0,
+    ) -> Optional[Tuple[int, int]]:
+        """Record one committed write; returns ``(generation_before, generation_after)``.
+
+        If the date was never published the masks are left alone and only the
+        generation moves, which sends every worker back to the database.
+        """
+
+        offset = self._date_offset(date_str)
+        if offset is None:
+            return None
+        room_offset = self._room_offset(offset, room)
+        with self._write():
+            before, loaded = _DATE.unpack_from(self._map, offset)
+            if loaded and room_offset is not None:
+                booked, disabled = _ROOM.unpack_from(self._map, room_offset)
+                booked = (booked & ~clear_booked) | set_booked
+                disabled = (disabled & ~clear_disabled) | set_disabled
+                _ROOM.pack_into(self._map, room_offset, booked, disabled)
+            elif loaded:
+                _DATE.pack_into(self._map, offset, before, 0)
+            return before, self._bump(offset)
+
+    def invalidate(self, date_str: Optional[str] = None) -> None:
+        """Mark one date (or all) as unpublished so the next reader reloads it."""
+
+        dates = list(self._dates) if date_str is None else [date_str]
+        with self._write():
+            for name in dates:
+                offset = self._date_offset(name)
+                if offset is not None:
+                    self._bump(offset, loaded=False)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
@@ -0,0 +1,291 @@
+import hashlib
+import logging
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from MySQLdb.cursors import DictCursor
+
+
+logger = logging.getLogger("apec_booking.outbox")
+
+OUTBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_outbox (
+  id BIGINT PRIMARY KEY AUTO_INCREMENT,
+  idempotency_key CHAR(64) NOT NULL UNIQUE,
+  recipient VARCHAR(190) NOT NULL,
+  subject VARCHAR(255) NOT NULL,
+  body_text MEDIUMTEXT NOT NULL,
+  body_html MEDIUMTEXT DEFAULT NULL,
+  status ENUM('pending','sending','sent','failed') NOT NULL DEFAULT 'pending',
+  attempts INT NOT NULL DEFAULT 0,
+  last_error VARCHAR(500) DEFAULT NULL,
+  next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  locked_at DATETIME DEFAULT NULL,
+  sent_at DATETIME DEFAULT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_outbox_due (status, next_attempt_at)
+) ENGINE=InnoDB
+"""
+
+
+def idempotency_key(*parts: Any) -> str:
+    """Stable key for one logical message; re-enqueueing it while queued is a no-op."""
+
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def enqueue(conn, messages: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+    """Insert ``messages`` (key, recipient, subject, text, html) into the outbox.
+
+    A key that is still ``pending`` or ``sending`` is skipped, so a double
+    submit doesn't send twice.  A ``sent`` or ``failed`` row with the same key
+    is queued again (fresh content, ``attempts`` reset, due now): that is a
+    deliberate resend.  The caller owns the transaction.  Returns
+    ``(queued, requeued)``: new rows and rows put back to ``pending``.
+    """
+
+    queued = requeued = 0
+    cur = conn.cursor()
+    for m in messages:
+        # status 는 마지막에 바꾼다 (앞의 IF 들이 바뀌기 전 값을 봐야 한다)
+        cur.execute(
+            """
+            INSERT INTO email_outbox
+              (idempotency_key, recipient, subject, body_text, body_html)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+              recipient = IF(status IN ('sent','failed'), VALUES(recipient), recipient),
+              subject = IF(status IN ('sent','failed'), VALUES(subject), subject),
+              body_text = IF(status IN ('sent','failed'), VALUES(body_text), body_text),
+              body_html = IF(status IN ('sent','failed'), VALUES(body_html), body_html),
+              attempts = IF(status IN ('sent','failed'), 0, attempts),
+              last_error = IF(status IN ('sent','failed'), NULL, last_error),
+              next_attempt_at = IF(status IN ('sent','failed'), NOW(), next_attempt_at),
+              sent_at = IF(status IN ('sent','failed'), NULL, sent_at),
+              status = IF(status IN ('sent','failed'), 'pending', status)
+            """,
+            (m["key"], m["recipient"], m["subject"], m["text"], m.get("html")),
+        )
+        # affected rows: 1 = 새 행, 2 = 기존 행을 바꿈, 0 = 아직 대기/전송 중이라 그대로
+        if cur.rowcount == 1:
+            queued += 1
+        elif cur.rowcount == 2:
+            requeued += 1
+    return queued, requeued
+
+
+class OutboxWorker(threading.Thread):
+    """Background sender for ``email_outbox``.
+
+    Claims due rows in batches with ``FOR UPDATE SKIP LOCKED`` (safe with
+    several app processes), sends them over one reused SMTP connection at no
+    more than ``rate`` messages per second, and reschedules failures with
+    exponential backoff until ``max_attempts`` is reached.  Rows stuck in
+    ``sending`` for longer than ``stale_after`` seconds (crashed worker) are
+    claimed again.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        open_smtp: Callable[[], Any],
+        mail_from: str,
+        *,
+        batch_size: int = 20,
+        rate: float = 5.0,
+        max_attempts: int = 5,
+        backoff: float = 30.0,
+        poll_interval: float = 2.0,
+        idle_close: float = 30.0,
+        stale_after: float = 600.0,
+    ):
+        super().__init__(name="email-outbox", daemon=True)
+        self._connect = connect
+        self._open_smtp = open_smtp
+        self.mail_from = mail_from
+        self.batch_size = batch_size
+        self.min_interval = 1.0 / rate if rate > 0 else 0.0
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.idle_close = idle_close
+        self.stale_after = stale_after
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+        self._smtp = None
+        self._smtp_used_at = 0.0
+        self._last_send = 0.0
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "batches": 0}
+
+    # ------------------------------------------------------------ control
+    def wake(self) -> None:
+        """Skip the poll sleep (called right after enqueueing)."""
+
+        self._wake.set()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop_event.set()
+        self._wake.set()
+        self.join(timeout)
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                processed = self.run_once()
+            except Exception:
+                logger.exception("Outbox batch failed")
+                processed = 0
+            if processed:
+                continue
+            if self._smtp is not None and time.monotonic() - self._smtp_used_at > self.idle_close:
+                self._close_smtp()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+        self._close_smtp()
+
+    # -------------------------------------------------------------- batch
+    def _claim(self) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            cur = conn.cursor(DictCursor)
+            cur.execute(
+                """
+                SELECT id, recipient, subject, body_text, body_html, attempts
+                FROM email_outbox
+                WHERE (status='pending' AND next_attempt_at <= NOW())
+                   OR (status='sending' AND locked_at < NOW() - INTERVAL %s SECOND)
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+                """,
+                (int(self.stale_after), self.batch_size),
+            )
+            rows = list(cur.fetchall())
+            if rows:
+                ids = [row["id"] for row in rows]
+                placeholders = ",".join(["%s"] * len(ids))
+                cur.execute(
+                    f"""
+                    UPDATE email_outbox
+                    SET status='sending', locked_at=NOW(), attempts=attempts+1
+                    WHERE id IN ({placeholders})
+                    """,
+                    ids,
+                )
+            conn.commit()
+            return rows
+        finally:
+            conn.close()
+
+    def _finish(self, sent_ids: List[int], failures: List[tuple]) -> None:
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            if sent_ids:
+                placeholders = ",".join(["%s"] * len(sent_ids))
+                cur.execute(
+                    f"""
+                    UPDATE email_outbox
+                    SET status='sent', sent_at=NOW(), locked_at=NULL, last_error=NULL
+                    WHERE id IN ({placeholders})
+                    """,
+                    sent_ids,
+                )
+            for row_id, attempts, error in failures:
+                if attempts >= self.max_attempts:
+                    cur.execute(
+                        "UPDATE email_outbox SET status='failed', locked_at=NULL, last_error=%s WHERE id=%s",
+                        (error[:500], row_id),
+                    )
+                else:
+                    delay = int(self.backoff * (2 ** (attempts - 1)))
+                    cur.execute(
+                        """
+                        UPDATE email_outbox
+                        SET status='pending', locked_at=NULL, last_error=%s,
+                            next_attempt_at=NOW() + INTERVAL %s SECOND
+                        WHERE id=%s
+                        """,
+                        (error[:500], delay, row_id),
+                    )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def run_once(self) -> int:
+        """Claim and send one batch; returns the number of rows processed."""
+
+        rows = self._claim()
+        if not rows:
+            return 0
+        self.stats["batches"] += 1
+        sent_ids: List[int] = []
+        failures: List[tuple] = []
+        for row in rows:
+            attempts = int(row["attempts"]) + 1
+            try:
+                self._send(row)
+            except Exception as exc:
+                failures.append((row["id"], attempts, f"{type(exc).__name__}: {exc}"))
+                if attempts >= self.max_attempts:
+                    self.stats["failed"] += 1
+                else:
+                    self.stats["retried"] += 1
+                self._close_smtp()
+            else:
+                sent_ids.append(row["id"])
+                self.stats["sent"] += 1
+        self._finish(sent_ids, failures)
+        return len(rows)
+
+    # --------------------------------------------------------------- SMTP
+    def _close_smtp(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+
+    def _send(self, row: Dict[str, Any]) -> None:
+        msg = EmailMessage()
+        msg["Subject"] = row["subject"]
+        msg["From"] = self.mail_from
+        msg["To"] = row["recipient"]
+        msg.set_content(row["body_text"])
+        if row.get("body_html"):
+            msg.add_alternative(row["body_html"], subtype="html")
+
+        wait = self.min_interval - (time.monotonic() - self._last_send)
+        if wait > 0:
+            time.sleep(wait)
+        for attempt in (1, 2):
+            if self._smtp is None:
+                self._smtp = self._open_smtp()
+            try:
+                self._smtp.send_message(msg)
+                break
+            except smtplib.SMTPServerDisconnected:
+                # Reused connection timed out on the server side; reconnect once.
+                self._smtp = None
+                if attempt == 2:
+                    raise
+        self._last_send = self._smtp_used_at = time.monotonic()
+
+
+def outbox_counts(conn) -> Dict[str, int]:
+    """Row count per status (pending / sending / sent / failed)."""
+
+    cur = conn.cursor()
+    cur.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status")
+    return {status: int(count) for status, count in cur.fetchall()}
+
+
+def ensure_outbox_schema(conn) -> None:
+    """Create ``email_outbox`` on databases initialised before it existed."""
+
+    conn.cursor().execute(OUTBOX_SCHEMA)
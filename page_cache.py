@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+import threading
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+from jinja2 import Environment
+
+try:
+    import brotli  # 선택 의존성: 없으면 gzip/원본만 제공
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+class RenderedPage(NamedTuple):
+    body: bytes
+    gzip: bytes
+    br: Optional[bytes]
+    etag: str  # 원본 기준; 인코딩별 ETag 는 뒤에 -gz / -br 을 붙인다
+
+
+class StaticPage:
+    """A template whose context is fixed at import time, rendered once per variant.
+
+    ``render(**vary)`` keys the cache on the (small) per-request values, so a
+    page like ``/booking`` keeps one copy per ``initial_date``.  Each copy
+    holds the identity, gzip and (when the ``brotli`` package is installed)
+    brotli bodies plus a strong ETag from the rendered bytes, so serving it is
+    a dict lookup.
+    """
+
+    def __init__(self, env: Environment, template_name: str, base: Mapping[str, Any], max_variants: int = 32):
+        self.env = env
+        self.template_name = template_name
+        self.base = dict(base)
+        self.max_variants = max_variants
+        self._variants: Dict[Tuple[Tuple[str, Any], ...], RenderedPage] = {}
+        self._lock = threading.Lock()
+
+    def render(self, **vary: Any) -> RenderedPage:
+        key = tuple(sorted(vary.items()))
+        page = self._variants.get(key)
+        if page is not None:
+            return page
+
+        html = self.env.get_template(self.template_name).render(**self.base, **vary)
+        body = html.encode("utf-8")
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        page = RenderedPage(
+            body=body,
+            gzip=gzip.compress(body, compresslevel=9, mtime=0),
+            br=brotli.compress(body, quality=11) if brotli is not None else None,
+            etag=f'"{digest}"',
+        )
+        with self._lock:
+            if len(self._variants) >= self.max_variants:
+                self._variants.clear()
+            self._variants[key] = page
+        return page
+
+    def clear(self) -> None:
+        with self._lock:
+            self._variants.clear()
+
+
+def accepts_encoding(accept_encoding: str, coding: str) -> bool:
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() != coding:
+            continue
+        params = params.replace(" ", "")
+        return params not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def negotiate(page: RenderedPage, accept_encoding: str) -> Tuple[bytes, Optional[str], str]:
+    """Pick ``(body, content-encoding, etag)`` for the client's ``Accept-Encoding``."""
+
+    if page.br is not None and accepts_encoding(accept_encoding, "br"):
+        return page.br, "br", page.etag[:-1] + '-br"'
+    if accepts_encoding(accept_encoding, "gzip"):
+        return page.gzip, "gzip", page.etag[:-1] + '-gz"'
+    return page.body, None, page.etag
@@ -6,7 +6,7 @@ set -euo pipefail
 #   DRY_RUN=1 ./send_email.sh 20251029  # 메일 미발송, 콘솔 미리보기
 #
 # Requirements:
-#   - Python 3.x (email/smtplib 표준 라이브러리 사용)
+#   - Python 3.x (email/smtplib 표준 라이브러리 사용), Jinja2 (메일 템플릿)
 #   - mysqlclient 파이썬 모듈 (pip install mysqlclient) 또는 시스템 libmysqlclient 설치 필요
 #   - /opt/apec-booking/.env 에 DB/SMTP 설정 존재
 #
@@ -88,17 +88,19 @@ echo "    SMTP=${SMTP_USER}@${SMTP_HOST}:${SMTP_PORT}  FROM=${SMTP_FROM}"
 [[ "$DRY_RUN" = "1" ]] && echo "    (DRY_RUN=1: preview only, no send)"
 
 # ---- call embedded Python to query & send -----------------------------------
-PYTHONIOENCODING=UTF-8 \
+# digest.py (repo) 를 공유 엔진으로 사용: 수신자별 체크포인트, 동시 SMTP 세션
+APP_DIR="${APP_DIR:-$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)}"
+DIGEST_CONCURRENCY="$(dotenv_get DIGEST_CONCURRENCY)"
+SERVER_BASE_URL="${SERVER_BASE_URL:-$(dotenv_get SERVER_BASE_URL)}"
+
+PYTHONIOENCODING=UTF-8 PYTHONPATH="$APP_DIR${PYTHONPATH:+:$PYTHONPATH}" \
 MYSQL_HOST="$MYSQL_HOST" MYSQL_PORT="$MYSQL_PORT" MYSQL_DB="$MYSQL_DB" \
 MYSQL_USER="$MYSQL_USER" MYSQL_PASSWORD="$MYSQL_PASSWORD" \
 SMTP_HOST="$SMTP_HOST" SMTP_PORT="$SMTP_PORT" SMTP_USER="$SMTP_USER" SMTP_PASSWORD="$SMTP_PASSWORD" \
 SMTP_FROM="$SMTP_FROM" TARGET_DATE="$DATE" DRY_RUN="$DRY_RUN" \
+DIGEST_CONCURRENCY="${DIGEST_CONCURRENCY:-4}" SERVER_BASE_URL="${SERVER_BASE_URL:-http://apecmeetingroom.com}" \
 python3 - <<'PY'
 import os, sys
-import html
-import smtplib
-from email.message import EmailMessage
-from collections import defaultdict
 
 try:
     import MySQLdb
@@ -113,6 +115,9 @@ except ModuleNotFoundError:  # pragma: no cover - runtime guard for environments
         )
         raise exc
 
+from digest import DigestRun, smtp_opener
+from mail_templates import EmailTemplates
+
 def get_env(name, required=True, cast=str, default=None):
     val = os.environ.get(name, default)
     if required and (val is None or str(val).strip() == ""):
@@ -132,161 +137,59 @@ SMTP_PW    = get_env("SMTP_PASSWORD")
 SMTP_FROM  = get_env("SMTP_FROM")
 TARGET_DATE= get_env("TARGET_DATE")
 DRY_RUN    = get_env("DRY_RUN", required=False, default="0")
+CONCURRENCY= get_env("DIGEST_CONCURRENCY", required=False, cast=int, default="4")
+SERVER_BASE_URL = get_env("SERVER_BASE_URL", required=False, default="http://apecmeetingroom.com")
+
+
+def connect():
+    return MySQLdb.connect(host=MYSQL_HOST, port=MYSQL_PORT, user=MYSQL_USER,
+                           passwd=MYSQL_PW, db=MYSQL_DB, charset="utf8mb4")
 
-# ---- query bookings for target date
-conn = MySQLdb.connect(host=MYSQL_HOST, port=MYSQL_PORT, user=MYSQL_USER,
-                       passwd=MYSQL_PW, db=MYSQL_DB, charset="utf8mb4")
-cur = conn.cursor()
+# 방 이름은 app.py 가 시작 시 동기화하는 rooms 테이블에서 읽는다 (ROOM_LABEL 과 동일)
+def room_labels():
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT code, label FROM rooms")
+        return dict(cur.fetchall())
+    finally:
+        conn.close()
+
+
+templates = EmailTemplates(SERVER_BASE_URL, room_labels())
+
+
+run = DigestRun(
+    "confirmation",
+    TARGET_DATE,
+    connect=connect,
+    open_smtp=smtp_opener(SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PW, starttls_optional=True),
+    mail_from=SMTP_FROM,
+    render=templates.render_confirmation,
+    concurrency=CONCURRENCY,
+    dry_run=DRY_RUN == "1",
+)
+
+# ---- stream bookings for target date (grouped by email inside the engine)
+conn = connect()
+cur = conn.cursor(MySQLdb.cursors.SSDictCursor)
 cur.execute("""
 SELECT email, company, tier, room_code, start_hour, end_hour, date
 FROM bookings
 WHERE date = %s
 ORDER BY email, start_hour, room_code
 """, (TARGET_DATE,))
-rows = cur.fetchall()
-cur.close(); conn.close()
+try:
+    report = run.run(cur)
+finally:
+    cur.close(); conn.close()
 
-if not rows:
+if not report.recipients:
     print(f"[i] No bookings on {TARGET_DATE}. Nothing to send.")
     sys.exit(0)
 
-# group by email
-by_email = defaultdict(list)
-for email, company, tier, room, sh, eh, dt in rows:
-    by_email[email].append({
-        "company": company, "tier": tier, "room": room,
-        "sh": sh, "eh": eh, "date": str(dt)
-    })
-
-def fmt_time(h): return f"{h:02d}:00"
-
-
-SERVER_BASE_URL = os.environ.get("SERVER_BASE_URL", "http://apecmeetingroom.com")
-
-ROOM_LABELS = {
-    "DM1": "Meeting Room 1",
-    "DM2": "Meeting Room 2",
-    "DM3": "Meeting Room 3",
-    "DM4": "Meeting Room 4",
-    "PM1": "Meeting Room 5",
-    "PM2": "Meeting Room 6",
-    "PM3": "Meeting Room 7",
-    "PM4": "Meeting Room 8",
-    "GM1": "Meeting Room 9",
-    "GM2": "Outdoor Meeting Room 1 (Hyundai Office Bus)",
-    "GM3": "Outdoor Meeting Room 2 (Hyundai Office Bus)",
-    "NM1": "Media Interview Room",
-}
-
-
-def build_body(recipient, items):
-    lines = []
-    html_lines = []
-    company_name = items[0]["company"] if items else ""
-
-    lines.append(f"Dear {company_name},")
-    lines.append("")
-    lines.append("Warm greetings from the Secretariat of the APEC CEO Summit Korea 2025.")
-    lines.append("We are pleased to inform you that your meeting room reservation has been successfully received.")
-    lines.append("Please find the details of your booking below for your confirmation.")
-    lines.append("")
-    lines.append("Reservation Details:")
-
-    html_lines.append("<html><body>")
-    html_lines.append(f"<p>Dear {html.escape(company_name)},</p>")
-    html_lines.append("<p>Warm greetings from the Secretariat of the APEC CEO Summit Korea 2025.</p>")
-    html_lines.append("<p>We are pleased to inform you that your meeting room reservation has been successfully received.<br>"
-                      "Please find the details of your booking below for your confirmation.</p>")
-    html_lines.append("<p><strong>Reservation Details:</strong></p>")
-
-    for idx, it in enumerate(items):
-        room = it["room"]
-        date = it["date"]
-        link = f"{SERVER_BASE_URL}/display?room={room}&date={date}"
-        if idx > 0:
-            lines.append("")
-        lines.append(f"- Company : {it['company']}")
-        lines.append(f"- Date : {date}")
-        lines.append(f"- Time : {fmt_time(it['sh'])} - {fmt_time(it['eh'])}")
-        room_name = ROOM_LABELS.get(room, room)
-        lines.append(f"- Room : {it['tier']} / {room_name}")
-        lines.append(f"- Check Schedule Link : {link}")
-
-        html_lines.append("<ul>")
-        html_lines.append(f"  <li><strong>Company:</strong> {html.escape(it['company'])}</li>")
-        html_lines.append(f"  <li><strong>Date:</strong> {html.escape(date)}</li>")
-        html_lines.append(f"  <li><strong>Time:</strong> {fmt_time(it['sh'])} - {fmt_time(it['eh'])}</li>")
-        html_lines.append(
-            f"  <li><strong>Room:</strong> {html.escape(it['tier'])} / {html.escape(room_name)}</li>"
-        )
-        html_lines.append(
-            f"  <li><strong>Check Schedule Link:</strong> "
-            f"<a href=\"{html.escape(link)}\">Check Schedule Link</a></li>"
-        )
-        html_lines.append("</ul>")
-
-    lines.append("")
-    lines.append("We kindly ask you to review the above information and ensure that all details are correct.")
-    lines.append("Should you require any assistance or additional arrangements, please do not hesitate to contact us.")
-    lines.append("")
-    lines.append("We look forward to supporting your successful participation at the APEC CEO Summit Korea 2025.")
-    lines.append("")
-    lines.append("Warm regards,")
-    lines.append("APEC CEO Summit Korea 2025 Secretariat")
-
-    html_lines.append("<p>We kindly ask you to review the above information and ensure that all details are correct.</p>")
-    html_lines.append("<p>Should you require any assistance or additional arrangements, please do not hesitate to contact us.</p>")
-    html_lines.append("<p>We look forward to supporting your successful participation at the APEC CEO Summit Korea 2025.</p>")
-    html_lines.append("<p>Warm regards,<br>APEC CEO Summit Korea 2025 Secretariat</p>")
-    html_lines.append("</body></html>")
-
-    return "\n".join(lines), "\n".join(html_lines)
-
-
-def send_one(to_addr, items):
-    subject = "[APEC CEO Summit Korea 2025] Meeting Room Reservation Confirmation"
-    text_body, html_body = build_body(to_addr, items)
-
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"]    = SMTP_FROM
-    msg["To"]      = to_addr
-    msg.set_content(text_body)
-    msg.add_alternative(html_body, subtype="html")
-
-    if DRY_RUN == "1":
-        print("----- DRY RUN -----")
-        print("TO:", to_addr)
-        print(msg.as_string())
-        print("-------------------")
-        return
-
-    if SMTP_PORT == 465:
-        with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=20) as s:
-            s.login(SMTP_USER, SMTP_PW)
-            s.send_message(msg)
-    else:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=20) as s:
-            s.ehlo()
-            try:
-                s.starttls()
-                s.ehlo()
-            except smtplib.SMTPException:
-                pass
-            if SMTP_USER:
-                s.login(SMTP_USER, SMTP_PW)
-            s.send_message(msg)
-
-count = 0
-for email, items in by_email.items():
-    if not email:
-        continue
-    try:
-        send_one(email, items)
-        count += 1
-    except Exception as e:
-        print(f"[WARN] send failed to {email}: {e}", file=sys.stderr)
-
-print(f"[✓] Done. Recipients: {count}, Bookings: {len(rows)}")
+print(f"[i] {report.summary()}")
+for email, error in report.failures:
+    print(f"    failed: {email}: {error}", file=sys.stderr)
+print(f"[✓] Done. Recipients: {report.sent}, Bookings: {report.bookings}")
 PY
-
@@ -0,0 +1,364 @@
+from datetime import datetime
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, NamedTuple, Optional, Protocol, Tuple
+
+
+# app.py 의 데이터 접근은 모두 이 인터페이스를 거친다.  STORAGE 값에 따라
+# storage_mysql.MySqlStorage / storage_sqlite.SqliteStorage / storage_xml.XmlStorage
+# 중 하나가 쓰인다.  날짜는 "YYYY-MM-DD" 문자열, 예약 창은 로컬 naive datetime.
+
+Row = Dict[str, Any]
+Window = Dict[str, datetime]
+
+
+class BookingRejected(Exception):
+    """Validation failure inside the booking transaction; maps 1:1 to an HTTP error.
+
+    ``reason`` is a short fixed tag (``conflict``, ``daily_limit``, ...) used as
+    the metrics label, since ``detail`` carries company names and dates.
+    """
+
+    def __init__(self, status_code: int, detail: str, reason: str = "invalid"):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.reason = reason
+
+
+class DuplicateCompany(ValueError):
+    """``add_company`` was given a name that already exists."""
+
+
+class BookingRules(NamedTuple):
+    rooms_by_tier: Dict[str, List[str]]
+    hours: List[int]
+    max_blocks: int
+
+
+class SlotRange(NamedTuple):
+    """One room, one date, one ``[start_hour, end_hour)`` band of a bulk disable/enable."""
+
+    date: str
+    room_code: str
+    start_hour: int
+    end_hour: int
+
+
+class BulkResult(NamedTuple):
+    slots: List[Row]    # 요청한 SlotRange 마다 하나: 범위 + status (+ id / removed / conflicts)
+    added: List[Row]    # 새로 들어간 disabled_slots 행
+    removed: List[int]  # 지운 disabled_slots id
+
+
+class CompanyPlan(NamedTuple):
+    add: List[Tuple[str, str]]                # (name, tier)
+    retier: List[Tuple[int, str, str, str]]   # (id, name, old tier, new tier)
+    remove: List[Row]                         # 기존 행 중 가져오기에 없는 것 (replace 일 때만)
+    unchanged: int
+
+
+class Storage(Protocol):
+    # bookings
+    def bookings_for_date(self, date_str: str) -> List[Row]: ...
+    def bookings_for_company(self, date_str: str, company: str) -> List[Row]: ...
+    def load_day(self, date_str: str) -> Tuple[List[Row], List[Row]]: ...
+    def commit_booking(
+        self,
+        rules: BookingRules,
+        date_str: str,
+        room_code: str,
+        company: str,
+        email: str,
+        start_hour: int,
+        blocks: int,
+        company_other: Optional[str] = None,
+    ) -> Row: ...
+    # deletes return the date of the removed row (None: there was no such booking)
+    def delete_booking(self, booking_id: int) -> Optional[str]: ...
+    def company_daily_total(self, date_str: str, company: str) -> int: ...
+
+    # disabled slots
+    def disabled_slots(self, date_str: Optional[str] = None, room_code: Optional[str] = None) -> List[Row]: ...
+    def add_disabled_slot(
+        self, date_str: str, room_code: str, start_hour: int, end_hour: int, note: Optional[str]
+    ) -> Row: ...
+    def delete_disabled_slot(self, slot_id: int) -> str: ...
+    # bulk: rooms x dates x hour bands in one transaction (see plan_disable / plan_enable)
+    def disable_slots(self, ranges: List[SlotRange], note: Optional[str]) -> BulkResult: ...
+    def enable_slots(self, ranges: List[SlotRange]) -> BulkResult: ...
+
+    # booking windows
+    def booking_windows(self) -> Dict[str, Window]: ...
+    def booking_window(self, date_str: str) -> Optional[Window]: ...
+    def set_booking_window(self, date_str: str, start_at: datetime, end_at: datetime) -> None: ...
+    def delete_booking_window(self, date_str: str) -> None: ...
+
+    # companies
+    def companies(self, tier: Optional[str] = None) -> List[Row]: ...
+    def company_tier(self, name: str) -> Optional[str]: ...
+    def add_company(self, name: str, tier: str) -> None: ...
+    def remove_company(self, company_id: int) -> Tuple[bool, str]: ...
+    # sync with a full list in one transaction (see plan_company_import);
+    # companies that still have bookings are never deleted
+    def import_companies(
+        self, companies: List[Tuple[str, str]], *, replace: bool = False, dry_run: bool = False
+    ) -> Row: ...
+
+    # calls made by this thread inside the block share one connection (MySQL
+    # pool checkout); each call still commits on its own
+    def session(self) -> ContextManager[None]: ...
+
+    # idempotency keys (idempotency.RequestKeys).  ``claim_request``
+    # returns None when the caller now owns ``key`` (held for ``hold`` seconds),
+    # otherwise the live row: fingerprint, status (None while in progress), location
+    def claim_request(self, key: str, fingerprint: str, hold: float) -> Optional[Row]: ...
+    def finish_request(self, key: str, status: int, location: Optional[str], ttl: float) -> None: ...
+    def release_request(self, key: str) -> None: ...
+    # read-only: the unexpired row for ``key`` (fingerprint, status, location) or None
+    def stored_request(self, key: str) -> Optional[Row]: ...
+
+    # admin dashboard: bookings/disabled (optionally one room), windows and,
+    # when ``with_companies``, the company list -- one round trip
+    def admin_dashboard(
+        self, date_str: str, room_code: Optional[str] = None, *, with_companies: bool = True
+    ) -> Dict[str, Any]: ...
+
+
+def overlaps(start_a: int, end_a: int, start_b: int, end_b: int) -> bool:
+    return not (end_a <= start_b or end_b <= start_a)
+
+
+def _by_cell(rows: Iterable[Row]) -> Dict[Tuple[str, str], List[Row]]:
+    cells: Dict[Tuple[str, str], List[Row]] = {}
+    for row in rows:
+        cells.setdefault((str(row["date"]), row["room_code"]), []).append(row)
+    return cells
+
+
+def plan_disable(
+    ranges: List[SlotRange], bookings: Iterable[Row], disabled: Iterable[Row]
+) -> Tuple[List[SlotRange], List[Row]]:
+    """Decide a bulk disable from the bookings/disabled rows overlapping the request.
+
+    Returns the ranges to insert and one outcome per requested range:
+    ``disabled`` (to be inserted), ``booked`` (``conflicts`` lists the booked
+    hours) or ``already_disabled``.  Ranges are expected not to overlap each
+    other within a room and date.
+    """
+
+    booked = _by_cell(bookings)
+    blocked = _by_cell(disabled)
+    inserts: List[SlotRange] = []
+    outcomes: List[Row] = []
+    for slot in ranges:
+        outcome: Row = dict(slot._asdict())
+        cell = (slot.date, slot.room_code)
+        hits = [
+            (row["start_hour"], row["end_hour"]) for row in booked.get(cell, [])
+            if overlaps(slot.start_hour, slot.end_hour, row["start_hour"], row["end_hour"])
+        ]
+        if hits:
+            outcome.update(status="booked", conflicts=sorted(hits))
+        elif any(overlaps(slot.start_hour, slot.end_hour, row["start_hour"], row["end_hour"])
+                 for row in blocked.get(cell, [])):
+            outcome["status"] = "already_disabled"
+        else:
+            outcome["status"] = "disabled"
+            inserts.append(slot)
+        outcomes.append(outcome)
+    return inserts, outcomes
+
+
+def plan_enable(ranges: List[SlotRange], disabled: Iterable[Row]) -> Tuple[List[int], List[Row], List[Row]]:
+    """Decide a bulk enable from the disabled rows overlapping the request.
+
+    Every overlapping disabled slot is deleted; the hours of it outside the
+    requested bands come back as new rows (same note), so enabling 12-13 in
+    a 9-18 block leaves 9-12 and 13-18.  Returns ``(delete_ids, leftovers,
+    outcomes)``; an outcome is ``enabled`` (``removed`` lists the ids) or
+    ``not_disabled``.
+    """
+
+    bands = _by_cell(dict(slot._asdict()) for slot in ranges)
+    by_cell = _by_cell(disabled)
+    delete_ids: List[int] = []
+    leftovers: List[Row] = []
+    for (date_str, room_code), rows in by_cell.items():
+        for row in rows:
+            cut = [
+                (band["start_hour"], band["end_hour"]) for band in bands.get((date_str, room_code), [])
+                if overlaps(row["start_hour"], row["end_hour"], band["start_hour"], band["end_hour"])
+            ]
+            if not cut:
+                continue
+            delete_ids.append(int(row["id"]))
+            pieces = [(row["start_hour"], row["end_hour"])]
+            for cut_start, cut_end in cut:
+                pieces = [
+                    part for start, end in pieces
+                    for part in ((start, min(end, cut_start)), (max(start, cut_end), end))
+                    if part[0] < part[1]
+                ]
+            leftovers.extend(
+                {"date": date_str, "room_code": room_code, "start_hour": start, "end_hour": end, "note": row.get("note")}
+                for start, end in pieces
+            )
+
+    outcomes: List[Row] = []
+    for slot in ranges:
+        outcome: Row = dict(slot._asdict())
+        removed = [
+            int(row["id"]) for row in by_cell.get((slot.date, slot.room_code), [])
+            if overlaps(slot.start_hour, slot.end_hour, row["start_hour"], row["end_hour"])
+        ]
+        if removed:
+            outcome.update(status="enabled", removed=removed)
+        else:
+            outcome["status"] = "not_disabled"
+        outcomes.append(outcome)
+    return delete_ids, leftovers, outcomes
+
+
+def bulk_result(outcomes: List[Row], added: List[Row], removed: List[int]) -> BulkResult:
+    """Attach the new ids to the ``disabled`` outcomes (rows are unique by date, room and start)."""
+
+    ids = {(str(row["date"]), row["room_code"], row["start_hour"]): row["id"] for row in added}
+    for outcome in outcomes:
+        if outcome["status"] == "disabled":
+            outcome["id"] = ids.get((outcome["date"], outcome["room_code"], outcome["start_hour"]))
+    return BulkResult(outcomes, added, removed)
+
+
+def plan_company_import(existing: Iterable[Row], companies: List[Tuple[str, str]], replace: bool) -> CompanyPlan:
+    """Diff ``(name, tier)`` pairs against the current ``companies`` rows.
+
+    Names match case-insensitively (MySQL's ``UNIQUE`` does) and an existing
+    row keeps its spelling.  With ``replace``, rows missing from ``companies``
+    are planned for removal.
+    """
+
+    current = {row["name"].casefold(): row for row in existing}
+    add: List[Tuple[str, str]] = []
+    retier: List[Tuple[int, str, str, str]] = []
+    unchanged = 0
+    for name, tier in companies:
+        row = current.pop(name.casefold(), None)
+        if row is None:
+            add.append((name, tier))
+        elif row["tier"] != tier:
+            retier.append((row["id"], row["name"], row["tier"], tier))
+        else:
+            unchanged += 1
+    remove = sorted(current.values(), key=lambda row: row["name"]) if replace else []
+    return CompanyPlan(add, retier, remove, unchanged)
+
+
+def company_import_summary(plan: CompanyPlan, booked: Dict[str, int], dry_run: bool) -> Row:
+    """Result of ``import_companies``; ``booked`` counts bookings per removal candidate (casefolded)."""
+
+    return {
+        "added": [{"name": name, "tier": tier} for name, tier in plan.add],
+        "retiered": [{"name": name, "from": old, "to": new} for _id, name, old, new in plan.retier],
+        "deleted": [row["name"] for row in plan.remove if row["name"].casefold() not in booked],
+        "kept": [
+            {"name": row["name"], "bookings": booked[row["name"].casefold()]}
+            for row in plan.remove if row["name"].casefold() in booked
+        ],
+        "unchanged": plan.unchanged,
+        "dry_run": dry_run,
+    }
+
+
+def check_booking(
+    rules: BookingRules,
+    date_str: str,
+    room_code: str,
+    company: str,
+    email: str,
+    start_hour: int,
+    blocks: int,
+    company_other: Optional[str],
+    *,
+    company_tier: Callable[[str], Optional[str]],
+    daily_total: Callable[[str], int],
+    room_ranges: Callable[[], List[Tuple[int, int]]],
+    disabled_ranges: Callable[[], List[Tuple[int, int]]],
+) -> Row:
+    """Apply the booking rules inside a backend's write transaction.
+
+    The callables read the backend's current state (under whatever lock the
+    backend holds); the return value is the row to insert, minus ``id``.
+    Raises :class:`BookingRejected` on the first failed rule.
+    """
+
+    # --- 회사/티어 확정 ---
+    if company == "Other":
+        company_to_save = (company_other or "").strip()
+        if not company_to_save:
+            raise BookingRejected(400, "Company name required for Other", "company")
+        tier = "Other"
+    else:
+        tier = company_tier(company)
+        if not tier:
+            raise BookingRejected(400, "Unknown company", "company")
+        company_to_save = company
+
+    allowed_rooms = rules.rooms_by_tier.get(tier, [])
+    if allowed_rooms and room_code not in allowed_rooms:
+        raise BookingRejected(403, "Selected room not available for this tier", "tier")
+
+    # --- 시간/블록 검증 ---
+    blocks = max(1, min(rules.max_blocks, int(blocks)))
+    start_hour = int(start_hour)
+    end_hour = start_hour + blocks
+    if start_hour not in rules.hours or end_hour > rules.hours[-1] + 1:
+        raise BookingRejected(400, "Invalid start hour", "start_hour")
+
+    # --- 하루 총 2시간 제한 ---
+    current_total = daily_total(company_to_save)
+    if current_total + blocks > rules.max_blocks:
+        raise BookingRejected(
+            409,
+            f"Daily limit exceeded: {company_to_save} already has {current_total}h booked on {date_str}. Max {rules.max_blocks}h/day.",
+            "daily_limit",
+        )
+
+    # --- 룸 시간대 충돌 ---
+    if any(overlaps(start_hour, end_hour, s, e) for s, e in room_ranges()):
+        raise BookingRejected(409, "Time slot already taken", "conflict")
+    if any(overlaps(start_hour, end_hour, s, e) for s, e in disabled_ranges()):
+        raise BookingRejected(409, "Time slot blocked by administrator", "disabled")
+
+    return {
+        "date": date_str,
+        "room_code": room_code,
+        "tier": tier,
+        "company": company_to_save,
+        "email": email,
+        "start_hour": start_hour,
+        "end_hour": end_hour,
+        "blocks": blocks,
+        "created_at": datetime.now(),
+    }
+
+
+def open_storage(kind: str, **settings: Any) -> Storage:
+    """Build the backend named by ``STORAGE`` (``mysql``, ``sqlite`` or ``xml``).
+
+    ``mysql`` needs ``pool``; ``sqlite`` needs ``sqlite_path``; ``xml`` needs
+    ``xml_path``.
+    """
+
+    kind = (kind or "mysql").lower()
+    if kind == "mysql":
+        from storage_mysql import MySqlStorage
+
+        return MySqlStorage(settings["pool"])
+    if kind == "sqlite":
+        from storage_sqlite import SqliteStorage
+
+        return SqliteStorage(settings["sqlite_path"])
+    if kind == "xml":
+        from storage_xml import XmlStorage
+
+        return XmlStorage(settings["xml_path"])
+    raise RuntimeError(f"Unknown STORAGE backend: {kind!r} (expected mysql, sqlite or xml)")
@@ -0,0 +1,640 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from time import sleep, time
+from typing import Any, Dict, List, Optional, Tuple
+
+import MySQLdb
+from MySQLdb import IntegrityError
+from MySQLdb.cursors import DictCursor
+
+from admission import Overloaded
+from storage import (
+    BookingRejected, BookingRules, BulkResult, DuplicateCompany, Row, SlotRange, Window, bulk_result, check_booking,
+    company_import_summary, overlaps, plan_company_import, plan_disable, plan_enable,
+)
+
+
+# InnoDB: 1213 = deadlock, 1205 = lock wait timeout. Both are safe to retry.
+RETRYABLE_LOCK_ERRORS = {1205, 1213}
+BOOKING_MAX_ATTEMPTS = 3
+DUPLICATE_KEY = 1062
+
+_BOOKING_COLUMNS = "id, date, room_code, tier, company, email, start_hour, end_hour, blocks, created_at"
+_DISABLED_COLUMNS = "id, date, room_code, start_hour, end_hour, note, created_at"
+
+REQUEST_KEYS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS request_keys (
+  request_key CHAR(64) PRIMARY KEY,
+  fingerprint CHAR(64) NOT NULL,
+  status SMALLINT DEFAULT NULL,
+  location TEXT DEFAULT NULL,
+  expires_at DOUBLE NOT NULL,
+  INDEX idx_request_keys_expiry (expires_at)
+) ENGINE=InnoDB
+"""
+
+# models.sql 과 같은 정의: 그보다 오래된 DB 에서는 처음 예약할 때 만들고 기존 예약으로 채운다
+BOOKING_HOURS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS booking_hours (
+  date DATE NOT NULL,
+  room_code VARCHAR(64) NOT NULL,
+  hour TINYINT NOT NULL,
+  booking_id BIGINT NOT NULL,
+  PRIMARY KEY (date, room_code, hour),
+  INDEX idx_booking_hours_booking (booking_id),
+  CONSTRAINT fk_booking_hours_booking FOREIGN KEY (booking_id) REFERENCES bookings(id) ON DELETE CASCADE
+) ENGINE=InnoDB
+"""
+BOOKING_HOURS_BACKFILL = f"""
+INSERT IGNORE INTO booking_hours (date, room_code, hour, booking_id)
+SELECT b.date, b.room_code, b.start_hour + n.n, b.id
+FROM bookings b
+JOIN ({" UNION ALL ".join(f"SELECT {n} AS n" for n in range(24))}) n ON n.n < b.end_hour - b.start_hour
+"""
+
+
+class _SessionConnection:
+    """The connection pinned by ``MySqlStorage.session``; ``close`` only ends the transaction."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self) -> None:
+        # 풀 반납 때처럼 열린 (읽기) 트랜잭션을 끝내 다음 호출이 새 스냅샷을 보게 한다
+        self._conn.rollback()
+
+
+class MySqlStorage:
+    """``STORAGE=mysql``: the schema in models.sql, through the shared pool."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._request_keys_ready = False
+        self._booking_hours_ready = False
+        self._next_purge = 0.0
+        self._local = threading.local()
+
+    def _connect(self):
+        pinned = getattr(self._local, "conn", None)
+        return pinned if pinned is not None else self.pool.connect()
+
+    @contextmanager
+    def session(self):
+        """Run every call made by this thread inside the block on one pooled connection.
+
+        Each call still commits its own transaction; only the checkout is
+        shared (``POST /book`` with an idempotency key: claim, booking, finish).
+        """
+
+        if getattr(self._local, "conn", None) is not None:
+            yield
+            return
+        conn = self.pool.connect()
+        self._local.conn = _SessionConnection(conn)
+        try:
+            yield
+        finally:
+            self._local.conn = None
+            conn.close()
+
+    def _query(self, sql: str, params: Any = ()) -> List[Row]:
+        conn = self._connect()
+        try:
+            cur = conn.cursor(DictCursor)
+            cur.execute(sql, params)
+            return list(cur.fetchall())
+        finally:
+            conn.close()
+
+    def _execute(self, sql: str, params: Any = ()) -> int:
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            conn.commit()
+            return cur.rowcount
+        finally:
+            conn.close()
+
+    # ---------------------------------------------------------- bookings
+    def bookings_for_date(self, date_str: str) -> List[Row]:
+        return self._query(
+            f"SELECT {_BOOKING_COLUMNS} FROM bookings WHERE date = %s ORDER BY room_code, start_hour",
+            (date_str,),
+        )
+
+    def bookings_for_company(self, date_str: str, company: str) -> List[Row]:
+        return self._query(
+            """
+            SELECT id, company, email, tier, room_code, start_hour, end_hour, date
+            FROM bookings
+            WHERE date = %s AND company = %s
+            ORDER BY email, start_hour, room_code
+            """,
+            (date_str, company),
+        )
+
+    def load_day(self, date_str: str) -> Tuple[List[Row], List[Row]]:
+        """One day's bookings and disabled slots on a single connection."""
+
+        conn = self._connect()
+        try:
+            cur = conn.cursor(DictCursor)
+            cur.execute(
+                f"SELECT {_BOOKING_COLUMNS} FROM bookings WHERE date = %s ORDER BY room_code, start_hour",
+                (date_str,),
+            )
+            bookings = list(cur.fetchall())
+            cur.execute(
+                f"SELECT {_DISABLED_COLUMNS} FROM disabled_slots WHERE date = %s ORDER BY room_code, start_hour",
+                (date_str,),
+            )
+            disabled = list(cur.fetchall())
+            return bookings, disabled
+        finally:
+            conn.close()
+
+    def _check_and_insert_booking(self, cur, rules: BookingRules, date_str, room_code, company, email,
+                                  start_hour, blocks, company_other) -> Row:
+        def company_tier(name: str) -> Optional[str]:
+            cur.execute("SELECT tier FROM companies WHERE name=%s", (name,))
+            row = cur.fetchone()
+            return row[0] if row else None
+
+        # idx_company_date 범위를 잠가 같은 회사의 동시 예약을 직렬화
+        def daily_total(name: str) -> int:
+            cur.execute(
+                "SELECT COALESCE(SUM(blocks), 0) FROM bookings WHERE date=%s AND company=%s FOR UPDATE",
+                (date_str, name),
+            )
+            return int(cur.fetchone()[0] or 0)
+
+        # 잠그지 않고 읽는다: 동시에 들어온 겹치는 예약은 아래 booking_hours 기본키가 막는다
+        # (빈 룸/날짜 범위의 gap 잠금끼리는 INSERT 때 서로 deadlock 이 난다)
+        def room_ranges() -> List[Tuple[int, int]]:
+            cur.execute(
+                "SELECT start_hour, end_hour FROM bookings WHERE date=%s AND room_code=%s",
+                (date_str, room_code),
+            )
+            return list(cur.fetchall())
+
+        def disabled_ranges() -> List[Tuple[int, int]]:
+            cur.execute(
+                "SELECT start_hour, end_hour FROM disabled_slots WHERE date=%s AND room_code=%s LOCK IN SHARE MODE",
+                (date_str, room_code),
+            )
+            return list(cur.fetchall())
+
+        booking = check_booking(
+            rules, date_str, room_code, company, email, start_hour, blocks, company_other,
+            company_tier=company_tier, daily_total=daily_total,
+            room_ranges=room_ranges, disabled_ranges=disabled_ranges,
+        )
+        cur.execute(
+            """
+            INSERT INTO bookings
+              (date, room_code, tier, company, email, start_hour, end_hour, blocks, created_at)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,NOW())
+            """,
+            (
+                date_str, room_code, booking["tier"], booking["company"], email,
+                booking["start_hour"], booking["end_hour"], booking["blocks"],
+            ),
+        )
+        booking_id = cur.lastrowid
+        try:
+            cur.executemany(
+                "INSERT INTO booking_hours (date, room_code, hour, booking_id) VALUES (%s,%s,%s,%s)",
+                [(date_str, room_code, hour, booking_id) for hour in range(booking["start_hour"], booking["end_hour"])],
+            )
+        except IntegrityError as exc:
+            if exc.args and exc.args[0] == DUPLICATE_KEY:
+                raise BookingRejected(409, "Time slot already taken", "conflict") from None
+            raise
+        return {"id": booking_id, **booking}
+
+    def _ensure_booking_hours(self, conn) -> None:
+        if self._booking_hours_ready:
+            return
+        cur = conn.cursor()
+        try:
+            cur.execute("SHOW TABLES LIKE 'booking_hours'")
+            if cur.fetchone() is None:
+                cur.execute(BOOKING_HOURS_SCHEMA)
+                cur.execute(BOOKING_HOURS_BACKFILL)
+                conn.commit()
+        finally:
+            cur.close()
+        self._booking_hours_ready = True
+
+    def commit_booking(self, rules: BookingRules, date_str: str, room_code: str, company: str, email: str,
+                       start_hour: int, blocks: int, company_other: Optional[str] = None) -> Row:
+        """Validate and insert a booking in one transaction on one connection.
+
+        The daily-total read locks the company's index range, so a concurrent
+        booking for the same company waits for this transaction instead of
+        racing it.  Room overlaps are a constraint: every booked hour is a
+        ``booking_hours`` row keyed by (date, room, hour), so the loser of a
+        race for a slot fails on the duplicate key and gets the usual 409.
+        Deadlocks and lock-wait timeouts are retried; one that outlasts
+        ``BOOKING_MAX_ATTEMPTS`` raises :class:`Overloaded` (429 + Retry-After)
+        rather than surfacing as a server error.
+        """
+
+        conn = self._connect()
+        try:
+            self._ensure_booking_hours(conn)
+            for attempt in range(1, BOOKING_MAX_ATTEMPTS + 1):
+                cur = conn.cursor()
+                try:
+                    booking = self._check_and_insert_booking(
+                        cur, rules, date_str, room_code, company, email, start_hour, blocks, company_other
+                    )
+                    conn.commit()
+                    return booking
+                except BookingRejected:
+                    conn.rollback()
+                    raise
+                except MySQLdb.OperationalError as exc:
+                    conn.rollback()
+                    code = exc.args[0] if exc.args else None
+                    if code not in RETRYABLE_LOCK_ERRORS:
+                        raise
+                    if attempt == BOOKING_MAX_ATTEMPTS:
+                        raise Overloaded("lock_contention", 1) from exc
+                    sleep(0.02 * attempt)
+                finally:
+                    cur.close()
+        finally:
+            conn.close()
+
+    def delete_booking(self, booking_id: int) -> Optional[str]:
+        def work(cur) -> Optional[str]:
+            cur.execute("SELECT date FROM bookings WHERE id=%s FOR UPDATE", (booking_id,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            cur.execute("DELETE FROM bookings WHERE id=%s", (booking_id,))
+            return str(row["date"])
+
+        return self._retrying(work)
+
+    def company_daily_total(self, date_str: str, company: str) -> int:
+        rows = self._query(
+            "SELECT COALESCE(SUM(blocks), 0) AS total FROM bookings WHERE date=%s AND company=%s",
+            (date_str, company),
+        )
+        return int(rows[0]["total"] or 0)
+
+    # ----------------------------------------------------- disabled slots
+    def disabled_slots(self, date_str: Optional[str] = None, room_code: Optional[str] = None) -> List[Row]:
+        query = f"SELECT {_DISABLED_COLUMNS} FROM disabled_slots"
+        conditions = []
+        params: List[Any] = []
+        if date_str:
+            conditions.append("date=%s")
+            params.append(date_str)
+        if room_code:
+            conditions.append("room_code=%s")
+            params.append(room_code)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY date, room_code, start_hour"
+        return self._query(query, params)
+
+    def add_disabled_slot(self, date_str: str, room_code: str, start_hour: int, end_hour: int,
+                          note: Optional[str]) -> Row:
+        """Insert a disabled slot unless it overlaps a booking or another disabled slot.
+
+        Takes the same idx_room_date range locks as ``commit_booking``, so a
+        booking and a disable for the same room and date can't both commit.
+        """
+
+        def work(cur) -> int:
+            # commit_booking 과 같은 (date, room_code) 범위 잠금
+            cur.execute(
+                "SELECT start_hour, end_hour FROM bookings WHERE date=%s AND room_code=%s FOR UPDATE",
+                (date_str, room_code),
+            )
+            if any(overlaps(start_hour, end_hour, row["start_hour"], row["end_hour"]) for row in cur.fetchall()):
+                raise ValueError("A booking already exists in that period")
+
+            cur.execute(
+                "SELECT start_hour, end_hour FROM disabled_slots WHERE date=%s AND room_code=%s FOR UPDATE",
+                (date_str, room_code),
+            )
+            if any(overlaps(start_hour, end_hour, row["start_hour"], row["end_hour"]) for row in cur.fetchall()):
+                raise ValueError("Slot already disabled for that period")
+
+            cur.execute(
+                """
+                INSERT INTO disabled_slots (date, room_code, start_hour, end_hour, note, created_at)
+                VALUES (%s,%s,%s,%s,%s,NOW())
+                """,
+                (date_str, room_code, start_hour, end_hour, note),
+            )
+            return cur.lastrowid
+
+        slot_id = self._retrying(work)
+        return {
+            "id": slot_id, "date": date_str, "room_code": room_code,
+            "start_hour": start_hour, "end_hour": end_hour,
+            "note": note, "created_at": datetime.now(),
+        }
+
+    def delete_disabled_slot(self, slot_id: int) -> str:
+        def work(cur) -> str:
+            cur.execute("SELECT date FROM disabled_slots WHERE id=%s FOR UPDATE", (slot_id,))
+            row = cur.fetchone()
+            if row is None:
+                raise ValueError("Disabled slot not found")
+            cur.execute("DELETE FROM disabled_slots WHERE id=%s", (slot_id,))
+            return str(row["date"])
+
+        return self._retrying(work)
+
+    def _retrying(self, work):
+        """Run ``work(cur)`` in one transaction, retrying deadlocks and lock-wait timeouts."""
+
+        conn = self._connect()
+        try:
+            for attempt in range(1, BOOKING_MAX_ATTEMPTS + 1):
+                cur = conn.cursor(DictCursor)
+                try:
+                    result = work(cur)
+                    conn.commit()
+                    return result
+                except MySQLdb.OperationalError as exc:
+                    conn.rollback()
+                    code = exc.args[0] if exc.args else None
+                    if code not in RETRYABLE_LOCK_ERRORS or attempt == BOOKING_MAX_ATTEMPTS:
+                        raise
+                    sleep(0.02 * attempt)
+                except BaseException:
+                    conn.rollback()
+                    raise
+                finally:
+                    cur.close()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _overlapping(cur, table: str, columns: str, ranges: List[SlotRange]) -> List[Row]:
+        """Rows of ``table`` in the requested rooms/dates and hour span, locked, in one query.
+
+        ``FOR UPDATE`` takes the idx_room_date ranges, so a booking for one of
+        these rooms and dates waits for the bulk transaction (and vice versa).
+        """
+
+        dates = sorted({slot.date for slot in ranges})
+        rooms = sorted({slot.room_code for slot in ranges})
+        cur.execute(
+            f"SELECT {columns} FROM {table} WHERE date IN ({','.join(['%s'] * len(dates))}) "
+            f"AND room_code IN ({','.join(['%s'] * len(rooms))}) AND start_hour < %s AND end_hour > %s FOR UPDATE",
+            (*dates, *rooms, max(slot.end_hour for slot in ranges), min(slot.start_hour for slot in ranges)),
+        )
+        return [dict(row, date=str(row["date"])) for row in cur.fetchall()]
+
+    def _insert_disabled(self, cur, rows: List[Row]) -> List[Row]:
+        if not rows:
+            return []
+        created_at = datetime.now().replace(microsecond=0)
+        # MySQLdb 는 INSERT ... VALUES 의 executemany 를 다중 행 INSERT 한 문장으로 보낸다
+        cur.executemany(
+            "INSERT INTO disabled_slots (date, room_code, start_hour, end_hour, note, created_at) "
+            "VALUES (%s,%s,%s,%s,%s,%s)",
+            [(row["date"], row["room_code"], row["start_hour"], row["end_hour"], row["note"], created_at)
+             for row in rows],
+        )
+        # auto_increment 가 연속이라는 보장이 없으므로 (date, room, start_hour) 로 새 id 를 읽는다
+        spans = [SlotRange(row["date"], row["room_code"], row["start_hour"], row["end_hour"]) for row in rows]
+        ids = {
+            (row["date"], row["room_code"], row["start_hour"]): row["id"]
+            for row in self._overlapping(cur, "disabled_slots", "id, date, room_code, start_hour", spans)
+        }
+        return [
+            dict(row, id=ids[(row["date"], row["room_code"], row["start_hour"])], created_at=created_at)
+            for row in rows
+        ]
+
+    def disable_slots(self, ranges: List[SlotRange], note: Optional[str]) -> BulkResult:
+        if not ranges:
+            return BulkResult([], [], [])
+
+        def work(cur) -> BulkResult:
+            bookings = self._overlapping(cur, "bookings", "date, room_code, start_hour, end_hour", ranges)
+            disabled = self._overlapping(cur, "disabled_slots", "id, date, room_code, start_hour, end_hour", ranges)
+            inserts, outcomes = plan_disable(ranges, bookings, disabled)
+            added = self._insert_disabled(cur, [dict(slot._asdict(), note=note) for slot in inserts])
+            return bulk_result(outcomes, added, [])
+
+        return self._retrying(work)
+
+    def enable_slots(self, ranges: List[SlotRange]) -> BulkResult:
+        if not ranges:
+            return BulkResult([], [], [])
+
+        def work(cur) -> BulkResult:
+            disabled = self._overlapping(
+                cur, "disabled_slots", "id, date, room_code, start_hour, end_hour, note", ranges
+            )
+            delete_ids, leftovers, outcomes = plan_enable(ranges, disabled)
+            if delete_ids:
+                cur.execute(
+                    f"DELETE FROM disabled_slots WHERE id IN ({','.join(['%s'] * len(delete_ids))})", delete_ids
+                )
+            added = self._insert_disabled(cur, leftovers)
+            return bulk_result(outcomes, added, delete_ids)
+
+        return self._retrying(work)
+
+    # ---------------------------------------------------- booking windows
+    def booking_windows(self) -> Dict[str, Window]:
+        rows = self._query("SELECT date, start_at, end_at FROM booking_windows ORDER BY date")
+        return {row["date"].isoformat(): {"start": row["start_at"], "end": row["end_at"]} for row in rows}
+
+    def booking_window(self, date_str: str) -> Optional[Window]:
+        rows = self._query("SELECT start_at, end_at FROM booking_windows WHERE date=%s", (date_str,))
+        if not rows:
+            return None
+        return {"start": rows[0]["start_at"], "end": rows[0]["end_at"]}
+
+    def set_booking_window(self, date_str: str, start_at: datetime, end_at: datetime) -> None:
+        self._execute(
+            """
+            INSERT INTO booking_windows (date, start_at, end_at)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE start_at=VALUES(start_at), end_at=VALUES(end_at)
+            """,
+            (date_str, start_at, end_at),
+        )
+
+    def delete_booking_window(self, date_str: str) -> None:
+        self._execute("DELETE FROM booking_windows WHERE date=%s", (date_str,))
+
+    # ---------------------------------------------------------- companies
+    def companies(self, tier: Optional[str] = None) -> List[Row]:
+        if tier:
+            return self._query("SELECT id, name, tier FROM companies WHERE tier=%s ORDER BY name", (tier,))
+        return self._query("SELECT id, name, tier FROM companies ORDER BY name")
+
+    def company_tier(self, name: str) -> Optional[str]:
+        rows = self._query("SELECT tier FROM companies WHERE name=%s", (name.strip(),))
+        return rows[0]["tier"] if rows else None
+
+    def add_company(self, name: str, tier: str) -> None:
+        try:
+            self._execute("INSERT INTO companies (name, tier) VALUES (%s, %s)", (name, tier))
+        except IntegrityError as exc:
+            raise DuplicateCompany(f"'{name}' already exists") from exc
+
+    def remove_company(self, company_id: int) -> Tuple[bool, str]:
+        """Delete a company if it has no bookings. Returns (ok, message)."""
+
+        conn = self._connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT name FROM companies WHERE id=%s", (company_id,))
+            row = cur.fetchone()
+            if not row:
+                return False, "Company not found"
+
+            company_name = row[0]
+            cur.execute("SELECT COUNT(*) FROM bookings WHERE company=%s", (company_name,))
+            count = int(cur.fetchone()[0] or 0)
+            if count:
+                conn.rollback()
+                return False, f"Cannot delete '{company_name}': {count} booking(s) exist."
+
+            cur.execute("DELETE FROM companies WHERE id=%s", (company_id,))
+            conn.commit()
+            return True, f"Deleted '{company_name}'"
+        finally:
+            conn.close()
+
+    def import_companies(
+        self, companies: List[Tuple[str, str]], *, replace: bool = False, dry_run: bool = False
+    ) -> Row:
+        def work(cur) -> Row:
+            cur.execute("SELECT id, name, tier FROM companies FOR UPDATE")
+            plan = plan_company_import(cur.fetchall(), companies, replace)
+            booked: Dict[str, int] = {}
+            if plan.remove:
+                names = [row["name"] for row in plan.remove]
+                cur.execute(
+                    f"SELECT company, COUNT(*) AS n FROM bookings WHERE company IN ({','.join(['%s'] * len(names))}) "
+                    "GROUP BY company",
+                    names,
+                )
+                booked = {row["company"].casefold(): int(row["n"]) for row in cur.fetchall()}
+            if dry_run:
+                return company_import_summary(plan, booked, dry_run)
+            if plan.add:
+                cur.executemany("INSERT INTO companies (name, tier) VALUES (%s, %s)", plan.add)
+            if plan.retier:
+                cur.executemany(
+                    "UPDATE companies SET tier=%s WHERE id=%s", [(new, company_id) for company_id, _, _, new in plan.retier]
+                )
+            delete_ids = [row["id"] for row in plan.remove if row["name"].casefold() not in booked]
+            if delete_ids:
+                cur.execute(f"DELETE FROM companies WHERE id IN ({','.join(['%s'] * len(delete_ids))})", delete_ids)
+            return company_import_summary(plan, booked, dry_run)
+
+        return self._retrying(work)
+
+    # --------------------------------------------------- idempotency keys
+    def claim_request(self, key: str, fingerprint: str, hold: float) -> Optional[Row]:
+        now = time()
+        conn = self._connect()
+        try:
+            cur = conn.cursor(DictCursor)
+            if not self._request_keys_ready:
+                # models.sql 보다 오래된 DB 에서도 동작하도록 처음 한 번 만든다
+                cur.execute(REQUEST_KEYS_SCHEMA)
+                self._request_keys_ready = True
+            if now >= self._next_purge:
+                cur.execute("DELETE FROM request_keys WHERE expires_at < %s LIMIT 1000", (now,))
+                self._next_purge = now + 60
+            cur.execute(
+                "INSERT IGNORE INTO request_keys (request_key, fingerprint, expires_at) VALUES (%s, %s, %s)",
+                (key, fingerprint, now + hold),
+            )
+            if cur.rowcount == 1:
+                conn.commit()
+                return None
+            cur.execute(
+                "SELECT fingerprint, status, location, expires_at FROM request_keys WHERE request_key = %s FOR UPDATE",
+                (key,),
+            )
+            row = cur.fetchone()
+            if row is None or row["expires_at"] <= now:
+                cur.execute(
+                    """
+                    INSERT INTO request_keys (request_key, fingerprint, expires_at) VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE fingerprint = VALUES(fingerprint), status = NULL,
+                                            location = NULL, expires_at = VALUES(expires_at)
+                    """,
+                    (key, fingerprint, now + hold),
+                )
+                conn.commit()
+                return None
+            conn.commit()
+            return {"fingerprint": row["fingerprint"], "status": row["status"], "location": row["location"]}
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def finish_request(self, key: str, status: int, location: Optional[str], ttl: float) -> None:
+        self._execute(
+            "UPDATE request_keys SET status = %s, location = %s, expires_at = %s WHERE request_key = %s",
+            (status, location, time() + ttl, key),
+        )
+
+    def release_request(self, key: str) -> None:
+        self._execute("DELETE FROM request_keys WHERE request_key = %s AND status IS NULL", (key,))
+
+    def stored_request(self, key: str) -> Optional[Row]:
+        if not self._request_keys_ready:
+            self._execute(REQUEST_KEYS_SCHEMA)
+            self._request_keys_ready = True
+        rows = self._query(
+            "SELECT fingerprint, status, location FROM request_keys WHERE request_key = %s AND expires_at > %s",
+            (key, time()),
+        )
+        return rows[0] if rows else None
+
+    # ---------------------------------------------------------- dashboard
+    def admin_dashboard(self, date_str: str, room_code: Optional[str] = None, *,
+                        with_companies: bool = True) -> Dict[str, Any]:
+        """Everything ``/admin`` renders, read on one pooled connection."""
+
+        room_sql = " AND room_code=%s" if room_code else ""
+        params = (date_str, room_code) if room_code else (date_str,)
+        conn = self._connect()
+        try:
+            cur = conn.cursor(DictCursor)
+            cur.execute(
+                f"SELECT {_BOOKING_COLUMNS} FROM bookings WHERE date=%s{room_sql} ORDER BY room_code, start_hour",
+                params,
+            )
+            bookings = list(cur.fetchall())
+            cur.execute(
+                f"SELECT {_DISABLED_COLUMNS} FROM disabled_slots WHERE date=%s{room_sql} ORDER BY room_code, start_hour",
+                params,
+            )
+            disabled = list(cur.fetchall())
+            cur.execute("SELECT date, start_at, end_at FROM booking_windows ORDER BY date")
+            windows = {row["date"].isoformat(): {"start": row["start_at"], "end": row["end_at"]} for row in cur.fetchall()}
+            data: Dict[str, Any] = {"bookings": bookings, "disabled": disabled, "windows": windows}
+            if with_companies:
+                cur.execute("SELECT id, name, tier FROM companies ORDER BY name")
+                data["companies"] = list(cur.fetchall())
+            return data
+        finally:
+            conn.close()
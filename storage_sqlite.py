@@ -0,0 +1,481 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from storage import (
+    BookingRules, BulkResult, DuplicateCompany, Row, SlotRange, Window, bulk_result, check_booking,
+    company_import_summary, plan_company_import, plan_disable, plan_enable,
+)
+
+
+# 회사명은 MySQL(utf8mb4_general_ci)처럼 대소문자를 가리지 않는다: 유일성, =, IN, ORDER BY 모두
+_TABLES = {
+    "companies": """
+CREATE TABLE IF NOT EXISTS companies (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL COLLATE NOCASE UNIQUE,
+  tier TEXT NOT NULL
+);""",
+    "bookings": """
+CREATE TABLE IF NOT EXISTS bookings (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  date TEXT NOT NULL,
+  room_code TEXT NOT NULL,
+  tier TEXT NOT NULL,
+  company TEXT NOT NULL COLLATE NOCASE,
+  email TEXT NOT NULL,
+  start_hour INTEGER NOT NULL,
+  end_hour INTEGER NOT NULL,
+  blocks INTEGER NOT NULL,
+  created_at TEXT NOT NULL
+);""",
+}
+
+SCHEMA = "".join(_TABLES.values()) + """
+CREATE INDEX IF NOT EXISTS idx_room_date ON bookings(room_code, date, start_hour);
+CREATE INDEX IF NOT EXISTS idx_company_date ON bookings(company, date);
+CREATE TABLE IF NOT EXISTS disabled_slots (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  date TEXT NOT NULL,
+  room_code TEXT NOT NULL,
+  start_hour INTEGER NOT NULL,
+  end_hour INTEGER NOT NULL,
+  note TEXT,
+  created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_disabled_room_date ON disabled_slots(room_code, date, start_hour);
+CREATE TABLE IF NOT EXISTS booking_windows (
+  date TEXT PRIMARY KEY,
+  start_at TEXT NOT NULL,
+  end_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS request_keys (
+  request_key TEXT PRIMARY KEY,
+  fingerprint TEXT NOT NULL,
+  status INTEGER,
+  location TEXT,
+  expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_request_keys_expiry ON request_keys(expires_at);
+"""
+
+_BOOKING_COLUMNS = "id, date, room_code, tier, company, email, start_hour, end_hour, blocks, created_at"
+_DISABLED_COLUMNS = "id, date, room_code, start_hour, end_hour, note, created_at"
+# 다중 행 INSERT/DELETE 한 문장에 넣는 행 수 (SQLite 바인드 변수 한도 아래)
+_BULK_CHUNK = 150
+
+
+def _row(row: sqlite3.Row) -> Row:
+    data = dict(row)
+    if data.get("created_at"):
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return data
+
+
+class SqliteStorage:
+    """``STORAGE=sqlite``: an embedded database file in WAL mode.
+
+    Each thread keeps its own connection.  Writes that check before they
+    insert run under ``BEGIN IMMEDIATE``, which takes SQLite's single write
+    lock up front, so two bookings for the same room or company serialise
+    even across worker processes.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 10.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._next_purge = 0.0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._migrate_nocase(conn)
+
+    @staticmethod
+    def _migrate_nocase(conn: sqlite3.Connection) -> None:
+        """Rebuild ``companies`` / ``bookings`` created before their name columns were ``COLLATE NOCASE``."""
+
+        def outdated() -> List[str]:
+            return [
+                table for table in _TABLES
+                if "COLLATE NOCASE" not in conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)
+                ).fetchone()[0]
+            ]
+
+        if not outdated():
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in outdated():  # 다른 프로세스가 먼저 옮겼을 수 있다
+                conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+                conn.execute(_TABLES[table])
+                # 대소문자만 다른 회사 중복은 먼저 들어온 것을 남긴다
+                conn.execute(f"INSERT OR IGNORE INTO {table} SELECT * FROM {table}_old ORDER BY id")
+                conn.execute(f"DROP TABLE {table}_old")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        conn.executescript(SCHEMA)  # 옛 테이블과 같이 지워진 인덱스
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def session(self):
+        """No-op: every call on this thread already uses the same connection."""
+
+        yield
+
+    @contextmanager
+    def _write(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _query(self, sql: str, params: Any = ()) -> List[Row]:
+        return [_row(row) for row in self._conn().execute(sql, params)]
+
+    # ---------------------------------------------------------- bookings
+    def bookings_for_date(self, date_str: str) -> List[Row]:
+        return self._query(
+            f"SELECT {_BOOKING_COLUMNS} FROM bookings WHERE date = ? ORDER BY room_code, start_hour",
+            (date_str,),
+        )
+
+    def bookings_for_company(self, date_str: str, company: str) -> List[Row]:
+        return self._query(
+            f"SELECT {_BOOKING_COLUMNS} FROM bookings WHERE date = ? AND company = ? "
+            "ORDER BY email, start_hour, room_code",
+            (date_str, company),
+        )
+
+    def load_day(self, date_str: str) -> Tuple[List[Row], List[Row]]:
+        return self.bookings_for_date(date_str), self.disabled_slots(date_str)
+
+    def commit_booking(self, rules: BookingRules, date_str: str, room_code: str, company: str, email: str,
+                       start_hour: int, blocks: int, company_other: Optional[str] = None) -> Row:
+        with self._write() as conn:
+            def ranges(table: str) -> List[Tuple[int, int]]:
+                return [
+                    (row[0], row[1])
+                    for row in conn.execute(
+                        f"SELECT start_hour, end_hour FROM {table} WHERE date=? AND room_code=?",
+                        (date_str, room_code),
+                    )
+                ]
+
+            booking = check_booking(
+                rules, date_str, room_code, company, email, start_hour, blocks, company_other,
+                company_tier=self._company_tier_in(conn),
+                daily_total=lambda name: self._daily_total_in(conn, date_str, name),
+                room_ranges=lambda: ranges("bookings"),
+                disabled_ranges=lambda: ranges("disabled_slots"),
+            )
+            cur = conn.execute(
+                """
+                INSERT INTO bookings
+                  (date, room_code, tier, company, email, start_hour, end_hour, blocks, created_at)
+                VALUES (?,?,?,?,?,?,?,?,?)
+                """,
+                (
+                    date_str, room_code, booking["tier"], booking["company"], email,
+                    booking["start_hour"], booking["end_hour"], booking["blocks"],
+                    booking["created_at"].isoformat(sep=" ", timespec="seconds"),
+                ),
+            )
+            return {"id": cur.lastrowid, **booking}
+
+    def delete_booking(self, booking_id: int) -> Optional[str]:
+        with self._write() as conn:
+            row = conn.execute("SELECT date FROM bookings WHERE id=?", (booking_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM bookings WHERE id=?", (booking_id,))
+            return row[0]
+
+    @staticmethod
+    def _daily_total_in(conn: sqlite3.Connection, date_str: str, company: str) -> int:
+        row = conn.execute(
+            "SELECT COALESCE(SUM(blocks), 0) FROM bookings WHERE date=? AND company=?",
+            (date_str, company),
+        ).fetchone()
+        return int(row[0] or 0)
+
+    def company_daily_total(self, date_str: str, company: str) -> int:
+        return self._daily_total_in(self._conn(), date_str, company)
+
+    # ----------------------------------------------------- disabled slots
+    def disabled_slots(self, date_str: Optional[str] = None, room_code: Optional[str] = None) -> List[Row]:
+        query = f"SELECT {_DISABLED_COLUMNS} FROM disabled_slots"
+        conditions = []
+        params: List[Any] = []
+        if date_str:
+            conditions.append("date=?")
+            params.append(date_str)
+        if room_code:
+            conditions.append("room_code=?")
+            params.append(room_code)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY date, room_code, start_hour"
+        return self._query(query, params)
+
+    def add_disabled_slot(self, date_str: str, room_code: str, start_hour: int, end_hour: int,
+                          note: Optional[str]) -> Row:
+        overlap = "SELECT 1 FROM {} WHERE date=? AND room_code=? AND NOT (? <= start_hour OR end_hour <= ?) LIMIT 1"
+        params = (date_str, room_code, end_hour, start_hour)
+        created_at = datetime.now().replace(microsecond=0)
+        with self._write() as conn:
+            if conn.execute(overlap.format("bookings"), params).fetchone():
+                raise ValueError("A booking already exists in that period")
+            if conn.execute(overlap.format("disabled_slots"), params).fetchone():
+                raise ValueError("Slot already disabled for that period")
+            cur = conn.execute(
+                """
+                INSERT INTO disabled_slots (date, room_code, start_hour, end_hour, note, created_at)
+                VALUES (?,?,?,?,?,?)
+                """,
+                (date_str, room_code, start_hour, end_hour, note, created_at.isoformat(sep=" ")),
+            )
+        return {
+            "id": cur.lastrowid, "date": date_str, "room_code": room_code,
+            "start_hour": start_hour, "end_hour": end_hour,
+            "note": note, "created_at": created_at,
+        }
+
+    def delete_disabled_slot(self, slot_id: int) -> str:
+        with self._write() as conn:
+            row = conn.execute("SELECT date FROM disabled_slots WHERE id=?", (slot_id,)).fetchone()
+            if row is None:
+                raise ValueError("Disabled slot not found")
+            conn.execute("DELETE FROM disabled_slots WHERE id=?", (slot_id,))
+            return row[0]
+
+    @staticmethod
+    def _overlapping(conn: sqlite3.Connection, table: str, columns: str, ranges: List[SlotRange]) -> List[Row]:
+        """Rows of ``table`` in the requested rooms/dates and hour span, in one query."""
+
+        dates = sorted({slot.date for slot in ranges})
+        rooms = sorted({slot.room_code for slot in ranges})
+        sql = (
+            f"SELECT {columns} FROM {table} WHERE date IN ({','.join('?' * len(dates))}) "
+            f"AND room_code IN ({','.join('?' * len(rooms))}) AND start_hour < ? AND end_hour > ?"
+        )
+        params = [*dates, *rooms, max(slot.end_hour for slot in ranges), min(slot.start_hour for slot in ranges)]
+        return [dict(row) for row in conn.execute(sql, params)]
+
+    def _insert_disabled(self, conn: sqlite3.Connection, rows: List[Row]) -> List[Row]:
+        if not rows:
+            return []
+        created_at = datetime.now().replace(microsecond=0)
+        stamp = created_at.isoformat(sep=" ")
+        for i in range(0, len(rows), _BULK_CHUNK):
+            chunk = rows[i:i + _BULK_CHUNK]
+            conn.execute(
+                "INSERT INTO disabled_slots (date, room_code, start_hour, end_hour, note, created_at) VALUES "
+                + ",".join(["(?,?,?,?,?,?)"] * len(chunk)),
+                [v for row in chunk
+                 for v in (row["date"], row["room_code"], row["start_hour"], row["end_hour"], row["note"], stamp)],
+            )
+        # 겹치는 차단이 없으니 (date, room, start_hour) 로 새 id 를 찾는다
+        spans = [SlotRange(row["date"], row["room_code"], row["start_hour"], row["end_hour"]) for row in rows]
+        ids = {
+            (row["date"], row["room_code"], row["start_hour"]): row["id"]
+            for row in self._overlapping(conn, "disabled_slots", "id, date, room_code, start_hour", spans)
+        }
+        return [
+            dict(row, id=ids[(row["date"], row["room_code"], row["start_hour"])], created_at=created_at)
+            for row in rows
+        ]
+
+    def disable_slots(self, ranges: List[SlotRange], note: Optional[str]) -> BulkResult:
+        if not ranges:
+            return BulkResult([], [], [])
+        with self._write() as conn:
+            bookings = self._overlapping(conn, "bookings", "date, room_code, start_hour, end_hour", ranges)
+            disabled = self._overlapping(conn, "disabled_slots", "id, date, room_code, start_hour, end_hour", ranges)
+            inserts, outcomes = plan_disable(ranges, bookings, disabled)
+            added = self._insert_disabled(conn, [dict(slot._asdict(), note=note) for slot in inserts])
+        return bulk_result(outcomes, added, [])
+
+    def enable_slots(self, ranges: List[SlotRange]) -> BulkResult:
+        if not ranges:
+            return BulkResult([], [], [])
+        with self._write() as conn:
+            disabled = self._overlapping(conn, "disabled_slots", "id, date, room_code, start_hour, end_hour, note", ranges)
+            delete_ids, leftovers, outcomes = plan_enable(ranges, disabled)
+            for i in range(0, len(delete_ids), _BULK_CHUNK):
+                chunk = delete_ids[i:i + _BULK_CHUNK]
+                conn.execute(f"DELETE FROM disabled_slots WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            added = self._insert_disabled(conn, leftovers)
+        return bulk_result(outcomes, added, delete_ids)
+
+    # ---------------------------------------------------- booking windows
+    def booking_windows(self) -> Dict[str, Window]:
+        rows = self._conn().execute("SELECT date, start_at, end_at FROM booking_windows ORDER BY date")
+        return {
+            row["date"]: {"start": datetime.fromisoformat(row["start_at"]), "end": datetime.fromisoformat(row["end_at"])}
+            for row in rows
+        }
+
+    def booking_window(self, date_str: str) -> Optional[Window]:
+        row = self._conn().execute(
+            "SELECT start_at, end_at FROM booking_windows WHERE date=?", (date_str,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"start": datetime.fromisoformat(row["start_at"]), "end": datetime.fromisoformat(row["end_at"])}
+
+    def set_booking_window(self, date_str: str, start_at: datetime, end_at: datetime) -> None:
+        with self._write() as conn:
+            conn.execute(
+                """
+                INSERT INTO booking_windows (date, start_at, end_at) VALUES (?, ?, ?)
+                ON CONFLICT(date) DO UPDATE SET start_at=excluded.start_at, end_at=excluded.end_at
+                """,
+                (date_str, start_at.isoformat(sep=" "), end_at.isoformat(sep=" ")),
+            )
+
+    def delete_booking_window(self, date_str: str) -> None:
+        with self._write() as conn:
+            conn.execute("DELETE FROM booking_windows WHERE date=?", (date_str,))
+
+    # ---------------------------------------------------------- companies
+    def companies(self, tier: Optional[str] = None) -> List[Row]:
+        if tier:
+            return self._query("SELECT id, name, tier FROM companies WHERE tier=? ORDER BY name", (tier,))
+        return self._query("SELECT id, name, tier FROM companies ORDER BY name")
+
+    @staticmethod
+    def _company_tier_in(conn: sqlite3.Connection):
+        def lookup(name: str) -> Optional[str]:
+            row = conn.execute("SELECT tier FROM companies WHERE name=?", (name,)).fetchone()
+            return row[0] if row else None
+
+        return lookup
+
+    def company_tier(self, name: str) -> Optional[str]:
+        return self._company_tier_in(self._conn())(name.strip())
+
+    def add_company(self, name: str, tier: str) -> None:
+        try:
+            with self._write() as conn:
+                conn.execute("INSERT INTO companies (name, tier) VALUES (?, ?)", (name, tier))
+        except sqlite3.IntegrityError as exc:
+            raise DuplicateCompany(f"'{name}' already exists") from exc
+
+    def remove_company(self, company_id: int) -> Tuple[bool, str]:
+        """Delete a company if it has no bookings. Returns (ok, message)."""
+
+        with self._write() as conn:
+            row = conn.execute("SELECT name FROM companies WHERE id=?", (company_id,)).fetchone()
+            if not row:
+                return False, "Company not found"
+            company_name = row[0]
+            count = conn.execute("SELECT COUNT(*) FROM bookings WHERE company=?", (company_name,)).fetchone()[0]
+            if count:
+                return False, f"Cannot delete '{company_name}': {count} booking(s) exist."
+            conn.execute("DELETE FROM companies WHERE id=?", (company_id,))
+            return True, f"Deleted '{company_name}'"
+
+    def import_companies(
+        self, companies: List[Tuple[str, str]], *, replace: bool = False, dry_run: bool = False
+    ) -> Row:
+        with self._write() as conn:
+            existing = [_row(row) for row in conn.execute("SELECT id, name, tier FROM companies")]
+            plan = plan_company_import(existing, companies, replace)
+            names = [row["name"] for row in plan.remove]
+            booked: Dict[str, int] = {}
+            for i in range(0, len(names), _BULK_CHUNK):
+                chunk = names[i:i + _BULK_CHUNK]
+                for row in conn.execute(
+                    f"SELECT company, COUNT(*) FROM bookings WHERE company IN ({','.join('?' * len(chunk))}) "
+                    "GROUP BY company",
+                    chunk,
+                ):
+                    booked[row[0].casefold()] = row[1]
+            if not dry_run:
+                conn.executemany("INSERT INTO companies (name, tier) VALUES (?, ?)", plan.add)
+                conn.executemany(
+                    "UPDATE companies SET tier=? WHERE id=?", [(new, company_id) for company_id, _, _, new in plan.retier]
+                )
+                conn.executemany(
+                    "DELETE FROM companies WHERE id=?",
+                    [(row["id"],) for row in plan.remove if row["name"].casefold() not in booked],
+                )
+        return company_import_summary(plan, booked, dry_run)
+
+    # --------------------------------------------------- idempotency keys
+    def claim_request(self, key: str, fingerprint: str, hold: float) -> Optional[Row]:
+        now = time.time()
+        with self._write() as conn:
+            if now >= self._next_purge:
+                conn.execute("DELETE FROM request_keys WHERE expires_at < ?", (now,))
+                self._next_purge = now + 60
+            row = conn.execute(
+                "SELECT fingerprint, status, location, expires_at FROM request_keys WHERE request_key = ?", (key,)
+            ).fetchone()
+            if row is not None and row["expires_at"] > now:
+                return {"fingerprint": row["fingerprint"], "status": row["status"], "location": row["location"]}
+            conn.execute(
+                "INSERT OR REPLACE INTO request_keys (request_key, fingerprint, status, location, expires_at) "
+                "VALUES (?, ?, NULL, NULL, ?)",
+                (key, fingerprint, now + hold),
+            )
+        return None
+
+    def finish_request(self, key: str, status: int, location: Optional[str], ttl: float) -> None:
+        with self._write() as conn:
+            conn.execute(
+                "UPDATE request_keys SET status = ?, location = ?, expires_at = ? WHERE request_key = ?",
+                (status, location, time.time() + ttl, key),
+            )
+
+    def release_request(self, key: str) -> None:
+        with self._write() as conn:
+            conn.execute("DELETE FROM request_keys WHERE request_key = ? AND status IS NULL", (key,))
+
+    def stored_request(self, key: str) -> Optional[Row]:
+        rows = self._query(
+            "SELECT fingerprint, status, location FROM request_keys WHERE request_key = ? AND expires_at > ?",
+            (key, time.time()),
+        )
+        return rows[0] if rows else None
+
+    # ---------------------------------------------------------- dashboard
+    def admin_dashboard(self, date_str: str, room_code: Optional[str] = None, *,
+                        with_companies: bool = True) -> Dict[str, Any]:
+        """Everything ``/admin`` renders, from one read transaction."""
+
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            data: Dict[str, Any] = {
+                "bookings": [row for row in self.bookings_for_date(date_str) if not room_code or row["room_code"] == room_code],
+                "disabled": self.disabled_slots(date_str, room_code),
+                "windows": self.booking_windows(),
+            }
+            if with_companies:
+                data["companies"] = self.companies()
+        finally:
+            conn.execute("COMMIT")
+        return data
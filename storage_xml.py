@@ -1,55 +1,614 @@
-import os, threading
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from xml.etree import ElementTree as ET
 
+from storage import (
+    BookingRules, BulkResult, DuplicateCompany, Row, SlotRange, Window, bulk_result, check_booking,
+    company_import_summary, overlaps, plan_company_import, plan_disable, plan_enable,
+)
+
+
+# kind -> XML 요소 이름과 (속성 이름, dict 키, 타입); 값이 None 인 속성은 생략
+_SCHEMA: Dict[str, Tuple[str, Tuple[Tuple[str, str, type], ...]]] = {
+    "booking": ("booking", (
+        ("id", "id", int), ("company", "company", str), ("email", "email", str),
+        ("tier", "tier", str), ("room_code", "room_code", str), ("date", "date", str),
+        ("start", "start_hour", int), ("end", "end_hour", int), ("blocks", "blocks", int),
+        ("created_at", "created_at", str),
+    )),
+    "disabled": ("disabled", (
+        ("id", "id", int), ("room_code", "room_code", str), ("date", "date", str),
+        ("start", "start_hour", int), ("end", "end_hour", int), ("note", "note", str),
+        ("created_at", "created_at", str),
+    )),
+    "company": ("company", (("id", "id", int), ("name", "name", str), ("tier", "tier", str))),
+    "window": ("window", (("date", "date", str), ("start_at", "start_at", str), ("end_at", "end_at", str))),
+    "request": ("request", (
+        ("key", "request_key", str), ("fingerprint", "fingerprint", str), ("status", "status", int),
+        ("location", "location", str), ("expires_at", "expires_at", float),
+    )),
+}
+_ID_KINDS = ("booking", "disabled", "company")
+
+
+def _from_element(kind: str, el: ET.Element) -> Row:
+    row: Row = {}
+    for attr, key, cast in _SCHEMA[kind][1]:
+        value = el.get(attr)
+        row[key] = cast(value) if value is not None else None
+    return row
+
+
+def _to_element(parent: ET.Element, kind: str, row: Row) -> ET.Element:
+    el = ET.SubElement(parent, _SCHEMA[kind][0])
+    for attr, key, _ in _SCHEMA[kind][1]:
+        if row.get(key) is not None:
+            el.set(attr, str(row[key]))
+    return el
+
+
+def _public(row: Row) -> Row:
+    out = dict(row)
+    if out.get("created_at"):
+        out["created_at"] = datetime.fromisoformat(out["created_at"])
+    return out
+
+
+def _now() -> str:
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
+def _file_sig(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _Snapshot:
+    """One loaded view of the store.
+
+    Readers only ever look up a date (or take the companies/windows dict) and
+    iterate what they get back; writers replace a room's list, the date's
+    room dict or the whole companies/windows dict instead of mutating them,
+    so a reader never needs a lock.
+    """
+
+    def __init__(self, snapshot_sig: Optional[Tuple[int, int, int]]):
+        self.bookings: Dict[str, Dict[str, List[Row]]] = {}
+        self.disabled: Dict[str, Dict[str, List[Row]]] = {}
+        self.companies: Dict[int, Row] = {}
+        self.windows: Dict[str, Row] = {}
+        # idempotency key 는 쓰기 트랜잭션 안에서만 읽으므로 제자리에서 바꾼다
+        self.requests: Dict[str, Row] = {}
+        self.locations: Dict[Tuple[str, int], Tuple[str, str]] = {}
+        self.next_ids: Dict[str, int] = {kind: 1 for kind in _ID_KINDS}
+        self.snapshot_sig = snapshot_sig
+        self.journal_ino: Optional[int] = None
+        self.journal_offset = 0
+        self.journal_entries = 0
+
+    def _by_date(self, kind: str) -> Dict[str, Dict[str, List[Row]]]:
+        return self.bookings if kind == "booking" else self.disabled
+
+    def put(self, kind: str, row: Row) -> None:
+        if kind in _ID_KINDS:
+            self.next_ids[kind] = max(self.next_ids[kind], row["id"] + 1)
+        if kind == "company":
+            self.companies = {**self.companies, row["id"]: row}
+        elif kind == "window":
+            self.windows = {**self.windows, row["date"]: row}
+        elif kind == "request":
+            self.requests[row["request_key"]] = row
+        elif (kind, row["id"]) not in self.locations:
+            # 압축 도중 죽어 저널이 남았을 때는 이미 스냅샷에 있는 id 를 건너뛴다
+            by_date = self._by_date(kind)
+            rooms = dict(by_date.get(row["date"], {}))
+            rooms[row["room_code"]] = rooms.get(row["room_code"], []) + [row]
+            by_date[row["date"]] = rooms
+            self.locations[(kind, row["id"])] = (row["date"], row["room_code"])
+
+    def delete(self, kind: str, key: Any) -> None:
+        if kind == "company":
+            self.companies = {cid: row for cid, row in self.companies.items() if cid != key}
+        elif kind == "window":
+            self.windows = {date: row for date, row in self.windows.items() if date != key}
+        elif kind == "request":
+            self.requests.pop(key, None)
+        else:
+            loc = self.locations.pop((kind, key), None)
+            if loc is None:
+                return
+            date_str, room = loc
+            by_date = self._by_date(kind)
+            rooms = dict(by_date.get(date_str, {}))
+            rooms[room] = [row for row in rooms.get(room, []) if row["id"] != key]
+            by_date[date_str] = rooms
+
+    def apply(self, entry: Dict[str, Any]) -> None:
+        if entry["op"] == "put":
+            self.put(entry["kind"], entry["row"])
+        elif entry["op"] == "delete":
+            self.delete(entry["kind"], entry["key"])
+
+    def day(self, kind: str, date_str: str, room_code: Optional[str] = None) -> List[Row]:
+        rooms = self._by_date(kind).get(date_str, {})
+        if room_code is not None:
+            return list(rooms.get(room_code, []))
+        return [row for items in rooms.values() for row in items]
+
+    def rows(self, kind: str) -> List[Row]:
+        if kind == "company":
+            return sorted(self.companies.values(), key=lambda row: row["id"])
+        if kind == "window":
+            return sorted(self.windows.values(), key=lambda row: row["date"])
+        if kind == "request":
+            return sorted(self.requests.values(), key=lambda row: row["request_key"])
+        rows = [row for rooms in self._by_date(kind).values() for items in rooms.values() for row in items]
+        rows.sort(key=lambda row: row["id"])
+        return rows
+
 
 class XmlStorage:
-def __init__(self, path:str):
-self.path = path
-self.lock = threading.Lock()
-os.makedirs(os.path.dirname(path), exist_ok=True)
-if not os.path.exists(path):
-root = ET.Element('apec-bookings')
-ET.ElementTree(root).write(path, encoding='utf-8', xml_declaration=True)
-
-
-def _read(self):
-tree = ET.parse(self.path)
-return tree, tree.getroot()
-
-
-def list_for_date(self, date:str):
-with self.lock:
-_, root = self._read()
-out=[]
-for b in root.findall('booking'):
-if b.get('date')==date:
-out.append({
-'id': int(b.get('id')),
-'company': b.get('company'),
-'email': b.get('email'),
-'tier': b.get('tier'),
-'room_code': b.get('room_code'),
-'date': b.get('date'),
-'start_hour': int(b.get('start')),
-'end_hour': int(b.get('end')),
-'blocks': int(b.get('blocks')),
-})
-return out
-
-
-def create(self, payload:dict):
-with self.lock:
-tree, root = self._read()
-next_id = 1 + max([int(b.get('id')) for b in root.findall('booking')] or [0])
-el = ET.SubElement(root, 'booking')
-el.set('id', str(next_id))
-el.set('company', payload['company'])
-el.set('email', payload['email'])
-el.set('tier', payload['tier'])
-el.set('room_code', payload['room_code'])
-el.set('date', payload['date'])
-el.set('start', str(payload['start_hour']))
-el.set('end', str(payload['end_hour']))
-el.set('blocks', str(payload['blocks']))
-tree.write(self.path, encoding='utf-8', xml_declaration=True)
-return next_id
+    """``STORAGE=xml``: one XML file, safe for several worker processes.
+
+    Bookings, disabled slots, companies and booking windows are kept in
+    memory (bookings and disabled slots as ``date -> room -> rows``) with
+    monotonic id counters.  Every write is appended (and fsync'ed) to
+    ``<path>.journal`` and folded into the XML snapshot every
+    ``compact_every`` writes; the snapshot is replaced through a temp file,
+    ``fsync`` and ``rename``, so a crash leaves either the old or the new
+    file.  Writers serialise on an ``fcntl`` lock on ``<path>.lock``.
+
+    Reads take no lock: they stat the snapshot and journal, reload only if
+    one changed (a replaced snapshot means a full reload, a grown journal only
+    replays the new lines) and then cost O(rows on that date).
+    """
+
+    def __init__(self, path: str, compact_every: int = 200):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self.compact_every = max(1, int(compact_every))
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._write_lock():
+            if not os.path.exists(path):
+                self._write_snapshot(_Snapshot(None))
+            self._snap = self._load()
+
+    # ---------------------------------------------------------- locking
+    @contextmanager
+    def _write_lock(self):
+        with self.lock:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    # ---------------------------------------------------------- loading
+    def _load(self) -> _Snapshot:
+        snap = _Snapshot(_file_sig(self.path))
+        root = ET.parse(self.path).getroot()
+        kinds = {element: kind for kind, (element, _) in _SCHEMA.items()}
+        for el in root:
+            kind = kinds.get(el.tag)
+            if kind is not None:
+                snap.put(kind, _from_element(kind, el))
+        for kind in _ID_KINDS:
+            snap.next_ids[kind] = max(snap.next_ids[kind], int(root.get(f"next-{kind}-id", "1")))
+        self._replay_journal(snap)
+        return snap
+
+    def _replay_journal(self, snap: _Snapshot) -> None:
+        try:
+            fh = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            snap.journal_ino = None
+            snap.journal_offset = 0
+            return
+        with fh:
+            ino = os.fstat(fh.fileno()).st_ino
+            if ino != snap.journal_ino:
+                snap.journal_ino = ino
+                snap.journal_offset = 0
+            fh.seek(snap.journal_offset)
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    # 다른 프로세스가 아직 쓰는 중인 줄은 다음 번에 읽는다
+                    break
+                snap.journal_offset += len(line)
+                snap.apply(json.loads(line))
+                snap.journal_entries += 1
+
+    def _stale(self) -> bool:
+        snap = self._snap
+        if _file_sig(self.path) != snap.snapshot_sig:
+            return True
+        journal = _file_sig(self.journal_path)
+        if journal is None:
+            return snap.journal_ino is not None
+        ino, _, size = journal
+        return ino != snap.journal_ino or size != snap.journal_offset
+
+    def _refresh(self) -> None:
+        snap = self._snap
+        if _file_sig(self.path) != snap.snapshot_sig:
+            self._snap = self._load()
+            return
+        journal = _file_sig(self.journal_path)
+        if journal is None:
+            if snap.journal_ino is not None:
+                self._snap = self._load()
+            return
+        ino, _, size = journal
+        if snap.journal_ino is not None and (ino != snap.journal_ino or size < snap.journal_offset):
+            self._snap = self._load()
+        elif size > snap.journal_offset or snap.journal_ino is None:
+            self._replay_journal(snap)
+
+    def _view(self) -> _Snapshot:
+        if self._stale():
+            with self.lock:
+                self._refresh()
+        return self._snap
+
+    # ---------------------------------------------------------- writing
+    def _write_snapshot(self, snap: _Snapshot) -> None:
+        root = ET.Element("apec-bookings")
+        for kind in _ID_KINDS:
+            root.set(f"next-{kind}-id", str(snap.next_ids[kind]))
+        for kind in _SCHEMA:
+            for row in snap.rows(kind):
+                _to_element(root, kind, row)
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        try:
+            with open(tmp_path, "wb") as fh:
+                ET.ElementTree(root).write(fh, encoding="utf-8", xml_declaration=True)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        _fsync_dir(self.path)
+
+    def _repair_journal(self) -> None:
+        """Drop a torn last line left behind by a writer that crashed mid-append."""
+
+        try:
+            fh = open(self.journal_path, "rb+")
+        except FileNotFoundError:
+            return
+        with fh:
+            size = fh.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            fh.seek(size - 1)
+            if fh.read(1) == b"\n":
+                return
+            fh.seek(0)
+            data = fh.read()
+            fh.truncate(data.rfind(b"\n") + 1)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    @contextmanager
+    def session(self):
+        """No-op: there are no connections to share."""
+
+        yield
+
+    @contextmanager
+    def _transaction(self):
+        """Exclusive write section over a fresh view; yields the view."""
+
+        with self._write_lock():
+            self._repair_journal()
+            self._refresh()
+            yield self._snap
+
+    def _append(self, entries: Iterable[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        with open(self.journal_path, "ab") as fh:
+            fh.write(data.encode("utf-8"))
+            fh.flush()
+            os.fsync(fh.fileno())
+        # 방금 쓴 줄은 _refresh 에서 그대로 다시 읽어 색인한다
+        self._refresh()
+        if self._snap.journal_entries >= self.compact_every:
+            self._compact()
+
+    def _put(self, snap: _Snapshot, kind: str, row: Row) -> Row:
+        if kind in _ID_KINDS:
+            row = {"id": snap.next_ids[kind], **row}
+        self._append([{"op": "put", "kind": kind, "row": row}])
+        return row
+
+    def _delete(self, kind: str, key: Any) -> None:
+        self._append([{"op": "delete", "kind": kind, "key": key}])
+
+    def compact(self) -> None:
+        """Fold the journal into the XML snapshot and start a new journal."""
+
+        with self._transaction():
+            self._compact()
+
+    def _compact(self) -> None:
+        # 새 스냅샷이 먼저 자리잡은 뒤 저널을 지운다; 그 사이에 죽어도
+        # 저널 재생은 이미 있는 id 를 건너뛴다.  만료된 idempotency key 는 여기서 버린다
+        now = time.time()
+        self._snap.requests = {key: row for key, row in self._snap.requests.items() if row["expires_at"] > now}
+        self._write_snapshot(self._snap)
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        _fsync_dir(self.journal_path)
+        self._snap = self._load()
+
+    # ---------------------------------------------------------- bookings
+    def bookings_for_date(self, date_str: str) -> List[Row]:
+        rows = self._view().day("booking", date_str)
+        rows.sort(key=lambda row: (row["room_code"], row["start_hour"]))
+        return [_public(row) for row in rows]
+
+    def bookings_for_company(self, date_str: str, company: str) -> List[Row]:
+        rows = [row for row in self._view().day("booking", date_str) if row["company"].casefold() == company.casefold()]
+        rows.sort(key=lambda row: (row["email"], row["start_hour"], row["room_code"]))
+        return [_public(row) for row in rows]
+
+    def load_day(self, date_str: str) -> Tuple[List[Row], List[Row]]:
+        return self.bookings_for_date(date_str), self.disabled_slots(date_str)
+
+    def commit_booking(self, rules: BookingRules, date_str: str, room_code: str, company: str, email: str,
+                       start_hour: int, blocks: int, company_other: Optional[str] = None) -> Row:
+        with self._transaction() as snap:
+            booking = check_booking(
+                rules, date_str, room_code, company, email, start_hour, blocks, company_other,
+                company_tier=lambda name: self._company_tier(snap, name),
+                daily_total=lambda name: self._daily_total(snap, date_str, name),
+                room_ranges=lambda: [(r["start_hour"], r["end_hour"]) for r in snap.day("booking", date_str, room_code)],
+                disabled_ranges=lambda: [(r["start_hour"], r["end_hour"]) for r in snap.day("disabled", date_str, room_code)],
+            )
+            row = dict(booking, created_at=booking["created_at"].isoformat(sep=" ", timespec="seconds"))
+            return _public(self._put(snap, "booking", row))
+
+    def delete_booking(self, booking_id: int) -> Optional[str]:
+        with self._transaction() as snap:
+            loc = snap.locations.get(("booking", booking_id))
+            if loc is None:
+                return None
+            self._delete("booking", booking_id)
+            return loc[0]
+
+    @staticmethod
+    def _daily_total(snap: _Snapshot, date_str: str, company: str) -> int:
+        company = company.casefold()
+        return sum(row["blocks"] for row in snap.day("booking", date_str) if row["company"].casefold() == company)
+
+    def company_daily_total(self, date_str: str, company: str) -> int:
+        return self._daily_total(self._view(), date_str, company)
+
+    # ----------------------------------------------------- disabled slots
+    def disabled_slots(self, date_str: Optional[str] = None, room_code: Optional[str] = None) -> List[Row]:
+        snap = self._view()
+        if date_str:
+            rows = snap.day("disabled", date_str, room_code)
+        else:
+            rows = [row for row in snap.rows("disabled") if not room_code or row["room_code"] == room_code]
+        rows.sort(key=lambda row: (row["date"], row["room_code"], row["start_hour"]))
+        return [_public(row) for row in rows]
+
+    def add_disabled_slot(self, date_str: str, room_code: str, start_hour: int, end_hour: int,
+                          note: Optional[str]) -> Row:
+        with self._transaction() as snap:
+            if any(overlaps(start_hour, end_hour, r["start_hour"], r["end_hour"])
+                   for r in snap.day("booking", date_str, room_code)):
+                raise ValueError("A booking already exists in that period")
+            if any(overlaps(start_hour, end_hour, r["start_hour"], r["end_hour"])
+                   for r in snap.day("disabled", date_str, room_code)):
+                raise ValueError("Slot already disabled for that period")
+            row = {
+                "date": date_str, "room_code": room_code, "start_hour": start_hour,
+                "end_hour": end_hour, "note": note, "created_at": _now(),
+            }
+            return _public(self._put(snap, "disabled", row))
+
+    def delete_disabled_slot(self, slot_id: int) -> str:
+        with self._transaction() as snap:
+            loc = snap.locations.get(("disabled", slot_id))
+            if loc is None:
+                raise ValueError("Disabled slot not found")
+            self._delete("disabled", slot_id)
+            return loc[0]
+
+    @staticmethod
+    def _overlapping(snap: _Snapshot, kind: str, ranges: List[SlotRange]) -> List[Row]:
+        cells = {(slot.date, slot.room_code) for slot in ranges}
+        return [row for date_str, room in cells for row in snap.day(kind, date_str, room)]
+
+    def _bulk(self, snap: _Snapshot, delete_ids: List[int], rows: List[Row]) -> List[Row]:
+        """Journal the deletes and the new disabled rows with one append (one fsync)."""
+
+        created_at = _now()
+        next_id = snap.next_ids["disabled"]
+        added = [dict(row, id=next_id + i, created_at=created_at) for i, row in enumerate(rows)]
+        entries = [{"op": "delete", "kind": "disabled", "key": slot_id} for slot_id in delete_ids]
+        entries += [{"op": "put", "kind": "disabled", "row": row} for row in added]
+        if entries:
+            self._append(entries)
+        return [_public(row) for row in added]
+
+    def disable_slots(self, ranges: List[SlotRange], note: Optional[str]) -> BulkResult:
+        with self._transaction() as snap:
+            inserts, outcomes = plan_disable(
+                ranges, self._overlapping(snap, "booking", ranges), self._overlapping(snap, "disabled", ranges)
+            )
+            added = self._bulk(snap, [], [dict(slot._asdict(), note=note) for slot in inserts])
+        return bulk_result(outcomes, added, [])
+
+    def enable_slots(self, ranges: List[SlotRange]) -> BulkResult:
+        with self._transaction() as snap:
+            delete_ids, leftovers, outcomes = plan_enable(ranges, self._overlapping(snap, "disabled", ranges))
+            added = self._bulk(snap, delete_ids, leftovers)
+        return bulk_result(outcomes, added, delete_ids)
+
+    # ---------------------------------------------------- booking windows
+    @staticmethod
+    def _window(row: Row) -> Window:
+        return {"start": datetime.fromisoformat(row["start_at"]), "end": datetime.fromisoformat(row["end_at"])}
+
+    def booking_windows(self) -> Dict[str, Window]:
+        return {row["date"]: self._window(row) for row in self._view().rows("window")}
+
+    def booking_window(self, date_str: str) -> Optional[Window]:
+        row = self._view().windows.get(date_str)
+        return self._window(row) if row else None
+
+    def set_booking_window(self, date_str: str, start_at: datetime, end_at: datetime) -> None:
+        with self._transaction() as snap:
+            row = {"date": date_str, "start_at": start_at.isoformat(sep=" "), "end_at": end_at.isoformat(sep=" ")}
+            self._put(snap, "window", row)
+
+    def delete_booking_window(self, date_str: str) -> None:
+        with self._transaction() as snap:
+            if date_str in snap.windows:
+                self._delete("window", date_str)
+
+    # --------------------------------------------------- idempotency keys
+    def claim_request(self, key: str, fingerprint: str, hold: float) -> Optional[Row]:
+        now = time.time()
+        with self._transaction() as snap:
+            row = snap.requests.get(key)
+            if row is not None and row["expires_at"] > now:
+                return {"fingerprint": row["fingerprint"], "status": row.get("status"), "location": row.get("location")}
+            self._put(snap, "request", {"request_key": key, "fingerprint": fingerprint, "expires_at": now + hold})
+        return None
+
+    def finish_request(self, key: str, status: int, location: Optional[str], ttl: float) -> None:
+        with self._transaction() as snap:
+            row = snap.requests.get(key)
+            if row is not None:
+                self._put(snap, "request", dict(row, status=status, location=location, expires_at=time.time() + ttl))
+
+    def release_request(self, key: str) -> None:
+        with self._transaction() as snap:
+            row = snap.requests.get(key)
+            if row is not None and row.get("status") is None:
+                self._delete("request", key)
+
+    def stored_request(self, key: str) -> Optional[Row]:
+        row = self._view().requests.get(key)
+        if row is None or row["expires_at"] <= time.time():
+            return None
+        return {"fingerprint": row["fingerprint"], "status": row.get("status"), "location": row.get("location")}
+
+    # ---------------------------------------------------------- companies
+    def companies(self, tier: Optional[str] = None) -> List[Row]:
+        rows = [dict(row) for row in self._view().companies.values() if not tier or row["tier"] == tier]
+        rows.sort(key=lambda row: row["name"].casefold())
+        return rows
+
+    # 회사명 비교는 MySQL 콜레이션 / SQLite NOCASE 처럼 대소문자를 가리지 않는다
+    @staticmethod
+    def _company_tier(snap: _Snapshot, name: str) -> Optional[str]:
+        name = name.casefold()
+        for row in snap.companies.values():
+            if row["name"].casefold() == name:
+                return row["tier"]
+        return None
+
+    def company_tier(self, name: str) -> Optional[str]:
+        return self._company_tier(self._view(), name.strip())
+
+    def add_company(self, name: str, tier: str) -> None:
+        with self._transaction() as snap:
+            if self._company_tier(snap, name) is not None:
+                raise DuplicateCompany(f"'{name}' already exists")
+            self._put(snap, "company", {"name": name, "tier": tier})
+
+    def remove_company(self, company_id: int) -> Tuple[bool, str]:
+        """Delete a company if it has no bookings. Returns (ok, message)."""
+
+        with self._transaction() as snap:
+            row = snap.companies.get(company_id)
+            if row is None:
+                return False, "Company not found"
+            company_name = row["name"]
+            count = sum(1 for booking in snap.rows("booking") if booking["company"].casefold() == company_name.casefold())
+            if count:
+                return False, f"Cannot delete '{company_name}': {count} booking(s) exist."
+            self._delete("company", company_id)
+            return True, f"Deleted '{company_name}'"
+
+    def import_companies(
+        self, companies: List[Tuple[str, str]], *, replace: bool = False, dry_run: bool = False
+    ) -> Row:
+        with self._transaction() as snap:
+            plan = plan_company_import(list(snap.companies.values()), companies, replace)
+            booked: Dict[str, int] = {}
+            if plan.remove:
+                names = {row["name"].casefold() for row in plan.remove}
+                for booking in snap.rows("booking"):
+                    key = booking["company"].casefold()
+                    if key in names:
+                        booked[key] = booked.get(key, 0) + 1
+            if not dry_run:
+                next_id = snap.next_ids["company"]
+                entries = [
+                    {"op": "put", "kind": "company", "row": {"id": next_id + i, "name": name, "tier": tier}}
+                    for i, (name, tier) in enumerate(plan.add)
+                ]
+                entries += [
+                    {"op": "put", "kind": "company", "row": {"id": company_id, "name": name, "tier": new}}
+                    for company_id, name, _, new in plan.retier
+                ]
+                entries += [
+                    {"op": "delete", "kind": "company", "key": row["id"]}
+                    for row in plan.remove if row["name"].casefold() not in booked
+                ]
+                if entries:
+                    self._append(entries)
+        return company_import_summary(plan, booked, dry_run)
+
+    # ---------------------------------------------------------- dashboard
+    def admin_dashboard(self, date_str: str, room_code: Optional[str] = None, *,
+                        with_companies: bool = True) -> Dict[str, Any]:
+        """Everything ``/admin`` renders, from one loaded view."""
+
+        snap = self._view()
+        bookings = snap.day("booking", date_str, room_code)
+        bookings.sort(key=lambda row: (row["room_code"], row["start_hour"]))
+        disabled = snap.day("disabled", date_str, room_code)
+        disabled.sort(key=lambda row: (row["room_code"], row["start_hour"]))
+        data: Dict[str, Any] = {
+            "bookings": [_public(row) for row in bookings],
+            "disabled": [_public(row) for row in disabled],
+            "windows": {row["date"]: self._window(row) for row in snap.rows("window")},
+        }
+        if with_companies:
+            companies = [dict(row) for row in snap.companies.values()]
+            companies.sort(key=lambda row: row["name"].casefold())
+            data["companies"] = companies
+        return data
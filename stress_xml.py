@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Concurrency stress test for ``STORAGE=xml`` across worker processes.
+
+``--processes`` processes open the same XML store (with a low
+``--compact-every`` so snapshots are rewritten during the run), wait on one
+start signal and then all try to book every hour of every room, each in its
+own shuffled order, while also adding companies of their own.  Afterwards the
+store is reopened and checked:
+
+* no two bookings overlap in a room (no double booking),
+* every booking a process was told had committed is stored, and every
+  stored booking was reported by exactly one process (no lost writes),
+* every slot ended up booked (someone must win each one),
+* every company a process added is there.
+
+Runs on a throw-away directory unless ``--dir`` is given::
+
+    python stress_xml.py --processes 8 --rooms 3 --hours 9 --compact-every 5
+
+Exit code 1 if any check fails.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Tuple
+
+from storage import BookingRejected, BookingRules, overlaps
+from storage_xml import XmlStorage
+
+
+FIRST_HOUR = 9
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--rooms", type=int, default=3, help="rooms contended for")
+    parser.add_argument("--hours", type=int, default=9, help="one-hour slots per room")
+    parser.add_argument("--companies", type=int, default=5, help="companies each process adds")
+    parser.add_argument("--compact-every", type=int, default=5, help="XmlStorage journal entries per snapshot")
+    parser.add_argument("--date", default="2025-10-29")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--dir", help="store directory (default: a temporary one, removed afterwards)")
+    return parser.parse_args(argv)
+
+
+def _worker(index: int, args: argparse.Namespace, path: str, start, results) -> None:
+    store = XmlStorage(path, compact_every=args.compact_every)
+    company = f"Stress {index}"
+    # 하루 한도 / 티어 룸 제한은 빼고 겹침 검사만 남긴다
+    rules = BookingRules({}, list(range(FIRST_HOUR, FIRST_HOUR + args.hours)), args.hours * args.rooms)
+    slots = [(f"R{room}", FIRST_HOUR + hour) for room in range(args.rooms) for hour in range(args.hours)]
+    random.Random(args.seed * 1000 + index).shuffle(slots)
+
+    booked: List[Dict[str, Any]] = []
+    rejected = 0
+    added: List[str] = []
+    start.wait()
+    for n, (room, hour) in enumerate(slots):
+        try:
+            row = store.commit_booking(rules, args.date, room, "Other", f"w{index}@example.com", hour, 1, company)
+        except BookingRejected:
+            rejected += 1
+        else:
+            booked.append({key: row[key] for key in ("id", "room_code", "start_hour", "end_hour", "company")})
+        if n % max(1, len(slots) // max(1, args.companies)) == 0 and len(added) < args.companies:
+            name = f"{company} #{len(added)}"
+            store.add_company(name, "Gold")
+            added.append(name)
+    while len(added) < args.companies:
+        name = f"{company} #{len(added)}"
+        store.add_company(name, "Gold")
+        added.append(name)
+    results.put((index, booked, rejected, added))
+
+
+def check(args: argparse.Namespace, path: str, reports: List[Tuple[int, List[Dict[str, Any]], int, List[str]]]) -> List[str]:
+    store = XmlStorage(path, compact_every=args.compact_every)
+    stored = store.bookings_for_date(args.date)
+    problems: List[str] = []
+
+    by_room: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for row in stored:
+        by_room[row["room_code"]].append(row)
+    for room, rows in sorted(by_room.items()):
+        rows.sort(key=lambda row: row["start_hour"])
+        for a, b in zip(rows, rows[1:]):
+            if overlaps(a["start_hour"], a["end_hour"], b["start_hour"], b["end_hour"]):
+                problems.append(f"double booking in {room}: ids {a['id']} and {b['id']} at {b['start_hour']}:00")
+
+    reported = [row for _, booked, _, _ in reports for row in booked]
+    ids = Counter(row["id"] for row in reported)
+    problems.extend(f"id {booking_id} reported by {count} processes" for booking_id, count in ids.items() if count > 1)
+    stored_by_id = {row["id"]: row for row in stored}
+    for row in reported:
+        saved = stored_by_id.get(row["id"])
+        if saved is None:
+            problems.append(f"lost write: booking {row['id']} ({row['room_code']} {row['start_hour']}:00) missing")
+        elif any(saved[key] != row[key] for key in ("room_code", "start_hour", "company")):
+            problems.append(f"booking {row['id']} stored as {saved['room_code']} {saved['start_hour']}:00 {saved['company']}")
+    problems.extend(f"unreported booking {row['id']}" for row in stored if row["id"] not in ids)
+
+    expected_slots = args.rooms * args.hours
+    if len(stored) != expected_slots:
+        problems.append(f"{len(stored)}/{expected_slots} slots booked")
+
+    companies = {row["name"] for row in store.companies()}
+    missing = [name for _, _, _, added in reports for name in added if name not in companies]
+    problems.extend(f"lost write: company {name!r} missing" for name in missing)
+    return problems
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    directory = args.dir or tempfile.mkdtemp(prefix="stress-xml-")
+    path = os.path.join(directory, "stress.xml")
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    results = ctx.Queue()
+    try:
+        XmlStorage(path, compact_every=args.compact_every)
+        workers = [ctx.Process(target=_worker, args=(i, args, path, start, results)) for i in range(args.processes)]
+        for worker in workers:
+            worker.start()
+        time.sleep(0.5)  # 모든 프로세스가 저장소를 연 뒤 동시에 출발
+        started = time.perf_counter()
+        start.set()
+        reports = [results.get(timeout=300) for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        failed = [worker.exitcode for worker in workers if worker.exitcode]
+        problems = check(args, path, reports)
+        if failed:
+            problems.append(f"{len(failed)} process(es) exited with an error")
+        booked = sum(len(report[1]) for report in reports)
+        rejected = sum(report[2] for report in reports)
+        print(
+            f"{args.processes} processes, {args.rooms * args.hours} slots, compact_every={args.compact_every}: "
+            f"{booked} booked, {rejected} rejected, {sum(len(report[3]) for report in reports)} companies "
+            f"in {elapsed:.2f}s"
+        )
+        for problem in problems:
+            print(f"  ! {problem}")
+        print("FAIL" if problems else "OK: no double bookings, no lost writes")
+        return 1 if problems else 0
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+Window = Dict[str, datetime]
+WindowsLoader = Callable[[], Dict[str, Window]]
+DefaultWindow = Callable[[str], Tuple[datetime, datetime]]
+
+
+class EffectiveWindow(NamedTuple):
+    start: datetime
+    end: datetime
+    source: str  # "custom" | "default"
+
+
+class _Plan:
+    """One immutable load: the custom windows and every date's effective window."""
+
+    __slots__ = ("custom", "effective", "loaded_at", "generation")
+
+    def __init__(self, custom: Dict[str, Window], effective: Dict[str, EffectiveWindow], generation: int):
+        self.custom = custom
+        self.effective = effective
+        self.loaded_at = time.monotonic()
+        self.generation = generation
+
+
+class WindowSchedule:
+    """In-memory booking-window schedule for the event dates.
+
+    All custom windows are read with one ``loader()`` call and merged with
+    ``default(date)`` up front, so a status check is a clock comparison
+    against precomputed open/close instants.  The plan is reloaded after
+    ``ttl`` seconds (to pick up other workers' admin edits) or right after
+    ``invalidate``; ``on_change()`` fires when a reload or ``store`` finds
+    different custom windows.
+    """
+
+    def __init__(
+        self,
+        dates: List[str],
+        loader: WindowsLoader,
+        default: DefaultWindow,
+        ttl: float = 30.0,
+        on_change: Optional[Callable[[], Any]] = None,
+    ):
+        self.dates = list(dates)
+        self._loader = loader
+        self._default = default
+        self._on_change = on_change
+        self.ttl = ttl
+        self._plan: Optional[_Plan] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------ loading
+    def _build(self, custom: Dict[str, Window], generation: int) -> _Plan:
+        effective: Dict[str, EffectiveWindow] = {}
+        for date_str in set(self.dates) | set(custom):
+            row = custom.get(date_str)
+            if row:
+                effective[date_str] = EffectiveWindow(row["start"], row["end"], "custom")
+            else:
+                start, end = self._default(date_str)
+                effective[date_str] = EffectiveWindow(start, end, "default")
+        return _Plan(custom, effective, generation)
+
+    def _install(self, plan: _Plan) -> None:
+        changed = False
+        with self._lock:
+            if plan.generation != self._generation:
+                # invalidate() 가 로딩 도중 들어왔다: 이번 결과는 곧바로 만료시킨다
+                plan.loaded_at = 0.0
+            previous = self._plan
+            changed = previous is not None and previous.custom != plan.custom
+            self._plan = plan
+        if changed and self._on_change is not None:
+            self._on_change()
+
+    def is_fresh(self) -> bool:
+        plan = self._plan
+        return plan is not None and time.monotonic() - plan.loaded_at < self.ttl
+
+    def _current(self) -> _Plan:
+        plan = self._plan
+        if plan is not None and time.monotonic() - plan.loaded_at < self.ttl:
+            return plan
+        with self._lock:
+            generation = self._generation
+        plan = self._build(self._loader(), generation)
+        self._install(plan)
+        return plan
+
+    def store(self, custom: Dict[str, Window]) -> None:
+        """Install a custom-windows map the caller already read (e.g. the admin dashboard)."""
+
+        with self._lock:
+            generation = self._generation
+        self._install(self._build(custom, generation))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._plan = None
+
+    # ------------------------------------------------------------ queries
+    def windows(self) -> Dict[str, Window]:
+        """The custom windows map, as ``loader`` returned it."""
+
+        return self._current().custom
+
+    def window(self, date_str: str) -> EffectiveWindow:
+        plan = self._current()
+        window = plan.effective.get(date_str)
+        if window is None:
+            start, end = self._default(date_str)
+            window = EffectiveWindow(start, end, "default")
+        return window
+
+
+def window_timing(start: datetime, end: datetime, now: datetime) -> Dict[str, Any]:
+    """Open flag and the seconds to the next open/close of one window at ``now``."""
+
+    is_open = start <= now < end
+    if now < start:
+        next_change: Optional[datetime] = start
+    elif is_open:
+        next_change = end
+    else:
+        next_change = None
+    return {
+        "is_open": is_open,
+        "seconds_until_open": max(0.0, (start - now).total_seconds()),
+        "seconds_until_close": (end - now).total_seconds() if is_open else 0.0,
+        "next_change": next_change,
+    }